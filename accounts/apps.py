@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from ocontest.images import track_image_derivatives
+        from ocontest.response_cache import invalidate_on_change
+        from .models import BrandProfile, CreatorProfile, Product
+
+        track_image_derivatives(CreatorProfile, 'profile_picture', ('avatar',))
+        track_image_derivatives(CreatorProfile, 'banner_image', ('banner',))
+        track_image_derivatives(BrandProfile, 'company_logo', ('avatar', 'card'))
+        track_image_derivatives(Product, 'image', ('card', 'full'))
+        invalidate_on_change(Product, 'products')
@@ -54,6 +54,7 @@ class User(AbstractUser):
     )
     phone_number = models.CharField(max_length=20, blank=True)
     is_verified = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = CustomUserManager()
 
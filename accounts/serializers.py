@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from ocontest.images import ImageVariantsField
 from .models import CreatorProfile, BrandProfile
 
 User = get_user_model()
@@ -40,6 +41,8 @@ class CreatorProfileSerializer(serializers.ModelSerializer):
     profile_picture = serializers.ImageField(required=False, allow_null=True)
     # Frontend alias camelCase
     profilePicture = serializers.ImageField(required=False, allow_null=True, write_only=True, source='profile_picture')
+    profile_picture_variants = ImageVariantsField(source='profile_picture', presets=('avatar',))
+    banner_image_variants = ImageVariantsField(source='banner_image', presets=('banner',))
     social_media_links = serializers.JSONField(required=False, write_only=True)
     
     # Shipping address as a nested object
@@ -62,7 +65,8 @@ class CreatorProfileSerializer(serializers.ModelSerializer):
         model = CreatorProfile
         fields = [
             'id', 'email', 'first_name', 'last_name', 'gender', 'phone_number', 'bio', 'address',
-            'experience_level', 'profile_picture', 'profilePicture', 'banner_image', 'portfolio_url', 'social_media_links',
+            'experience_level', 'profile_picture', 'profilePicture', 'profile_picture_variants', 'banner_image',
+            'banner_image_variants', 'portfolio_url', 'social_media_links',
             'receive_sms_notifications', 'total_earnings', 'contest_wins', 'contest_participations',
             'shipping_address_line1', 'shipping_address_line2', 'shipping_city', 'shipping_state',
             'shipping_postal_code', 'shipping_country', 'shipping_address', 'created_at', 'updated_at',
@@ -222,11 +226,12 @@ class CreatorProfileSerializer(serializers.ModelSerializer):
 class BrandProfileSerializer(serializers.ModelSerializer):
     email = serializers.SerializerMethodField()
     name = serializers.CharField(source='company_name')
+    company_logo_variants = ImageVariantsField(source='company_logo', presets=('avatar', 'card'))
 
     class Meta:
         model = BrandProfile
         fields = [
-            'id', 'email', 'name', 'company_logo', 'bio', 'country',
+            'id', 'email', 'name', 'company_logo', 'company_logo_variants', 'bio', 'country',
             'physical_address', 'contact_email', 'contact_person', 'contact_phone',
             'company_type', 'industry_type', 'website_url', 'social_media_links',
             'contests_created', 'total_prize_money', 'created_at', 'updated_at'
@@ -258,13 +263,15 @@ class PublicCreatorProfileSerializer(serializers.ModelSerializer):
     website = serializers.SerializerMethodField()
     social_links = serializers.SerializerMethodField()
     banner_image = serializers.ImageField(read_only=True)
+    profile_picture_variants = ImageVariantsField(source='profile_picture', presets=('avatar',))
+    banner_image_variants = ImageVariantsField(source='banner_image', presets=('banner',))
 
     class Meta:
         model = CreatorProfile
         fields = [
             'full_name', 'email', 'bio', 'location', 'skills',
-            'profile_picture', 'experience_level', 'joined_date',
-            'total_videos', 'total_contests', 'website', 'social_links', 'banner_image'
+            'profile_picture', 'profile_picture_variants', 'experience_level', 'joined_date',
+            'total_videos', 'total_contests', 'website', 'social_links', 'banner_image', 'banner_image_variants'
         ]
 
     def get_full_name(self, obj):
@@ -305,6 +312,7 @@ class PublicCreatorProfileSerializer(serializers.ModelSerializer):
 
 class PublicBrandProfileSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source='company_name')
+    company_logo_variants = ImageVariantsField(source='company_logo', presets=('avatar', 'card'))
     email = serializers.SerializerMethodField()
     joined_date = serializers.SerializerMethodField()
     total_contests = serializers.SerializerMethodField()
@@ -313,7 +321,7 @@ class PublicBrandProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = BrandProfile
         fields = [
-            'name', 'email', 'company_logo', 'bio', 'country', 'industry_type',
+            'name', 'email', 'company_logo', 'company_logo_variants', 'bio', 'country', 'industry_type',
             'website_url', 'social_media_links', 'company_type', 'joined_date',
             'total_contests', 'total_prize_pool'
         ]
@@ -1,14 +1,20 @@
+from collections import defaultdict
+
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from django.db.models import Count, Sum, Avg
 from django.urls import path, reverse
 from django.shortcuts import render
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import F
 from django.templatetags.static import static
 from .models import Contest, Submission, ContestApplication
+from . import creator_stats, search
 from accounts.models import Product
-from notifications.services import create_notification
+from ocontest import response_cache
+from notifications.services import create_notifications_bulk
 from notifications.models import Notification
 
 class SubmissionInline(admin.TabularInline):
@@ -109,28 +115,40 @@ class ContestAdmin(admin.ModelAdmin):
         return 'No deadline'
     days_until_deadline.short_description = 'Time Left'
 
+    def update_contests(self, queryset, **fields):
+        with transaction.atomic():
+            previous_statuses = dict(queryset.select_for_update().values_list('pk', 'status'))
+            queryset.update(**fields, updated_at=timezone.now())
+            # update() sends no signals, so do what the post_save handlers would have
+            if 'status' in fields:
+                creator_stats.apply_contest_status_change(previous_statuses, fields['status'])
+            for contest in Contest.objects.filter(pk__in=previous_statuses).select_related('brand__brand_profile'):
+                search.index_contest(contest)
+            response_cache.invalidate('contests', 'videos')
+            transaction.on_commit(lambda: response_cache.invalidate('contests', 'videos'))
+
     def make_featured(self, request, queryset):
-        queryset.update(is_featured=True)
+        self.update_contests(queryset, is_featured=True)
         self.message_user(request, f'{queryset.count()} contests were marked as featured.')
     make_featured.short_description = 'Mark selected contests as featured'
 
     def make_unfeatured(self, request, queryset):
-        queryset.update(is_featured=False)
+        self.update_contests(queryset, is_featured=False)
         self.message_user(request, f'{queryset.count()} contests were unmarked as featured.')
     make_unfeatured.short_description = 'Mark selected contests as not featured'
 
     def mark_as_live(self, request, queryset):
-        queryset.update(status='live')
+        self.update_contests(queryset, status='live')
         self.message_user(request, f'{queryset.count()} contests were marked as live.')
     mark_as_live.short_description = 'Set status to Live'
 
     def mark_as_draft(self, request, queryset):
-        queryset.update(status='draft')
+        self.update_contests(queryset, status='draft')
         self.message_user(request, f'{queryset.count()} contests were marked as draft.')
     mark_as_draft.short_description = 'Set status to Draft'
 
     def mark_as_completed(self, request, queryset):
-        queryset.update(status='completed')
+        self.update_contests(queryset, status='completed')
         self.message_user(request, f'{queryset.count()} contests were marked as completed.')
     mark_as_completed.short_description = 'Set status to Completed'
 
@@ -249,18 +267,27 @@ class ContestApplicationAdmin(admin.ModelAdmin):
         })
     ]
 
+    def _applicants_by_contest(self, queryset):
+        """Return ``[(contest, [creator ids])]`` for the selected applications."""
+        creator_ids = defaultdict(list)
+        for contest_id, creator_id in queryset.values_list('contest_id', 'creator_id'):
+            creator_ids[contest_id].append(creator_id)
+        contests = Contest.objects.in_bulk(creator_ids)
+        return [(contests[contest_id], ids) for contest_id, ids in creator_ids.items()]
+
     def approve_applications(self, request, queryset):
+        applicants = self._applicants_by_contest(queryset)
         # First, update the status
         updated = queryset.update(status='approved')
         
-        # Then create notifications for each approved application
-        for application in queryset:
-            create_notification(
-                recipient=application.creator,
+        # Then notify the applicants of each contest in one batch
+        for contest, creator_ids in applicants:
+            create_notifications_bulk(
+                creator_ids,
                 notification_type=Notification.NotificationType.APPLICATION_APPROVED,
-                title=f'Application Approved: {application.contest.title}',
-                message=f'Your application for the contest "{application.contest.title}" has been approved. You can now submit your video!',
-                related_object=application.contest
+                title=f'Application Approved: {contest.title}',
+                message=f'Your application for the contest "{contest.title}" has been approved. You can now submit your video!',
+                related_object=contest
             )
 
         self.message_user(
@@ -271,17 +298,18 @@ class ContestApplicationAdmin(admin.ModelAdmin):
     approve_applications.short_description = 'Approve selected applications'
 
     def reject_applications(self, request, queryset):
+        applicants = self._applicants_by_contest(queryset)
         # First, update the status
         updated = queryset.update(status='rejected')
         
-        # Then create notifications for each rejected application
-        for application in queryset:
-            create_notification(
-                recipient=application.creator,
+        # Then notify the applicants of each contest in one batch
+        for contest, creator_ids in applicants:
+            create_notifications_bulk(
+                creator_ids,
                 notification_type=Notification.NotificationType.APPLICATION_REJECTED,
-                title=f'Application Rejected: {application.contest.title}',
-                message=f'Your application for the contest "{application.contest.title}" has been rejected.',
-                related_object=application.contest
+                title=f'Application Rejected: {contest.title}',
+                message=f'Your application for the contest "{contest.title}" has been rejected.',
+                related_object=contest
             )
 
         self.message_user(
@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class ContestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contests'
+
+    def ready(self):
+        import contests.signals  # noqa
+        from ocontest.images import track_image_derivatives
+        from ocontest.response_cache import invalidate_on_change
+        from ocontest.trending import track_trending
+        from accounts.models import BrandProfile, User
+        from .models import Contest, Submission
+
+        track_image_derivatives(Contest, 'thumbnail', ('card', 'full'))
+        track_trending(Contest, {'view_count': 'view'})
+        invalidate_on_change(Contest, 'contests')
+        # Contest lists show submission counts and the brand's name and logo
+        invalidate_on_change(Submission, 'contests')
+        invalidate_on_change(BrandProfile, 'contests')
+        invalidate_on_change(User, 'contests', fields=('first_name', 'last_name', 'email'))
@@ -21,14 +21,16 @@ class BrandContestListView(generics.ListAPIView):
     permission_classes = [IsBrandUser]
 
     def get_queryset(self):
-        return Contest.objects.filter(brand=self.request.user).order_by('-created_at')
+        return Contest.objects.for_listing().with_approved_submissions().filter(
+            brand=self.request.user
+        ).order_by('-created_at')
 
 class BrandContestDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ContestSerializer
     permission_classes = [IsBrandUser]
 
     def get_queryset(self):
-        return Contest.objects.filter(brand=self.request.user)
+        return Contest.objects.for_listing().filter(brand=self.request.user)
     
     def perform_update(self, serializer):
         instance = serializer.instance
@@ -39,11 +41,14 @@ class BrandContestDetailView(generics.RetrieveUpdateDestroyAPIView):
 class BrandContestSubmissionsView(generics.ListAPIView):
     serializer_class = SubmissionSerializer
     permission_classes = [IsBrandUser]
+    page_size = 50
 
     def get_queryset(self):
         contest_id = self.kwargs.get('contest_id')
         contest = get_object_or_404(Contest, id=contest_id, brand=self.request.user)
-        return Submission.objects.filter(contest=contest).order_by('-created_at')
+        return Submission.objects.filter(contest=contest).select_related(
+            'creator', 'contest'
+        ).order_by('-created_at', '-id')
 
 class BrandSubmissionUpdateView(generics.UpdateAPIView):
     serializer_class = SubmissionSerializer
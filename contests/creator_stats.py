@@ -0,0 +1,127 @@
+"""
+Incremental maintenance of the ``CreatorStats`` rollup.
+
+Signal handlers describe a change as the difference between what a row
+contributed to its creator's totals before and after the change and call
+``apply_deltas``, which turns it into a single ``F()`` UPDATE. A creator
+without a stats row yet gets one computed from scratch by
+``rebuild_creator_stats`` instead, so the first update is always exact.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import Contest, CreatorStats, Submission
+
+
+def submission_contribution(status, contest_status):
+    """The totals one submission adds to its creator's stats."""
+    return Counter({
+        'total_submissions': 1,
+        'contests_won': int(status == Submission.Status.WON),
+        'finalist_entries': int(status == Submission.Status.FINALIST),
+        'active_submissions': int(contest_status == Contest.Status.LIVE),
+    })
+
+
+def difference(after, before):
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return {field: delta for field, delta in deltas.items() if delta}
+
+
+def apply_deltas(creator_id, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = CreatorStats.objects.filter(pk=creator_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        rebuild_creator_stats([creator_id])
+
+
+def apply_bulk_deltas(deltas_by_creator):
+    """Apply ``{creator_id: {field: delta}}``, one UPDATE per distinct delta."""
+    grouped = defaultdict(list)
+    for creator_id, deltas in deltas_by_creator.items():
+        key = tuple(sorted((field, delta) for field, delta in deltas.items() if delta))
+        if key:
+            grouped[key].append(creator_id)
+    for key, creator_ids in grouped.items():
+        updated = set(CreatorStats.objects.filter(pk__in=creator_ids).values_list('pk', flat=True))
+        CreatorStats.objects.filter(pk__in=updated).update(
+            **{field: F(field) + delta for field, delta in key}
+        )
+        missing = set(creator_ids) - updated
+        if missing:
+            rebuild_creator_stats(missing)
+
+
+def apply_contest_status_change(previous_statuses, status):
+    """
+    Adjust ``active_submissions`` after contests moved to ``status``.
+
+    ``previous_statuses`` maps each contest id to the status it had before.
+    """
+    is_live = status == Contest.Status.LIVE
+    changed = [pk for pk, previous in previous_statuses.items() if (previous == Contest.Status.LIVE) != is_live]
+    if not changed:
+        return
+    delta = 1 if is_live else -1
+    per_creator = Counter(
+        Submission.objects.filter(contest_id__in=changed).values_list('creator_id', flat=True)
+    )
+    apply_bulk_deltas({
+        creator_id: {'active_submissions': count * delta} for creator_id, count in per_creator.items()
+    })
+
+
+def rebuild_creator_stats(creator_ids=None):
+    """Recompute stats rows from the source tables. Returns the number of rows written."""
+    from videos.models import Video
+
+    submissions = Submission.objects.all()
+    videos = Video.objects.all()
+    if creator_ids is None:
+        # Existing rows are reset too, in case their creator has nothing left
+        creator_ids = list(CreatorStats.objects.values_list('pk', flat=True))
+    else:
+        submissions = submissions.filter(creator_id__in=creator_ids)
+        videos = videos.filter(creator_id__in=creator_ids)
+    totals = {creator_id: CreatorStats(creator_id=creator_id) for creator_id in creator_ids}
+    for row in submissions.values('creator_id').annotate(
+        total=Count('id'),
+        won=Count('id', filter=Q(status=Submission.Status.WON)),
+        finalist=Count('id', filter=Q(status=Submission.Status.FINALIST)),
+        active=Count('id', filter=Q(contest__status=Contest.Status.LIVE)),
+    ).order_by():
+        stats = totals.setdefault(row['creator_id'], CreatorStats(creator_id=row['creator_id']))
+        stats.total_submissions = row['total']
+        stats.contests_won = row['won']
+        stats.finalist_entries = row['finalist']
+        stats.active_submissions = row['active']
+    for row in videos.values('creator_id').annotate(
+        standalone=Count('id', filter=Q(is_standalone=True)),
+        views=Sum('views'),
+    ).order_by():
+        stats = totals.setdefault(row['creator_id'], CreatorStats(creator_id=row['creator_id']))
+        stats.standalone_videos = row['standalone']
+        stats.total_views = row['views'] or 0
+
+    fields = [
+        'total_submissions', 'standalone_videos', 'contests_won',
+        'finalist_entries', 'active_submissions', 'total_views',
+    ]
+    CreatorStats.objects.bulk_create(
+        totals.values(), update_conflicts=True, unique_fields=['creator'], update_fields=fields
+    )
+    return len(totals)
+
+
+def get_creator_stats(creator):
+    try:
+        return CreatorStats.objects.get(pk=creator.pk)
+    except CreatorStats.DoesNotExist:
+        rebuild_creator_stats([creator.pk])
+        return CreatorStats.objects.get(pk=creator.pk)
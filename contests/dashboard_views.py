@@ -2,9 +2,10 @@ from decimal import Decimal
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q, Sum
+from django.db.models import Prefetch, Q, Sum
 from django.core.exceptions import ObjectDoesNotExist
 from .models import Contest, Submission
+from .creator_stats import get_creator_stats
 from .serializers import ContestSerializer, SubmissionSerializer
 from accounts.serializers import CreatorProfileSerializer
 
@@ -21,75 +22,59 @@ class CreatorDashboardView(APIView):
             profile = user.creator_profile
             profile_data = CreatorProfileSerializer(profile).data
 
-            # Get running contests (contests that are live and user has submitted to)
-            running_submissions = Submission.objects.filter(
-                creator=user,
-                contest__status='live'
-            ).select_related('contest')
-            running_contests_data = [
-                {
-                    'contest': ContestSerializer(submission.contest).data,
-                    'submission': SubmissionSerializer(submission).data
-                }
-                for submission in running_submissions
-            ]
-
-            # Get contests user has applied to
-            applied_submissions = Submission.objects.filter(
-                creator=user
-            ).exclude(
-                contest__status='live'
-            ).select_related('contest')
-            applied_contests_data = [
-                {
-                    'contest': ContestSerializer(submission.contest).data,
-                    'submission': SubmissionSerializer(submission).data
-                }
-                for submission in applied_submissions
-            ]
-
-            # Get ended contests (where user submitted and contest is completed)
-            ended_submissions = Submission.objects.filter(
-                creator=user,
-                contest__status__in=['completed', 'closed']
-            ).select_related('contest')
-            ended_contests_data = [
-                {
-                    'contest': ContestSerializer(submission.contest).data,
-                    'submission': SubmissionSerializer(submission).data,
-                    'result': submission.status  # Show if they won, were finalist, etc.
-                }
-                for submission in ended_submissions
-            ]
-
-            # Get all submissions by the creator
-            submissions = Submission.objects.filter(
-                creator=user
-            ).order_by('-created_at')
-            
+            # Every submission with its contest (and the contest's counts) in one prefetched query
+            submissions = list(
+                Submission.objects.filter(creator=user)
+                .select_related('creator')
+                .prefetch_related(Prefetch('contest', queryset=Contest.objects.for_listing()))
+                .order_by('-created_at')
+            )
+            contests_data = {}
+            submissions_data = SubmissionSerializer(submissions, many=True).data
+            running_contests_data = []
+            applied_contests_data = []
+            ended_contests_data = []
+            for submission, submission_data in zip(submissions, submissions_data):
+                contest = submission.contest
+                if contest.pk not in contests_data:
+                    contests_data[contest.pk] = ContestSerializer(contest).data
+                entry = {'contest': contests_data[contest.pk], 'submission': submission_data}
+                if contest.status == 'live':
+                    # Running contests (contests that are live and user has submitted to)
+                    running_contests_data.append(entry)
+                else:
+                    # Contests user has applied to
+                    applied_contests_data.append(entry)
+                if contest.status in ('completed', 'closed'):
+                    # Ended contests; show if they won, were finalist, etc.
+                    ended_contests_data.append({**entry, 'result': submission.status})
+
             # Get all standalone videos by the creator
             from videos.models import Video
             from videos.serializers import VideoSerializer
-            
+
             standalone_videos = Video.objects.filter(
                 creator=user,
                 is_standalone=True
+            ).select_related(
+                'creator__creator_profile', 'submission'
+            ).prefetch_related(
+                Prefetch('contest', queryset=Contest.objects.for_listing())
             ).order_by('-created_at')
-            
-            # Combine submission data and standalone video data
-            submissions_data = SubmissionSerializer(submissions, many=True).data
             standalone_videos_data = VideoSerializer(standalone_videos, many=True).data
-            
+
             # Combine all videos data
-            videos_data = submissions_data + standalone_videos_data
+            videos_data = list(submissions_data) + list(standalone_videos_data)
 
-            # Aggregate stats
+            # Aggregate stats come from the precomputed rollup
+            creator_stats = get_creator_stats(user)
             stats = {
-                'total_submissions': submissions.count(),
-                'total_videos': submissions.count() + standalone_videos.count(),
-                'contests_won': submissions.filter(status='won').count(),
-                'active_submissions': running_submissions.count(),
-                'finalist_entries': submissions.filter(status='finalist').count(),
+                'total_submissions': creator_stats.total_submissions,
+                'total_videos': creator_stats.total_submissions + creator_stats.standalone_videos,
+                'contests_won': creator_stats.contests_won,
+                'active_submissions': creator_stats.active_submissions,
+                'finalist_entries': creator_stats.finalist_entries,
+                'total_views': creator_stats.total_views,
             }
 
             return Response({
@@ -0,0 +1,74 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from contests.models import Contest
+from contests.serializers import ContestSerializer
+from .benchmark_search import REGIONS, WORDS
+
+
+class Command(BaseCommand):
+    help = 'Benchmark contest list rendering at different fragment cache hit ratios (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20, help='Contests per page')
+        parser.add_argument('--ratios', type=float, nargs='+', default=[0.0, 0.5, 0.9, 1.0],
+                            help='Fraction of the page whose fragments are cached')
+        parser.add_argument('--runs', type=int, default=50, help='Pages rendered per ratio')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size, runs = options['page_size'], options['runs']
+        with transaction.atomic():
+            self.populate(size, rng)
+            page = Contest.objects.for_listing().order_by('-created_at')[:size]
+            with override_settings(FRAGMENT_CACHE_ENABLED=False):
+                baseline = self.render(page, runs, 0, rng)
+            self.stdout.write(f'{"no cache":>9}: {baseline:8.2f} ms/page')
+            for ratio in options['ratios']:
+                ms = self.render(page, runs, ratio, rng)
+                self.stdout.write(f'{ratio:>8.0%} hit: {ms:8.2f} ms/page ({baseline / max(ms, 0.001):.1f}x)')
+            transaction.set_rollback(True)
+
+    def populate(self, size, rng):
+        brand = User.objects.create_user(
+            email='benchmark-fragments@example.com', password=None, role='brand', is_active=True
+        )
+        deadline = timezone.now() + timedelta(days=30)
+        Contest.objects.bulk_create([
+            Contest(
+                title=' '.join(rng.sample(WORDS, 4)).title(),
+                description=' '.join(rng.choices(WORDS, k=60)),
+                brief=' '.join(rng.choices(WORDS, k=20)),
+                rules=' '.join(rng.choices(WORDS, k=40)),
+                brand=brand,
+                prize=rng.randint(100, 5000),
+                deadline=deadline,
+                status='live',
+                region=rng.choice(REGIONS),
+            )
+            for _ in range(size)
+        ])
+
+    def render(self, page, runs, ratio, rng):
+        """Average ms to load and serialize ``page`` with ``ratio`` of its fragments cached."""
+        contests = list(page)
+        serializer = ContestSerializer()
+        keys = [serializer.fragment_key(contest) for contest in contests]
+        elapsed = 0.0
+        for _ in range(runs):
+            cache.delete_many([key for key in keys if key])
+            warm = rng.sample(contests, round(len(contests) * ratio))
+            ContestSerializer(warm, many=True).data
+            started = time.perf_counter()
+            ContestSerializer(list(page.all()), many=True).data
+            elapsed += time.perf_counter() - started
+        return elapsed * 1000 / runs
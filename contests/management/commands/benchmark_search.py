@@ -0,0 +1,85 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from contests.models import Contest, ContestSearchDocument
+from contests.search import like_search, search_contests
+
+WORDS = (
+    'summer launch product review unboxing travel fitness recipe skincare fashion '
+    'music dance comedy tutorial gaming coffee sneaker outdoor family pet garden '
+    'holiday beach city mountain running cycling yoga makeup smartphone camera '
+    'drone electric vehicle sustainable organic vegan festival concert podcast '
+    'animation documentary motion graphics stopmotion cinematic vlog challenge'
+).split()
+REGIONS = ['Kenya', 'Nigeria', 'Ghana', 'South Africa', 'Global']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark indexed contest search against the icontains scan (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='Number of contests to benchmark with')
+        parser.add_argument('--queries', type=int, default=20, help='Queries per run')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        queries = [rng.choice(WORDS) for _ in range(options['queries'])]
+        self.stdout.write(f'Database: {connection.vendor}')
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.populate(size, rng)
+                like_ms = self.run_queries(like_search, queries)
+                indexed_ms = self.run_queries(search_contests, queries)
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{size:>8} contests: LIKE {like_ms:8.2f} ms/query, '
+                f'indexed {indexed_ms:8.2f} ms/query ({like_ms / max(indexed_ms, 0.001):.1f}x)'
+            )
+
+    def populate(self, size, rng):
+        brand = User.objects.create_user(
+            email=f'benchmark-{size}@example.com', password=None, role='brand', is_active=True
+        )
+        deadline = timezone.now() + timedelta(days=30)
+        for start in range(0, size, 1000):
+            contests = Contest.objects.bulk_create([
+                Contest(
+                    title=' '.join(rng.sample(WORDS, 4)).title(),
+                    description=' '.join(rng.choices(WORDS, k=60)),
+                    brief=' '.join(rng.choices(WORDS, k=20)),
+                    brand=brand,
+                    prize=rng.randint(100, 5000),
+                    deadline=deadline,
+                    status=rng.choice(['upcoming', 'live']),
+                    region=rng.choice(REGIONS),
+                )
+                for _ in range(min(1000, size - start))
+            ])
+            ContestSearchDocument.objects.bulk_create([
+                ContestSearchDocument(
+                    contest=contest,
+                    title=contest.title,
+                    description=contest.description,
+                    brief=contest.brief,
+                    brand_name='Benchmark Brand',
+                    region=contest.region,
+                    language=contest.language,
+                )
+                for contest in contests
+            ])
+
+    def run_queries(self, search, queries):
+        started = time.perf_counter()
+        for query in queries:
+            results = search(Contest.objects.filter(status__in=['upcoming', 'live']), query)
+            results.count()
+            list(results.order_by('-search_rank', '-created_at')[:20])
+        return (time.perf_counter() - started) * 1000 / len(queries)
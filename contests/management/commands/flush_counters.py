@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ocontest import counters
+
+
+class Command(BaseCommand):
+    help = 'Write buffered view/like counters to the database (run on shutdown or deploy)'
+
+    def handle(self, *args, **options):
+        backend = getattr(settings, 'COUNTER_BUFFER_BACKEND', 'memory')
+        if backend == 'memory':
+            self.stdout.write(self.style.WARNING(
+                'COUNTER_BUFFER_BACKEND is "memory": each web process flushes its own '
+                'buffer on exit, so there is nothing to flush from here.'
+            ))
+        updated = counters.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed buffered counters ({updated} rows updated).'))
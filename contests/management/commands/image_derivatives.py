@@ -0,0 +1,55 @@
+from PIL import Image, UnidentifiedImageError
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from ocontest import images
+
+
+def _walk(storage, directory):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        yield f'{directory}/{filename}'
+    for child in directories:
+        yield from _walk(storage, f'{directory}/{child}')
+
+
+class Command(BaseCommand):
+    help = 'Build the resized copies of uploaded images, or purge them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--presets', nargs='+', help='Only these presets')
+        parser.add_argument('--regenerate', action='store_true', help='Rebuild derivatives that already exist')
+        parser.add_argument('--purge', action='store_true',
+                            help='Delete every derivative first; add --regenerate to build them again')
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            purged = 0
+            for name in _walk(default_storage, images.DERIVATIVE_DIR):
+                default_storage.delete(name)
+                purged += 1
+            self.stdout.write(f'Purged {purged} derivatives.')
+            if not options['regenerate']:
+                return
+
+        written = failed = originals = 0
+        for model, field_name, presets in images.tracked_fields():
+            if options['presets']:
+                presets = [preset for preset in presets if preset in options['presets']]
+            if not presets:
+                continue
+            names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for name in names.values_list(field_name, flat=True).distinct().iterator():
+                storage = model._meta.get_field(field_name).storage
+                originals += 1
+                try:
+                    written += images.generate_derivatives(storage, name, presets, overwrite=options['regenerate'])
+                except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+                    failed += 1
+                    self.stderr.write(f'{name}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {originals} images: wrote {written} derivatives, {failed} images failed.'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from contests.creator_stats import rebuild_creator_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the creator dashboard stats rollup from submissions and videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('creator_ids', nargs='*', type=int, help='Only these creators (default: all)')
+
+    def handle(self, *args, **options):
+        written = rebuild_creator_stats(options['creator_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} creators.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from contests.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the contest full-text search documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Documents written per INSERT')
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} contests.'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0007_contestapplication_contest_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['-created_at', '-id'], name='contests_co_created_444932_idx'),
+        ),
+    ]
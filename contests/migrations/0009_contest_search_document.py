@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE contests_contestsearchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(brand_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(brief, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(region, '') || ' ' || coalesce(language, '')), 'D')
+    ) STORED
+    """,
+    'CREATE INDEX contests_search_vector_gin ON contests_contestsearchdocument USING GIN (search_vector)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS contests_search_vector_gin',
+    'ALTER TABLE contests_contestsearchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE contests_contest_fts USING fts5(
+        title, brand_name, brief, description, region, language,
+        content='contests_contestsearchdocument',
+        content_rowid='contest_id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER contests_contest_fts_ai AFTER INSERT ON contests_contestsearchdocument BEGIN
+        INSERT INTO contests_contest_fts(rowid, title, brand_name, brief, description, region, language)
+        VALUES (new.contest_id, new.title, new.brand_name, new.brief, new.description, new.region, new.language);
+    END
+    """,
+    """
+    CREATE TRIGGER contests_contest_fts_ad AFTER DELETE ON contests_contestsearchdocument BEGIN
+        INSERT INTO contests_contest_fts(contests_contest_fts, rowid, title, brand_name, brief, description, region, language)
+        VALUES ('delete', old.contest_id, old.title, old.brand_name, old.brief, old.description, old.region, old.language);
+    END
+    """,
+    """
+    CREATE TRIGGER contests_contest_fts_au AFTER UPDATE ON contests_contestsearchdocument BEGIN
+        INSERT INTO contests_contest_fts(contests_contest_fts, rowid, title, brand_name, brief, description, region, language)
+        VALUES ('delete', old.contest_id, old.title, old.brand_name, old.brief, old.description, old.region, old.language);
+        INSERT INTO contests_contest_fts(rowid, title, brand_name, brief, description, region, language)
+        VALUES (new.contest_id, new.title, new.brand_name, new.brief, new.description, new.region, new.language);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS contests_contest_fts_au',
+    'DROP TRIGGER IF EXISTS contests_contest_fts_ad',
+    'DROP TRIGGER IF EXISTS contests_contest_fts_ai',
+    'DROP TABLE IF EXISTS contests_contest_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+def build_documents(apps, schema_editor):
+    Contest = apps.get_model('contests', 'Contest')
+    ContestSearchDocument = apps.get_model('contests', 'ContestSearchDocument')
+    BrandProfile = apps.get_model('accounts', 'BrandProfile')
+
+    company_names = dict(BrandProfile.objects.values_list('user_id', 'company_name'))
+    documents = [
+        ContestSearchDocument(
+            contest_id=contest.id,
+            title=contest.title,
+            description=contest.description,
+            brief=contest.brief,
+            # Historical models have no get_full_name(); this is what it returns
+            brand_name=(
+                company_names.get(contest.brand_id)
+                or f'{contest.brand.first_name} {contest.brand.last_name}'.strip()
+            ),
+            region=contest.region,
+            language=contest.language,
+        )
+        for contest in Contest.objects.select_related('brand').iterator()
+    ]
+    ContestSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_add_social_media_fields'),
+        ('contests', '0008_feed_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContestSearchDocument',
+            fields=[
+                ('contest', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='contests.contest')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('brief', models.TextField(blank=True)),
+                ('brand_name', models.CharField(blank=True, max_length=200)),
+                ('region', models.CharField(blank=True, max_length=100)),
+                ('language', models.CharField(blank=True, max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
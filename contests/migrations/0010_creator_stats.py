@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_add_social_media_fields'),
+        ('contests', '0009_contest_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorStats',
+            fields=[
+                ('creator', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='creator_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_submissions', models.PositiveIntegerField(default=0)),
+                ('standalone_videos', models.PositiveIntegerField(default=0)),
+                ('contests_won', models.PositiveIntegerField(default=0)),
+                ('finalist_entries', models.PositiveIntegerField(default=0)),
+                ('active_submissions', models.PositiveIntegerField(default=0, help_text='Submissions to live contests')),
+                ('total_views', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Creator Stats',
+                'verbose_name_plural': 'Creator Stats',
+            },
+        ),
+    ]
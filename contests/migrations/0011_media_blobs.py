@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+import videos.blobs
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0010_creator_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='video_file',
+            field=models.FileField(storage=videos.blobs.blob_storage, upload_to='contest_videos/'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:08
+
+import ocontest.trending
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_scores(apps, schema_editor):
+    # Existing activity is counted as having happened when the contest was created
+    from ocontest.trending import combine, event_score
+
+    weights = settings.TRENDING_WEIGHTS
+    Contest = apps.get_model('contests', 'Contest')
+    contests = list(Contest.objects.annotate(submission_total=Count('submissions')))
+    for contest in contests:
+        score = event_score(weights['created'], contest.created_at)
+        activity = contest.view_count * weights['view'] + contest.submission_total * weights['submission']
+        if activity:
+            score = combine(score, event_score(activity, contest.created_at))
+        contest.trending_score = score
+    Contest.objects.bulk_update(contests, ['trending_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0011_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='trending_score',
+            field=models.FloatField(default=ocontest.trending.initial_score, editable=False),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['-trending_score', '-id'], name='contests_co_trendin_ca180d_idx'),
+        ),
+    ]
@@ -1,6 +1,49 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import Count, Prefetch, Q
 from django.utils.translation import gettext_lazy as _
+from ocontest import trending
+from videos.blobs import blob_storage
+
+
+class ContestQuerySet(models.QuerySet):
+    def with_submission_counts(self):
+        """Annotate total, approved and pending submission counts in one aggregate."""
+        return self.annotate(
+            submission_count=Count('submissions', distinct=True),
+            approved_submission_count=Count(
+                'submissions',
+                filter=Q(submissions__status='approved'),
+                distinct=True
+            ),
+            pending_submission_count=Count(
+                'submissions',
+                filter=Q(submissions__status='pending_approval'),
+                distinct=True
+            ),
+        )
+
+    def with_approved_submissions(self):
+        """Prefetch approved submissions into ``approved_submissions``."""
+        return self.prefetch_related(
+            Prefetch(
+                'submissions',
+                queryset=Submission.objects.filter(status='approved').select_related('creator', 'contest'),
+                to_attr='approved_submissions'
+            )
+        )
+
+    def for_listing(self):
+        """Queryset used by every contest list endpoint."""
+        return self.select_related('brand').with_submission_counts()
+
+    def featured(self):
+        """The featured open contests, newest first, as ``FeaturedContestSerializer`` reads them."""
+        return self.select_related('brand__brand_profile').filter(
+            is_featured=True,
+            status__in=['upcoming', 'live']
+        ).order_by('-created_at')
+
 
 class Contest(models.Model):
     class Status(models.TextChoices):
@@ -36,10 +79,48 @@ class Contest(models.Model):
     is_featured = models.BooleanField(default=False)
     thumbnail = models.ImageField(upload_to='contest_thumbnails/', blank=True)
     view_count = models.PositiveIntegerField(default=0)
+    # Time-decayed activity, see ocontest/trending.py
+    trending_score = models.FloatField(default=trending.initial_score, editable=False)
+
+    objects = ContestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination on the public contest feed
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['-trending_score', '-id']),
+        ]
 
     def __str__(self):
         return self.title
 
+class ContestSearchDocument(models.Model):
+    """
+    Denormalised text searched by ``contests.search``.
+
+    One row per contest, kept in sync by the signals in ``contests.signals``.
+    The full-text index itself is database specific (a generated tsvector
+    column with a GIN index on PostgreSQL, an FTS5 table on SQLite) and is
+    created by migration 0009.
+    """
+    contest = models.OneToOneField(
+        Contest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    brief = models.TextField(blank=True)
+    brand_name = models.CharField(max_length=200, blank=True)
+    region = models.CharField(max_length=100, blank=True)
+    language = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Search document for {self.title}'
+
+
 class Submission(models.Model):
     class Status(models.TextChoices):
         PENDING_APPROVAL = 'pending_approval', _('Pending Approval')
@@ -63,7 +144,7 @@ class Submission(models.Model):
     )
     title = models.CharField(max_length=200)
     description = models.TextField()
-    video_file = models.FileField(upload_to='contest_videos/')
+    video_file = models.FileField(upload_to='contest_videos/', storage=blob_storage)
     thumbnail = models.ImageField(upload_to='submission_thumbnails/', blank=True)
     status = models.CharField(
         max_length=20,
@@ -162,3 +243,33 @@ class ContestApplication(models.Model):
                         raise
         
         super().save(*args, **kwargs)
+
+
+class CreatorStats(models.Model):
+    """
+    Per-creator dashboard totals.
+
+    Kept up to date incrementally by ``contests.creator_stats`` from the
+    submission, contest and video signals; ``manage.py rebuild_creator_stats``
+    recomputes them from scratch.
+    """
+    creator = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='creator_stats'
+    )
+    total_submissions = models.PositiveIntegerField(default=0)
+    standalone_videos = models.PositiveIntegerField(default=0)
+    contests_won = models.PositiveIntegerField(default=0)
+    finalist_entries = models.PositiveIntegerField(default=0)
+    active_submissions = models.PositiveIntegerField(default=0, help_text='Submissions to live contests')
+    total_views = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Creator Stats'
+        verbose_name_plural = 'Creator Stats'
+
+    def __str__(self):
+        return f'Stats for {self.creator_id}'
@@ -0,0 +1,136 @@
+"""
+Full-text contest search.
+
+Every contest has a ``ContestSearchDocument`` holding the text that is worth
+searching (title, description, brief, brand company name, region, language).
+Migration 0009 builds a database specific index over those documents:
+
+* PostgreSQL: a generated, weighted ``tsvector`` column with a GIN index,
+  queried with ``SearchQuery``/``SearchRank``.
+* SQLite: an external-content FTS5 table kept in sync by triggers and ranked
+  with ``bm25()``.
+
+Any other database falls back to ``icontains`` over the documents.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+
+from accounts.models import BrandProfile
+from .models import Contest, ContestSearchDocument
+
+# Per-column bm25 weights, in the column order of contests_contest_fts
+FTS5_WEIGHTS = '10.0, 10.0, 4.0, 2.0, 1.0, 1.0'
+
+
+def build_document(contest):
+    """Return an unsaved search document for ``contest``."""
+    brand_name = ''
+    try:
+        brand_name = contest.brand.brand_profile.company_name
+    except BrandProfile.DoesNotExist:
+        pass
+    return ContestSearchDocument(
+        contest=contest,
+        title=contest.title,
+        description=contest.description,
+        brief=contest.brief,
+        brand_name=brand_name or contest.brand.get_full_name(),
+        region=contest.region,
+        language=contest.language,
+    )
+
+
+def index_contest(contest):
+    document = build_document(contest)
+    ContestSearchDocument.objects.update_or_create(
+        contest=contest,
+        defaults={
+            field: getattr(document, field)
+            for field in ('title', 'description', 'brief', 'brand_name', 'region', 'language')
+        }
+    )
+
+
+def rebuild_index(batch_size=500):
+    """Recreate every search document. Returns the number of documents written."""
+    ContestSearchDocument.objects.all().delete()
+    contests = Contest.objects.select_related('brand__brand_profile').order_by('pk')
+    batch = []
+    total = 0
+    for contest in contests.iterator(chunk_size=batch_size):
+        batch.append(build_document(contest))
+        if len(batch) >= batch_size:
+            ContestSearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        ContestSearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _postgres_search(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+    search_query = SearchQuery(query, config='english', search_type='websearch')
+    documents = ContestSearchDocument.objects.annotate(
+        vector=RawSQL('search_vector', [], output_field=SearchVectorField())
+    ).filter(vector=search_query)
+    rank = documents.filter(contest_id=OuterRef('pk')).annotate(
+        rank=SearchRank(F('vector'), search_query)
+    ).values('rank')[:1]
+    return queryset.filter(pk__in=documents.values('contest_id')).annotate(
+        search_rank=Subquery(rank, output_field=FloatField())
+    )
+
+
+def _fts5_match(query):
+    tokens = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _sqlite_search(queryset, query):
+    match = _fts5_match(query)
+    if not match:
+        return queryset.none()
+    table = Contest._meta.db_table
+    return queryset.filter(
+        pk__in=RawSQL('SELECT rowid FROM contests_contest_fts WHERE contests_contest_fts MATCH %s', [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT -bm25(contests_contest_fts, {FTS5_WEIGHTS}) FROM contests_contest_fts '
+            f'WHERE contests_contest_fts MATCH %s AND rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField()
+        )
+    )
+
+
+def like_search(queryset, query):
+    """Unindexed ``icontains`` scan; the fallback and the benchmark baseline."""
+    matches = ContestSearchDocument.objects.filter(
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(brief__icontains=query) |
+        Q(brand_name__icontains=query)
+    )
+    return queryset.filter(pk__in=matches.values('contest_id')).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def search_contests(queryset, query):
+    """Filter ``queryset`` to contests matching ``query``, best matches first."""
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == 'postgresql':
+        results = _postgres_search(queryset, query)
+    elif connection.vendor == 'sqlite':
+        results = _sqlite_search(queryset, query)
+    else:
+        results = like_search(queryset, query)
+    return results.order_by('-search_rank', '-created_at', '-id')
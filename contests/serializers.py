@@ -1,20 +1,41 @@
 from rest_framework import serializers
 from .models import Contest, Submission, ContestApplication
 from accounts.models import Product
+from ocontest.counters import LiveCounterField, LiveCounterListSerializer
+from ocontest.fragments import FragmentCacheMixin, FragmentListSerializer
+from ocontest.images import ImageVariantsField
 
-class ContestSerializer(serializers.ModelSerializer):
+
+def _annotated_count(obj, name, **filters):
+    """Read a count annotated by ``ContestQuerySet``, querying only if it is missing."""
+    value = getattr(obj, name, None)
+    if value is None:
+        value = obj.submissions.filter(**filters).count()
+    return value
+
+
+class ContestSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    fragment_volatile = (
+        'brand_name', 'view_count', 'submission_count', 'approved_submission_count', 'pending_submission_count',
+    )
+    thumbnail_variants = ImageVariantsField(source='thumbnail', presets=('card', 'full'))
     brand_name = serializers.CharField(source='brand.get_full_name', read_only=True)
+    view_count = LiveCounterField()
     submission_count = serializers.SerializerMethodField()
+    approved_submission_count = serializers.SerializerMethodField()
+    pending_submission_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Contest
         fields = [
             'id', 'title', 'description', 'brand', 'brand_name',
-            'prize', 'deadline', 'status', 'thumbnail', 'is_featured',
-            'view_count', 'submission_count', 'created_at', 'brief',
+            'prize', 'deadline', 'status', 'thumbnail', 'thumbnail_variants', 'is_featured',
+            'view_count', 'submission_count', 'approved_submission_count',
+            'pending_submission_count', 'created_at', 'brief',
             'inspiration', 'rules', 'region', 'language', 'max_entries'
         ]
         read_only_fields = ['brand', 'brand_info', 'status', 'view_count', 'submission_count', 'created_at']
+        list_serializer_class = FragmentListSerializer
 
     def validate_max_entries(self, value):
         if value is not None and value <= 0:
@@ -32,23 +53,32 @@ class ContestSerializer(serializers.ModelSerializer):
         return value
     
     def get_submission_count(self, obj):
-        return obj.submissions.count()
+        return _annotated_count(obj, 'submission_count')
+
+    def get_approved_submission_count(self, obj):
+        return _annotated_count(obj, 'approved_submission_count', status=Submission.Status.APPROVED)
+
+    def get_pending_submission_count(self, obj):
+        return _annotated_count(obj, 'pending_submission_count', status=Submission.Status.PENDING_APPROVAL)
 
 class FeaturedContestSerializer(serializers.ModelSerializer):
-    brand_name = serializers.CharField(source='brand.get_full_name', read_only=True)
+    thumbnail_variants = ImageVariantsField(source='thumbnail', presets=('card', 'full'))
+    brand_info = serializers.SerializerMethodField()
     prize_display = serializers.SerializerMethodField()
+    view_count = LiveCounterField()
 
     class Meta:
         model = Contest
         fields = [
             'id', 'title', 'brand_info', 'prize', 'prize_display',
-            'thumbnail', 'view_count', 'status'
+            'thumbnail', 'thumbnail_variants', 'view_count', 'status'
         ]
+        list_serializer_class = LiveCounterListSerializer
     
     def get_brand_info(self, obj):
         user = obj.brand
-        if hasattr(user, 'brandprofile') and user.brandprofile and user.brandprofile.company_name:
-            name = user.brandprofile.company_name
+        if hasattr(user, 'brand_profile') and user.brand_profile.company_name:
+            name = user.brand_profile.company_name
         elif user.first_name:
             name = user.first_name.split('(')[0].strip()
         else:
@@ -63,29 +93,43 @@ class FeaturedContestSerializer(serializers.ModelSerializer):
 
 
 class ContestDetailSerializer(serializers.ModelSerializer):
+    thumbnail_variants = ImageVariantsField(source='thumbnail', presets=('card', 'full'))
     brand_name = serializers.CharField(source='brand.get_full_name', read_only=True)
+    view_count = LiveCounterField()
     submission_count = serializers.SerializerMethodField()
+    approved_submission_count = serializers.SerializerMethodField()
+    pending_submission_count = serializers.SerializerMethodField()
     submissions = serializers.SerializerMethodField()
 
     class Meta:
         model = Contest
         fields = [
             'id', 'title', 'description', 'brand', 'brand_name',
-            'prize', 'deadline', 'status', 'thumbnail', 'is_featured',
-            'view_count', 'submission_count', 'submissions', 'rules',
+            'prize', 'deadline', 'status', 'thumbnail', 'thumbnail_variants', 'is_featured',
+            'view_count', 'submission_count', 'approved_submission_count',
+            'pending_submission_count', 'submissions', 'rules',
             'created_at', 'updated_at'
         ]
     
     def get_submission_count(self, obj):
-        return obj.submissions.count()
+        return _annotated_count(obj, 'submission_count')
+
+    def get_approved_submission_count(self, obj):
+        return _annotated_count(obj, 'approved_submission_count', status=Submission.Status.APPROVED)
+
+    def get_pending_submission_count(self, obj):
+        return _annotated_count(obj, 'pending_submission_count', status=Submission.Status.PENDING_APPROVAL)
     
     def get_submissions(self, obj):
-        # Only return approved submissions
-        submissions = obj.submissions.filter(status='approved')
+        # Only return approved submissions; list views prefetch them
+        submissions = getattr(obj, 'approved_submissions', None)
+        if submissions is None:
+            submissions = obj.submissions.filter(status='approved').select_related('creator', 'contest')
         return SubmissionSerializer(submissions, many=True).data
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    fragment_volatile = ('creator_name', 'contest_title')
     creator_name = serializers.SerializerMethodField()
     contest_title = serializers.CharField(source='contest.title', read_only=True)
     video_url = serializers.SerializerMethodField()
@@ -100,6 +144,7 @@ class SubmissionSerializer(serializers.ModelSerializer):
             'feedback', 'tags', 'created_at', 'updated_at', 'terms_accepted'
         ]
         read_only_fields = ['creator', 'status', 'feedback', 'terms_accepted_at']
+        list_serializer_class = FragmentListSerializer
 
     def get_creator_name(self, obj):
         if obj.creator:
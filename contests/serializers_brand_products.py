@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from accounts.models import Product
+from ocontest.images import ImageVariantsField
 
 class ProductSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image', presets=('card', 'full'))
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'status', 'stock_quantity']
+        fields = ['id', 'name', 'description', 'price', 'image', 'image_variants', 'status', 'stock_quantity']
         read_only_fields = ['id', 'created_at', 'updated_at']
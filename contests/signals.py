@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import BrandProfile
+from ocontest import trending
+from .models import Contest, Submission
+from . import creator_stats, search
+
+
+@receiver(pre_save, sender=Contest)
+def remember_previous_contest_status(sender, instance, **kwargs):
+    # post_save cannot see the old row any more, so keep the status it had
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = Contest.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Contest)
+def update_contest_search_document(sender, instance, **kwargs):
+    search.index_contest(instance)
+
+
+@receiver(post_save, sender=Contest)
+def update_active_submission_stats(sender, instance, created, **kwargs):
+    if created:
+        return
+    creator_stats.apply_contest_status_change(
+        {instance.pk: getattr(instance, '_previous_status', None)}, instance.status
+    )
+
+
+@receiver(post_save, sender=BrandProfile)
+def update_brand_search_documents(sender, instance, **kwargs):
+    # The company name is part of every search document of the brand's contests
+    for contest in Contest.objects.filter(brand_id=instance.user_id).select_related('brand'):
+        search.index_contest(contest)
+
+
+@receiver(pre_save, sender=Submission)
+def remember_submission_contribution(sender, instance, **kwargs):
+    instance._stats_before = None
+    if instance.pk:
+        before = Submission.objects.filter(pk=instance.pk).values_list(
+            'creator_id', 'status', 'contest__status'
+        ).first()
+        if before:
+            creator_id, status, contest_status = before
+            instance._stats_before = (creator_id, creator_stats.submission_contribution(status, contest_status))
+
+
+@receiver(post_save, sender=Submission)
+def update_submission_stats(sender, instance, **kwargs):
+    after = creator_stats.submission_contribution(instance.status, instance.contest.status)
+    before = getattr(instance, '_stats_before', None)
+    if before and before[0] != instance.creator_id:
+        creator_stats.apply_deltas(before[0], creator_stats.difference({}, before[1]))
+        before = None
+    creator_stats.apply_deltas(
+        instance.creator_id, creator_stats.difference(after, before[1] if before else {})
+    )
+
+
+@receiver(post_delete, sender=Submission)
+def remove_submission_stats(sender, instance, **kwargs):
+    contest_status = Contest.objects.filter(pk=instance.contest_id).values_list('status', flat=True).first()
+    creator_stats.apply_deltas(
+        instance.creator_id,
+        creator_stats.difference({}, creator_stats.submission_contribution(instance.status, contest_status))
+    )
+
+
+@receiver(post_save, sender=Submission)
+def rank_contest_on_submission(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record(Contest, {instance.contest_id: settings.TRENDING_WEIGHTS['submission']})
@@ -1,3 +1,798 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+from importlib import import_module
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.apps import apps
+from django.contrib import admin
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import BrandProfile, Product
+from ocontest import counters, fragments, images, response_cache, two_tier_cache
+from ocontest.testing import create_brand, create_contest, create_creator
+from videos.models import Video
+from .admin import ContestAdmin
+from .creator_stats import rebuild_creator_stats
+from .models import Contest, ContestSearchDocument, CreatorStats, Submission
+from .serializers import ContestDetailSerializer, ContestSerializer, FeaturedContestSerializer
+from .serializers_brand_products import ProductSerializer
+from .views import ContestDetailView
+
+
+class ContestListQueryCountTests(APITestCase):
+    """List endpoints must not issue a query per contest."""
+
+    def setUp(self):
+        self.brand = create_brand()
+        self.creators = [
+            create_creator(f'creator{i}@example.com')
+            for i in range(3)
+        ]
+
+    def create_contests(self, count):
+        for i in range(count):
+            contest = create_contest(self.brand, f'Contest {i}')
+            for creator, status in zip(self.creators, ['approved', 'pending_approval', 'rejected']):
+                Submission.objects.create(
+                    contest=contest,
+                    creator=creator,
+                    title='Entry',
+                    description='Entry description',
+                    video_file='contest_videos/entry.mp4',
+                    status=status,
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def assertConstantQueries(self, url):
+        self.create_contests(2)
+        small, _ = self.count_queries(url)
+        self.create_contests(6)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        return response
+
+    def test_contest_list(self):
+        response = self.assertConstantQueries(reverse('contests:contest-list'))
+        contest = response.data['results'][0]
+        self.assertEqual(contest['submission_count'], 3)
+        self.assertEqual(contest['approved_submission_count'], 1)
+        self.assertEqual(contest['pending_submission_count'], 1)
+
+    def test_active_contest_list(self):
+        self.assertConstantQueries(reverse('contests:active-contests'))
+
+    def test_contest_search(self):
+        self.assertConstantQueries(reverse('contests:contest-search'))
+
+    def test_brand_contest_list(self):
+        self.client.force_authenticate(self.brand)
+        response = self.assertConstantQueries(reverse('contests:brand-contest-list'))
+        self.assertEqual(len(response.data['results'][0]['submissions']), 1)
+
+    def test_contest_list_is_cursor_paginated(self):
+        self.create_contests(5)
+        url = reverse('contests:contest-list')
+        first = self.client.get(url, {'page_size': 3})
+        self.assertEqual(len(first.data['results']), 3)
+        self.assertNotIn('count', first.data)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 2)
+        ids = [c['id'] for c in first.data['results'] + second.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_page_size_is_capped(self):
+        self.create_contests(2)
+        with self.settings(API_MAX_PAGE_SIZE=1):
+            response = self.client.get(reverse('contests:active-contests'), {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_serializer_falls_back_without_annotation(self):
+        from .serializers import ContestSerializer
+
+        self.create_contests(1)
+        data = ContestSerializer(Contest.objects.get()).data
+        self.assertEqual(data['submission_count'], 3)
+        self.assertEqual(data['approved_submission_count'], 1)
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=0)
+class BufferedViewCountTests(APITestCase):
+    def setUp(self):
+        counters.buffer.clear()
+        brand = create_brand()
+        self.contest = create_contest(brand, 'Featured', is_featured=True)
+
+    def get_without_writes(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        writes = [q['sql'] for q in context.captured_queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+        return response
+
+    def test_detail_and_featured_views_are_buffered(self):
+        detail_url = reverse('contests:contest-detail', args=[self.contest.pk])
+        self.get_without_writes(detail_url)
+        response = self.get_without_writes(detail_url)
+        self.assertEqual(response.data['view_count'], 2)
+        featured = self.get_without_writes(reverse('contests:featured-contests'))
+        self.assertEqual(featured.data[0]['view_count'], 3)
+
+        self.contest.refresh_from_db()
+        self.assertEqual(self.contest.view_count, 0)
+        self.assertEqual(counters.flush(), 1)
+        self.contest.refresh_from_db()
+        self.assertEqual(self.contest.view_count, 3)
+        self.assertEqual(counters.live_value(self.contest, 'view_count'), 3)
+
+    def test_only_existing_contests_are_counted(self):
+        detail_url = reverse('contests:contest-detail', args=[self.contest.pk])
+        etag = self.get_without_writes(detail_url)['ETag']
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        missing_url = reverse('contests:contest-detail', args=[self.contest.pk + 1])
+        self.assertEqual(self.client.get(missing_url).status_code, 404)
+        self.assertEqual(
+            counters.buffer.pending(Contest, [self.contest.pk, self.contest.pk + 1], 'view_count'),
+            {self.contest.pk: 2, self.contest.pk + 1: 0}
+        )
+
+    @override_settings(COUNTER_BUFFER_BACKEND='cache')
+    def test_cache_backend_flush(self):
+        buffer = counters.CounterBuffer()
+        for _ in range(5):
+            buffer.increment(Contest, self.contest.pk, 'view_count')
+        self.assertEqual(buffer.pending(Contest, [self.contest.pk], 'view_count'), {self.contest.pk: 5})
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.pending(Contest, [self.contest.pk], 'view_count'), {self.contest.pk: 0})
+        buffer.increment(Contest, self.contest.pk, 'view_count')
+        buffer.flush()
+        self.contest.refresh_from_db()
+        self.assertEqual(self.contest.view_count, 6)
+
+    def test_list_reads_live_counters_once_per_page(self):
+        for _ in range(2):
+            create_contest(self.contest.brand, 'Another')
+        for contest in Contest.objects.all():
+            counters.increment(contest, 'view_count', contest.pk)
+
+        for serializer_class, contests in (
+            (ContestSerializer, Contest.objects.for_listing()),
+            (FeaturedContestSerializer, Contest.objects.all()),
+        ):
+            with mock.patch.object(counters.buffer.backend, 'pending', wraps=counters.buffer.backend.pending) as pending:
+                data = serializer_class(contests, many=True).data
+            self.assertEqual(pending.call_count, 1)
+            self.assertEqual({row['id']: row['view_count'] for row in data}, {row['id']: row['id'] for row in data})
+
+    def test_cache_backend_collect_waits_for_unwritten_slots(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        backend = counters.CacheCounterBackend()
+        key = counters.make_key(Contest, self.contest.pk, 'view_count')
+        other = counters.make_key(Contest, self.contest.pk + 1, 'view_count')
+        # Another worker has taken a slot number for this counter but not written the slot yet
+        cache.set(backend._delta_key(key), 2, timeout=None)
+        cache.set(backend._dirty_key(key), 1, timeout=None)
+        cache.set('counters:seq', 1, timeout=None)
+        backend.incr(other, 1)
+
+        self.assertEqual(backend.collect(), {})
+        cache.set(backend._slot_key(1), key, timeout=None)
+        self.assertEqual(backend.collect(), {key: 2, other: 1})
+
+        # A slot its worker never wrote is given up on after register_timeout
+        cache.incr('counters:seq')
+        backend.incr(key, 1)
+        self.assertEqual(backend.collect(), {})
+        with mock.patch.object(counters.time, 'time', return_value=time.time() + backend.register_timeout):
+            with self.assertLogs('ocontest.counters', 'WARNING'):
+                self.assertEqual(backend.collect(), {key: 3})
+
+
+class ContestSearchTests(APITestCase):
+    def setUp(self):
+        self.brand = create_brand()
+        self.brand.brand_profile.company_name = 'Acme Sneakers'
+        self.brand.brand_profile.save()
+
+    def create_contest(self, title, description='Description', status=Contest.Status.LIVE):
+        return create_contest(self.brand, title, description=description, status=status)
+
+    def search(self, query):
+        response = self.client.get(reverse('contests:contest-search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [contest['title'] for contest in response.data['results']]
+
+    def test_ranks_title_matches_first(self):
+        self.create_contest('Cooking show', description='A summer recipe challenge')
+        self.create_contest('Summer launch')
+        self.create_contest('Unrelated')
+        self.assertEqual(self.search('summer'), ['Summer launch', 'Cooking show'])
+
+    def test_matches_brand_company_name_and_prefixes(self):
+        self.create_contest('Launch video')
+        self.assertEqual(self.search('acme'), ['Launch video'])
+        self.assertEqual(self.search('sneak'), ['Launch video'])
+
+    def test_document_follows_contest_and_brand_updates(self):
+        contest = self.create_contest('Old title')
+        contest.title = 'Fresh title'
+        contest.save()
+        self.assertEqual(self.search('old'), [])
+        self.assertEqual(self.search('fresh'), ['Fresh title'])
+
+        self.brand.brand_profile.company_name = 'Globex'
+        self.brand.brand_profile.save()
+        self.assertEqual(self.search('globex'), ['Fresh title'])
+
+    def test_excludes_closed_contests(self):
+        self.create_contest('Summer closed', status=Contest.Status.CLOSED)
+        self.assertEqual(self.search('summer'), [])
+
+    def test_migration_backfill_matches_the_signal(self):
+        nameless = create_brand('nameless@example.com', first_name='Jane', last_name='Doe')
+        create_contest(nameless, 'Unbranded')
+        self.create_contest('Branded')
+        indexed = dict(ContestSearchDocument.objects.values_list('contest__title', 'brand_name'))
+
+        ContestSearchDocument.objects.all().delete()
+        import_module('contests.migrations.0009_contest_search_document').build_documents(apps, None)
+        backfilled = dict(ContestSearchDocument.objects.values_list('contest__title', 'brand_name'))
+        self.assertEqual(backfilled, indexed)
+        self.assertEqual(backfilled['Unbranded'], 'Jane Doe')
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=0)
+class CreatorDashboardTests(APITestCase):
+    def setUp(self):
+        counters.buffer.clear()
+        self.brand = create_brand()
+        self.creator = create_creator()
+        self.client.force_authenticate(user=self.creator)
+        self.url = reverse('contests:creator-dashboard')
+
+    def create_contest(self, status=Contest.Status.LIVE):
+        return create_contest(self.brand, status=status)
+
+    def create_entries(self, count):
+        for i in range(count):
+            contest = self.create_contest(Contest.Status.LIVE if i % 2 else Contest.Status.COMPLETED)
+            Submission.objects.create(
+                contest=contest, creator=self.creator, title='Entry', description='Entry',
+                video_file='contest_videos/entry.mp4',
+                status=[Submission.Status.WON, Submission.Status.FINALIST, Submission.Status.APPROVED][i % 3]
+            )
+            Video.objects.create(
+                title='Reel', description='Reel', creator=self.creator,
+                url='videos/reel.mp4', is_standalone=True
+            )
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def assertStatsMatchRebuild(self):
+        incremental = CreatorStats.objects.filter(pk=self.creator.pk).values().get()
+        rebuild_creator_stats([self.creator.pk])
+        rebuilt = CreatorStats.objects.filter(pk=self.creator.pk).values().get()
+        incremental.pop('updated_at'), rebuilt.pop('updated_at')
+        self.assertEqual(incremental, rebuilt)
+
+    def test_query_count_does_not_grow_with_submissions(self):
+        self.create_entries(2)
+        small, _ = self.get_dashboard()
+        self.create_entries(6)
+        large, data = self.get_dashboard()
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['running_contests']) + len(data['applied_contests']), 8)
+        self.assertEqual(len(data['ended_contests']), 4)
+        self.assertEqual(len(data['videos']), 16)
+        self.assertEqual(data['stats'], {
+            'total_submissions': 8,
+            'total_videos': 16,
+            'contests_won': 3,
+            'active_submissions': 4,
+            'finalist_entries': 3,
+            'total_views': 0,
+        })
+
+    def test_rollup_follows_state_changes(self):
+        self.create_entries(3)
+        submission = Submission.objects.get(status=Submission.Status.APPROVED)
+        submission.status = Submission.Status.WON
+        submission.save()
+
+        live_contest = Contest.objects.filter(status=Contest.Status.LIVE).first()
+        live_contest.status = Contest.Status.COMPLETED
+        live_contest.save()
+
+        video = Video.objects.first()
+        for _ in range(5):
+            video.increment_views()
+        counters.flush()
+
+        Submission.objects.filter(status=Submission.Status.FINALIST).delete()
+
+        stats = CreatorStats.objects.get(pk=self.creator.pk)
+        self.assertEqual(stats.contests_won, 2)
+        self.assertEqual(stats.active_submissions, 0)
+        self.assertEqual(stats.finalist_entries, 0)
+        self.assertEqual(stats.total_submissions, 2)
+        self.assertEqual(stats.total_views, 5)
+        self.assertStatsMatchRebuild()
+
+    def test_admin_status_actions_update_rollup(self):
+        self.create_entries(4)
+        model_admin = ContestAdmin(Contest, admin.site)
+        request = RequestFactory().post('/')
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.mark_as_completed(request, Contest.objects.all())
+            self.assertEqual(CreatorStats.objects.get(pk=self.creator.pk).active_submissions, 0)
+            model_admin.mark_as_live(request, Contest.objects.all())
+        self.assertEqual(CreatorStats.objects.get(pk=self.creator.pk).active_submissions, 4)
+        self.assertStatsMatchRebuild()
+
+
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, BACKGROUND_TASKS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.brand = create_brand()
+
+    def image(self, size=(1200, 900), mode='RGBA'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128)[:len(mode)]).save(buffer, format='PNG')
+        return ContentFile(buffer.getvalue(), name='cover.png')
+
+    def create_contest(self, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_contest(self.brand, thumbnail=self.image(**extra))
+
+    def open_derivative(self, contest, preset, image_format):
+        path = os.path.join(self.media_root, images.derivative_name(contest.thumbnail.name, preset, image_format))
+        return Image.open(path)
+
+    def test_derivatives_built_on_upload(self):
+        contest = self.create_contest()
+        with self.open_derivative(contest, 'card', 'webp') as card:
+            self.assertEqual((card.format, card.size, card.mode), ('WEBP', (640, 360), 'RGBA'))
+        with self.open_derivative(contest, 'full', 'jpeg') as full:
+            self.assertEqual((full.format, full.size, full.mode), ('JPEG', (1200, 900), 'RGB'))
+
+        response = self.client.get(reverse('contests:contest-list'))
+        variants = response.data['results'][0]['thumbnail_variants']
+        self.assertEqual(
+            variants['card']['webp'], f'/media/image_derivatives/{contest.thumbnail.name}/card.webp'
+        )
+        self.assertEqual(self.client.get(variants['card']['jpeg']).status_code, 200)
+
+    def test_product_image_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                brand=self.brand.brand_profile, name='Sneaker', sku='SKU-1', price=10, image=self.image()
+            )
+        variants = ProductSerializer(product).data['image_variants']
+        self.assertEqual(set(variants), {'card', 'full'})
+        self.assertEqual(variants['card']['webp'], f'/media/image_derivatives/{product.image.name}/card.webp')
+        self.assertEqual(self.client.get(variants['full']['jpeg']).status_code, 200)
+
+    def test_small_images_are_not_upscaled(self):
+        contest = self.create_contest(size=(320, 320), mode='RGB')
+        with self.open_derivative(contest, 'card', 'jpeg') as card:
+            self.assertEqual(card.size, (320, 180))
+
+    def test_missing_derivative_built_on_request(self):
+        contest = self.create_contest()
+        images.purge_derivatives(contest.thumbnail.storage, contest.thumbnail.name)
+        url = contest.thumbnail.storage.url(images.derivative_name(contest.thumbnail.name, 'card', 'webp'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+        # Only presets configured for the field are built
+        self.assertEqual(self.client.get(url.replace('card.webp', 'banner.webp')).status_code, 404)
+        self.assertEqual(self.client.get(url.replace('card.webp', 'card.gif')).status_code, 404)
+
+    def test_replaced_image_derivatives_are_purged(self):
+        contest = self.create_contest()
+        old_name = contest.thumbnail.name
+        with self.captureOnCommitCallbacks(execute=True):
+            contest.thumbnail = self.image(size=(800, 800))
+            contest.save()
+        self.assertFalse(os.listdir(os.path.join(self.media_root, images.DERIVATIVE_DIR, old_name)))
+        with self.open_derivative(contest, 'card', 'webp') as card:
+            self.assertEqual(card.size, (640, 360))
+
+    def test_purge_and_regenerate_command(self):
+        contest = self.create_contest()
+        out = io.StringIO()
+        call_command('image_derivatives', '--purge', stdout=out)
+        self.assertIn('Purged 4 derivatives', out.getvalue())
+        self.assertFalse(os.listdir(os.path.join(self.media_root, images.DERIVATIVE_DIR, contest.thumbnail.name)))
+
+        out = io.StringIO()
+        call_command('image_derivatives', '--presets', 'card', stdout=out)
+        self.assertIn('wrote 2 derivatives', out.getvalue())
+        with self.open_derivative(contest, 'card', 'jpeg') as card:
+            self.assertEqual(card.size, (640, 360))
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        counters.buffer.clear()
+        response_cache.reset_stats()
+        self.brand = create_brand()
+        self.create_contest('First')
+
+    def create_contest(self, title):
+        return create_contest(self.brand, title, is_featured=True)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_repeat_requests_skip_the_database(self):
+        url = reverse('contests:active-contests')
+        response, queries = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertGreater(queries, 0)
+        response, queries = self.get(url)
+        self.assertEqual((response['X-Cache'], queries), ('HIT', 0))
+        self.assertEqual(response.data['results'][0]['title'], 'First')
+
+        # Other query strings are cached separately
+        response, _ = self.get(url, page_size=1)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        self.assertEqual(response_cache.stats()['ActiveContestListView'], {'hits': 1, 'misses': 2, 'hit_ratio': 0.333})
+
+    def test_saves_invalidate_tagged_responses(self):
+        url = reverse('contests:contest-list')
+        self.get(url)
+        self.create_contest('Second')
+        response, _ = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([c['title'] for c in response.data['results']], ['Second', 'First'])
+
+        Contest.objects.get(title='Second').delete()
+        response, _ = self.get(url)
+        self.assertEqual([c['title'] for c in response.data['results']], ['First'])
+
+    def test_admin_actions_invalidate_tagged_responses(self):
+        url = reverse('contests:featured-contests')
+        self.get(url)
+        model_admin = ContestAdmin(Contest, admin.site)
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.make_unfeatured(RequestFactory().post('/'), Contest.objects.all())
+        response, _ = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data, [])
+
+    def test_user_classes_are_cached_apart(self):
+        url = reverse('contests:contest-list')
+        self.get(url)
+        staff = create_brand('staff@example.com', is_staff=True)
+        self.client.force_authenticate(staff)
+        response, _ = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_cached_featured_contests_still_count_views(self):
+        url = reverse('contests:featured-contests')
+        self.get(url)
+        response, queries = self.get(url)
+        self.assertEqual((response['X-Cache'], queries), ('HIT', 0))
+        counters.flush()
+        self.assertEqual(Contest.objects.get().view_count, 2)
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse('cache-stats')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(create_brand('staff@example.com', is_staff=True))
+        self.get(reverse('contests:active-contests'))
+        response = self.client.get(url)
+        self.assertEqual(response.data['response_cache']['ActiveContestListView']['misses'], 1)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.brand = create_brand()
+        self.contest = create_contest(self.brand, 'First')
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers=headers)
+        return response, len(context.captured_queries)
+
+    def test_matching_etag_costs_one_aggregate_query(self):
+        url = reverse('contests:contest-detail', args=[self.contest.pk])
+        response, _ = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        with mock.patch.object(ContestDetailSerializer, 'to_representation') as to_representation:
+            response, queries = self.get(url, if_none_match=response['ETag'])
+        self.assertEqual((response.status_code, queries), (304, 1))
+        to_representation.assert_not_called()
+
+    def test_changes_produce_a_new_etag(self):
+        url = reverse('contests:contest-detail', args=[self.contest.pk])
+        etag = self.get(url)[0]['ETag']
+        creator = create_creator()
+        Submission.objects.create(
+            contest=self.contest, creator=creator, title='Entry', description='Entry',
+            video_file='contest_videos/entry.mp4',
+        )
+
+        response, _ = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        url = reverse('contests:contest-detail', args=[self.contest.pk])
+        # Counts can change without a newer timestamp, so there is no date to revalidate against
+        self.assertNotIn('Last-Modified', self.get(url)[0])
+
+        with mock.patch.object(ContestDetailView, 'validator_aggregates', {'modified': Max('updated_at')}):
+            last_modified = self.get(url)[0]['Last-Modified']
+            self.assertEqual(self.get(url, if_modified_since=last_modified)[0].status_code, 304)
+
+            Contest.objects.filter(pk=self.contest.pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+            self.assertEqual(self.get(url, if_modified_since=last_modified)[0].status_code, 200)
+
+    def test_cached_responses_revalidate_without_queries(self):
+        url = reverse('contests:active-contests')
+        etag = self.get(url)[0]['ETag']
+        response, queries = self.get(url, if_none_match=etag)
+        self.assertEqual((response.status_code, response['X-Cache'], queries), (304, 'HIT', 0))
+        self.assertEqual(response['ETag'], etag)
+
+
+class FragmentCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        counters.buffer.clear()
+        fragments.reset_stats()
+        brand = create_brand()
+        for title in ('First', 'Second', 'Third'):
+            create_contest(brand, title)
+
+    def render(self):
+        contests = list(Contest.objects.for_listing().order_by('pk'))
+        with mock.patch('ocontest.fragments.cache', wraps=cache) as fragment_cache:
+            data = ContestSerializer(contests, many=True).data
+        self.assertEqual((fragment_cache.get_many.call_count, fragment_cache.get.call_count), (1, 0))
+        return data
+
+    def test_pages_only_serialize_misses(self):
+        cold = self.render()
+        Contest.objects.get(title='Second').save()
+        warm = self.render()
+        self.assertEqual(warm, cold[:1] + [warm[1]] + cold[2:])
+        self.assertEqual(fragments.stats()['ContestSerializer'], {'hits': 2, 'misses': 4, 'hit_ratio': 0.333})
+
+    def test_saves_and_volatile_fields_are_never_stale(self):
+        self.render()
+        contest = Contest.objects.get(title='First')
+        contest.title = 'Renamed'
+        contest.save()
+        counters.increment(contest, 'view_count')
+        Submission.objects.create(
+            contest=contest, title='Entry', description='Entry', video_file='contest_videos/entry.mp4',
+            creator=create_creator(),
+        )
+
+        first = self.render()[0]
+        self.assertEqual((first['title'], first['view_count'], first['submission_count']), ('Renamed', 1, 1))
+        self.assertEqual(self.render()[0], first)
+
+
+class TwoTierCacheTests(APITestCase):
+    def make_worker(self, **options):
+        """A cache as one worker process would see it: its own local tier, a shared remote."""
+        options = {
+            'REMOTE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCAL_KEY_PREFIXES': ['response-cache:'],
+            'INVALIDATION_CHANNEL': self.id(),
+            **options,
+        }
+        # Another process has a tier registry of its own; the remote (same LOCATION) is shared
+        with mock.patch.object(two_tier_cache, '_tiers', {}):
+            worker = two_tier_cache.TwoTierCache(self.id(), {'OPTIONS': options})
+        self.addCleanup(worker.remote.clear)
+        self.addCleanup(two_tier_cache.LocalBus._subscribers.pop, self.id(), None)
+        return worker
+
+    def test_hot_keys_are_read_without_the_remote(self):
+        worker = self.make_worker()
+        worker.set('response-cache:featured', {'title': 'First'})
+        with mock.patch.object(worker.remote, 'get', side_effect=AssertionError('remote read')):
+            self.assertEqual(worker.get('response-cache:featured'), {'title': 'First'})
+            self.assertEqual(worker.get_many(['response-cache:featured']), {'response-cache:featured': {'title': 'First'}})
+
+        self.assertEqual(worker.get('response-cache:missing'), None)
+        stats = worker.tier_stats()
+        self.assertEqual((stats['local_hits'], stats['remote_hits'], stats['misses']), (2, 0, 1))
+
+    def test_writes_invalidate_other_workers(self):
+        first, second = self.make_worker(), self.make_worker()
+        first.set('response-cache:tag:contests', 1)
+        self.assertEqual(second.get('response-cache:tag:contests'), 1)
+        self.assertEqual(second.tier_stats()['remote_hits'], 1)
+
+        first.incr('response-cache:tag:contests')
+        self.assertEqual(second.get('response-cache:tag:contests'), 2)
+        first.delete('response-cache:tag:contests')
+        self.assertIsNone(second.get('response-cache:tag:contests'))
+
+    def test_other_keys_always_go_to_the_remote(self):
+        first, second = self.make_worker(), self.make_worker()
+        first.set('counters:seq', 1)
+        second.get('counters:seq')
+        with mock.patch.object(second.tier, 'get', side_effect=AssertionError('local read')):
+            self.assertEqual(second.get('counters:seq'), 1)
+        self.assertEqual(second.tier_stats()['local_entries'], 0)
+
+    def test_local_tier_is_bounded(self):
+        worker = self.make_worker(LOCAL_MAX_ENTRIES=2)
+        worker.set_many({f'response-cache:{i}': i for i in range(3)})
+        self.assertEqual(worker.tier_stats()['local_entries'], 2)
+        self.assertEqual(worker.get('response-cache:0'), 0)
+        self.assertEqual(worker.tier_stats()['remote_hits'], 1)
+
+
+    def test_redis_bus_reconnects_and_clears(self):
+        class StopListening(BaseException):
+            pass
+
+        def listen(*messages, error=None):
+            def messages_then_error():
+                for keys in messages:
+                    yield {'data': json.dumps({'origin': 'other', 'keys': keys})}
+                raise error or StopListening
+            pubsub = mock.Mock()
+            pubsub.listen.side_effect = messages_then_error
+            return pubsub
+
+        lost = mock.Mock()
+        lost.subscribe.side_effect = ConnectionError('still down')
+        client = mock.Mock()
+        client.pubsub.side_effect = [
+            listen(['response-cache:a'], error=ConnectionError('connection reset')),
+            lost,
+            listen(['response-cache:b']),
+        ]
+        redis = types.ModuleType('redis')
+        redis.Redis = mock.Mock()
+        redis.Redis.from_url.return_value = client
+
+        received = []
+        with mock.patch.dict(sys.modules, {'redis': redis}):
+            bus = two_tier_cache.RedisBus('cache:invalidate', 'redis://cache.invalid:6379/1')
+        with mock.patch.object(two_tier_cache.time, 'sleep') as sleep, \
+                self.assertLogs('ocontest.two_tier_cache', 'ERROR'), self.assertRaises(StopListening):
+            bus._listen(received.append)
+
+        # Whatever was published while disconnected is lost, so each (re)subscription clears the tier
+        self.assertEqual(received, [
+            {'origin': None, 'clear': True},
+            {'origin': 'other', 'keys': ['response-cache:a']},
+            {'origin': None, 'clear': True},
+            {'origin': 'other', 'keys': ['response-cache:b']},
+        ])
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2])
+        redis.Redis.from_url.assert_called_once_with('redis://cache.invalid:6379/1')
+
+class HomepageTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        counters.buffer.clear()
+        response_cache.reset_stats()
+        self.brand = create_brand()
+        creator = create_creator()
+        for title in ('First', 'Second'):
+            create_contest(self.brand, title, is_featured=True)
+        Video.objects.create(
+            title='Reel', description='Reel', creator=creator, is_featured=True,
+            approval_status=Video.ApprovalStatus.APPROVED,
+        )
+        self.url = reverse('homepage')
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(context.captured_queries)
+
+    def test_one_cache_read_serves_every_section(self):
+        data, queries = self.get()
+        self.assertEqual(list(data), ['featured_contests', 'active_contests', 'featured_videos', 'stats'])
+        self.assertLessEqual(queries, 6)
+        self.assertEqual([c['title'] for c in data['featured_contests']], ['Second', 'First'])
+        self.assertEqual(data['featured_videos'][0]['title'], 'Reel')
+        self.assertEqual((data['stats']['live_contests'], data['stats']['creators']), (2, 1))
+
+        with mock.patch('ocontest.homepage.cache', wraps=cache) as homepage_cache:
+            cached, queries = self.get()
+        self.assertEqual((homepage_cache.get_many.call_count, homepage_cache.get.call_count, queries), (1, 0, 0))
+        self.assertEqual(cached, data)
+
+    def test_saves_rebuild_only_the_sections_they_affect(self):
+        self.get()
+        profile = BrandProfile.objects.get(user=self.brand)
+        profile.company_name = 'Acme'
+        profile.save()
+        data, _ = self.get()
+        self.assertEqual(data['featured_contests'][0]['brand_info']['name'], 'Acme')
+        stats = response_cache.stats()
+        self.assertEqual(stats['homepage:featured_videos']['hits'], 1)
+        self.assertEqual(stats['homepage:featured_contests']['hits'], 0)
+
+        Contest.objects.filter(title='First').get().delete()
+        data, _ = self.get()
+        self.assertEqual([c['title'] for c in data['active_contests']], ['Second'])
+        self.assertEqual(data['stats']['total_contests'], 1)
+
+    def test_video_cards_follow_the_rows_they_embed(self):
+        video = Video.objects.get()
+        video.contest = Contest.objects.get(title='First')
+        video.save()
+        self.get()
+        self.assertEqual(self.get()[0]['featured_videos'][0]['contest']['title'], 'First')
+
+        video.contest.title = 'Renamed'
+        video.contest.save()
+        data, _ = self.get()
+        self.assertEqual(data['featured_videos'][0]['contest']['title'], 'Renamed')
+
+        creator = video.creator
+        creator.last_login = timezone.now()
+        creator.save(update_fields=['last_login'])
+        self.get()
+        self.assertEqual(response_cache.stats()['homepage:featured_videos']['misses'], 2)
+        creator.first_name = 'Renamed'
+        creator.save()
+        data, _ = self.get()
+        self.assertEqual(data['featured_videos'][0]['creator']['name'], 'Renamed')
+
+    def test_sections_can_be_selected(self):
+        data, _ = self.get(sections='stats,featured_videos')
+        self.assertEqual(list(data), ['stats', 'featured_videos'])
+        self.assertEqual(self.client.get(self.url, {'sections': 'stats,ads'}).status_code, 400)
+
+    def test_featured_contests_count_views(self):
+        self.get()
+        self.get(sections='featured_contests')
+        counters.flush()
+        self.assertEqual(list(Contest.objects.values_list('view_count', flat=True)), [2, 2])
@@ -1,15 +1,33 @@
-from django.db.models import Q
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from django.db.models import Count, Max, Sum
 from django.utils import timezone
 from .models import Contest, Submission, ContestApplication
+from videos import sniffing
 from videos.models import Video
+from ocontest import counters
+from ocontest.conditional import ConditionalGetMixin
+from ocontest.pagination import FeedCursorPagination
+from ocontest.response_cache import CachedResponseMixin
+from ocontest.trending import TrendingSortMixin
+from .search import search_contests
 from .serializers import FeaturedContestSerializer, ContestSerializer, ContestDetailSerializer, SubmissionSerializer, ContestApplicationSerializer
 
+# Contest payloads show submission counts and view counts
+CONTEST_VALIDATORS = {
+    'modified': Max('updated_at'),
+    'count': Count('pk', distinct=True),
+    'submissions_modified': Max('submissions__updated_at'),
+    'submissions': Count('submissions', distinct=True),
+    'views': Sum('view_count'),
+}
+
+
 class FeaturedVideosView(generics.ListAPIView):
     serializer_class = SubmissionSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = None
 
     def get_queryset(self):
         return Submission.objects.filter(
@@ -17,23 +35,27 @@ class FeaturedVideosView(generics.ListAPIView):
             is_winner=True
         ).order_by('-created_at')[:6]
 
-class FeaturedContestListView(generics.ListAPIView):
+class FeaturedContestListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = FeaturedContestSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    cache_tags = ('contests',)
 
-    def get_queryset(self):
-        return Contest.objects.filter(
-            is_featured=True,
-            status__in=['upcoming', 'live']
-        ).order_by('-created_at')[:6]
+    def cache_hit(self, data):
+        # Cached responses are still views
+        for contest in data:
+            counters.buffer.increment(Contest, contest['id'], 'view_count')
 
-    def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs)
-        # Increment view count for each contest
-        for contest in self.get_queryset():
-            contest.view_count += 1
-            contest.save(update_fields=['view_count'])
-        return response
+    def get_queryset(self):
+        return Contest.objects.featured()[:6]
+
+    def list(self, request, *args, **kwargs):
+        contests = list(self.filter_queryset(self.get_queryset()))
+        # Buffer a view for each contest; counters are flushed in the background
+        for contest in contests:
+            counters.increment(contest, 'view_count')
+        serializer = self.get_serializer(contests, many=True)
+        return Response(serializer.data)
 
 
 class ContestSearchView(generics.ListAPIView):
@@ -41,22 +63,20 @@ class ContestSearchView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
+        query = self.request.query_params.get('q', '').strip()
+        queryset = Contest.objects.for_listing().filter(status__in=['upcoming', 'live'])
         if not query:
-            return Contest.objects.filter(
-                status__in=['upcoming', 'live']
-            ).order_by('-created_at')
+            return queryset.order_by('-created_at')
 
-        return Contest.objects.filter(
-            Q(title__icontains=query) |
-            Q(brand__icontains=query) |
-            Q(description__icontains=query),
-            status__in=['upcoming', 'live']
-        ).order_by('-created_at')
+        # Relevance-ranked full-text search over the contest search documents
+        return search_contests(queryset, query)
 
 
-class ContestListView(generics.ListCreateAPIView):
+class ContestListView(CachedResponseMixin, ConditionalGetMixin, TrendingSortMixin, generics.ListCreateAPIView):
     serializer_class = ContestSerializer
+    pagination_class = FeedCursorPagination
+    cache_tags = ('contests',)
+    validator_aggregates = CONTEST_VALIDATORS
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -64,7 +84,10 @@ class ContestListView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
 
     def get_queryset(self):
-        return Contest.objects.all().order_by('-created_at')
+        return Contest.objects.for_listing().order_by('-created_at')
+
+    def get_validator_queryset(self):
+        return Contest.objects.all()
     
     def perform_create(self, serializer):
         if self.request.user.role != 'brand':
@@ -82,25 +105,40 @@ class ContestListView(generics.ListCreateAPIView):
         )
 
 
-class ActiveContestListView(generics.ListAPIView):
+class ActiveContestListView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ContestSerializer
     permission_classes = [permissions.AllowAny]
+    cache_tags = ('contests',)
+    validator_aggregates = CONTEST_VALIDATORS
 
     def get_queryset(self):
-        return Contest.objects.filter(status='live').order_by('-created_at')
+        return Contest.objects.for_listing().filter(status='live').order_by('-created_at')
+
+    def get_validator_queryset(self):
+        return Contest.objects.filter(status='live')
 
 
-class ContestDetailView(generics.RetrieveAPIView):
-    queryset = Contest.objects.all()
+class ContestDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Contest.objects.for_listing().with_approved_submissions()
     serializer_class = ContestDetailSerializer
     permission_classes = [permissions.AllowAny]
+    validator_aggregates = CONTEST_VALIDATORS
 
-    def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs)
-        # Increment view count
-        contest = self.get_object()
-        contest.view_count += 1
-        contest.save(update_fields=['view_count'])
+    def get_validator_queryset(self):
+        return Contest.objects.all()
+
+    def get_object(self):
+        contest = super().get_object()
+        # Buffer the view before serializing so the response includes it;
+        # counters are flushed in the background
+        counters.buffer.increment(Contest, contest.pk, 'view_count')
+        return contest
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # A 304 never reaches get_object; the aggregates are all empty for a missing pk
+        if response.status_code == 304 and any(self.validator_values.values()):
+            counters.buffer.increment(Contest, self.kwargs['pk'], 'view_count')
         return response
 
 
@@ -111,7 +149,7 @@ class BrandContestListView(generics.ListAPIView):
     def get_queryset(self):
         if self.request.user.role != 'brand':
             raise PermissionDenied('Only brands can access their contests')
-        return Contest.objects.filter(brand=self.request.user).order_by('-created_at')
+        return Contest.objects.for_listing().filter(brand=self.request.user).order_by('-created_at')
 
 class ContestApplicationView(generics.CreateAPIView):
     serializer_class = ContestApplicationSerializer
@@ -178,6 +216,45 @@ class ContestApplicationStatusView(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
+def submission_error(user, contest):
+    """Return an error payload if ``user`` may not submit to ``contest``, else ``None``."""
+    # Check if creator is approved for this contest
+    try:
+        application = ContestApplication.objects.get(
+            contest=contest,
+            creator=user
+        )
+        if application.status != ContestApplication.Status.APPROVED:
+            return {'detail': 'You must be approved to submit to this contest'}
+    except ContestApplication.DoesNotExist:
+        return {'detail': 'You must apply and be approved to submit to this contest'}
+
+    if contest.status != 'live':
+        return {'detail': f'This contest is not accepting submissions.', 'status': contest.status}
+
+    # Check if user has already submitted
+    if Submission.objects.filter(contest=contest, creator=user).exists():
+        return {'detail': 'You have already submitted to this contest'}
+    return None
+
+def create_submission_video(submission):
+    """Create the video record that mirrors a new submission."""
+    try:
+        video = Video.objects.create(
+            title=submission.title,
+            description=submission.description,
+            creator=submission.creator,
+            url=submission.video_file,  # Use the video file from submission
+            contest=submission.contest,
+            submission=submission,
+            category=Video.Category.OTHER  # Default category
+        )
+        print(f'Created video: {video.id} with URL: {video.url}')
+        return video
+    except Exception as e:
+        print(f'Error creating video: {str(e)}')
+        return None
+
 class ContestSubmissionView(generics.CreateAPIView):
     serializer_class = SubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -193,36 +270,16 @@ class ContestSubmissionView(generics.CreateAPIView):
 
             contest = Contest.objects.get(pk=kwargs['pk'])
             
-            # Check if creator is approved for this contest
-            try:
-                application = ContestApplication.objects.get(
-                    contest=contest,
-                    creator=request.user
-                )
-                if application.status != ContestApplication.Status.APPROVED:
-                    return Response(
-                        {'detail': 'You must be approved to submit to this contest'},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-            except ContestApplication.DoesNotExist:
-                return Response(
-                    {'detail': 'You must apply and be approved to submit to this contest'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            if contest.status != 'live':
-                return Response(
-                    {'detail': f'This contest is not accepting submissions.', 'status': contest.status},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            # Check if user has already submitted
-            if Submission.objects.filter(contest=contest, creator=request.user).exists():
-                return Response(
-                    {'detail': 'You have already submitted to this contest'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+            error = submission_error(request.user, contest)
+            if error:
+                return Response(error, status=status.HTTP_403_FORBIDDEN)
             
+            # Stop reading the body as soon as the file is clearly not an acceptable video
+            sniffing.install_upload_handler(request, ['video_file'])
+            rejected = sniffing.rejected_upload(request)
+            if rejected:
+                return Response({'video_file': [rejected]}, status=status.HTTP_400_BAD_REQUEST)
+
             # Continue with serializer validation and saving
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
@@ -238,23 +295,11 @@ class ContestSubmissionView(generics.CreateAPIView):
             submission = serializer.save(
                 creator=request.user,
                 contest=contest,
-                status='submitted'  # Use the correct status from Submission.Status
+                status=Submission.Status.PENDING_APPROVAL
             )
             
             # Create a video record for the submission
-            try:
-                video = Video.objects.create(
-                    title=submission.title,
-                    description=submission.description,
-                    creator=submission.creator,
-                    url=submission.video_file,  # Use the video file from submission
-                    contest=submission.contest,
-                    submission=submission,
-                    category=Video.Category.OTHER  # Default category
-                )
-                print(f'Created video: {video.id} with URL: {video.url}')
-            except Exception as e:
-                print(f'Error creating video: {str(e)}')
+            create_submission_video(submission)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
@@ -2,15 +2,17 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from accounts.models import BrandProfile, Product
 from django.shortcuts import get_object_or_404
+from ocontest.response_cache import CachedResponseMixin
 from .serializers_brand_products import ProductSerializer
 
-class BrandProductListView(generics.ListAPIView):
+class BrandProductListView(CachedResponseMixin, generics.ListAPIView):
     """
     View to list all products for a specific brand
     Public endpoint - no authentication required
     """
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]  # Allow public access
+    cache_tags = ('products',)
     
     def get_queryset(self):
         brand_id = self.kwargs.get('brand_id')
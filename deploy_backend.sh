@@ -12,7 +12,7 @@ sudo apt-get upgrade -y
 
 # Install required packages
 echo "Installing required packages..."
-sudo apt-get install -y python3-pip python3-dev python3-venv libpq-dev postgresql postgresql-contrib nginx curl
+sudo apt-get install -y python3-pip python3-dev python3-venv libpq-dev postgresql postgresql-contrib redis-server nginx curl
 
 # Create a system user for the application
 echo "Creating system user..."
@@ -55,12 +55,15 @@ python manage.py collectstatic --noinput --settings=ocontest.production_settings
 echo "Running migrations..."
 python manage.py migrate --settings=ocontest.production_settings
 
-# Set up Gunicorn
-echo "Setting up Gunicorn..."
-sudo cp deployment/gunicorn.service /etc/systemd/system/gunicorn.service
+# Set up the ASGI server (uvicorn on 127.0.0.1:8000, which nginx proxies to)
+echo "Setting up uvicorn..."
+if systemctl list-unit-files gunicorn.service > /dev/null 2>&1; then
+    sudo systemctl disable --now gunicorn || true
+fi
+sudo cp deployment/ocontest-asgi.service /etc/systemd/system/ocontest-asgi.service
 sudo systemctl daemon-reload
-sudo systemctl enable gunicorn
-sudo systemctl restart gunicorn
+sudo systemctl enable ocontest-asgi
+sudo systemctl restart ocontest-asgi
 
 # Set up Nginx
 echo "Setting up Nginx..."
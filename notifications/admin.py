@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import NotificationFanout, SMSMessage
 
-# Register your models here.
+
+@admin.register(NotificationFanout)
+class NotificationFanoutAdmin(admin.ModelAdmin):
+    list_display = ('title', 'notification_type', 'recipient_role', 'status', 'processed', 'total_recipients', 'created_at')
+    list_filter = ('status', 'notification_type')
+    readonly_fields = [field.name for field in NotificationFanout._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SMSMessage)
+class SMSMessageAdmin(admin.ModelAdmin):
+    list_display = ('phone_number', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('phone_number', 'provider_message_id')
+    readonly_fields = [field.name for field in SMSMessage._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
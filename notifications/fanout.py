@@ -0,0 +1,163 @@
+"""
+Fan-out of broadcast notifications (e.g. "a new contest is live").
+
+A ``NotificationFanout`` row describes the broadcast. ``run_fanout`` walks the
+recipients in primary-key chunks, inserts each chunk's notifications with
+``create_notifications_bulk`` and commits the chunk together with the
+fan-out's cursor, so progress is visible while it runs and an interrupted
+fan-out can be resumed with ``manage.py resume_fanouts``. SMS messages are handed to the background
+SMS pool after each chunk commits.
+
+A worker claims the fan-out row (``select_for_update(skip_locked=True)``)
+before running it and holds a lease that each chunk renews. A fan-out that
+is running under an unexpired lease is left alone, so a resume racing the
+worker that is still on it does not notify anyone twice.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ocontest import background
+from .models import NotificationFanout
+from .services import create_notifications_bulk
+from .sms_service import enqueue_sms_batch
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def get_chunk_size():
+    return getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+
+
+def new_lease():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'NOTIFICATION_FANOUT_LEASE', 300))
+
+
+def create_fanout(notification_type, title, message, recipient_role='creator', related_object=None, sms_message=''):
+    """Record a fan-out and start it in the background once the transaction commits."""
+    fanout = NotificationFanout.objects.create(
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        sms_message=sms_message,
+        recipient_role=recipient_role,
+        content_type=ContentType.objects.get_for_model(related_object) if related_object else None,
+        object_id=related_object.pk if related_object else None,
+    )
+    transaction.on_commit(lambda: background.submit('fanout', run_fanout, fanout.pk))
+    return fanout
+
+
+def get_recipients(fanout):
+    return User.objects.filter(role=fanout.recipient_role, is_active=True)
+
+
+def claim_fanout(fanout_id):
+    """Mark a fan-out RUNNING under a new lease, or return ``None`` if it is finished or held by another worker."""
+    with transaction.atomic():
+        fanout = (
+            NotificationFanout.objects.select_for_update(skip_locked=True)
+            .filter(pk=fanout_id)
+            .exclude(status=NotificationFanout.Status.COMPLETED)
+            .exclude(Q(status=NotificationFanout.Status.RUNNING) & Q(lease_expires_at__gt=timezone.now()))
+            .first()
+        )
+        if fanout is None:
+            return None
+        fanout.status = NotificationFanout.Status.RUNNING
+        fanout.lease_expires_at = new_lease()
+        fanout.total_recipients = fanout.processed + get_recipients(fanout).filter(
+            pk__gt=fanout.last_recipient_id
+        ).count()
+        fanout.save(update_fields=['status', 'lease_expires_at', 'total_recipients', 'updated_at'])
+    return fanout
+
+
+def run_fanout(fanout_id, chunk_size=None):
+    """
+    Process (or resume) a fan-out until every recipient has been notified.
+
+    Returns ``None`` without doing anything when the fan-out is already
+    completed or another worker holds its lease.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    fanout = claim_fanout(fanout_id)
+    if fanout is None:
+        return None
+
+    recipients = get_recipients(fanout)
+    related_object = fanout.related_object
+
+    try:
+        while True:
+            chunk = list(
+                recipients.filter(pk__gt=fanout.last_recipient_id)
+                .order_by('pk')
+                .values_list('pk', 'phone_number', 'creator_profile__receive_sms_notifications')[:chunk_size]
+            )
+            if not chunk:
+                break
+            sms_numbers = [
+                phone for _, phone, wants_sms in chunk
+                if fanout.sms_message and wants_sms and phone
+            ]
+            with transaction.atomic():
+                # Our lease ran out and another worker took over and moved the cursor
+                cursor = NotificationFanout.objects.select_for_update().values_list(
+                    'last_recipient_id', flat=True
+                ).get(pk=fanout.pk)
+                if cursor != fanout.last_recipient_id:
+                    logger.warning('Fan-out %s was taken over by another worker; stopping', fanout.pk)
+                    return None
+                create_notifications_bulk(
+                    [pk for pk, _, _ in chunk],
+                    notification_type=fanout.notification_type,
+                    title=fanout.title,
+                    message=fanout.message,
+                    related_object=related_object,
+                    batch_size=chunk_size
+                )
+                fanout.last_recipient_id = chunk[-1][0]
+                fanout.processed += len(chunk)
+                fanout.sms_enqueued += len(sms_numbers)
+                fanout.lease_expires_at = new_lease()
+                fanout.save(update_fields=[
+                    'last_recipient_id', 'processed', 'sms_enqueued', 'lease_expires_at', 'updated_at'
+                ])
+            if sms_numbers:
+                enqueue_sms_batch(sms_numbers, fanout.sms_message)
+            logger.info(
+                'Fan-out %s: %s/%s recipients notified (%s%%)',
+                fanout.pk, fanout.processed, fanout.total_recipients, fanout.progress
+            )
+    except Exception as e:
+        fanout.status = NotificationFanout.Status.FAILED
+        fanout.error = str(e)
+        fanout.lease_expires_at = None
+        fanout.save(update_fields=['status', 'error', 'lease_expires_at', 'updated_at'])
+        raise
+
+    fanout.status = NotificationFanout.Status.COMPLETED
+    fanout.completed_at = timezone.now()
+    fanout.lease_expires_at = None
+    fanout.save(update_fields=['status', 'completed_at', 'lease_expires_at', 'updated_at'])
+    return fanout
+
+
+def resume_pending_fanouts():
+    """
+    Run every fan-out that was interrupted or never started. Returns the
+    fan-outs run; those another worker is still running are skipped.
+    """
+    pending = NotificationFanout.objects.exclude(
+        status=NotificationFanout.Status.COMPLETED
+    ).order_by('created_at').values_list('pk', flat=True)
+    return [fanout for fanout in map(run_fanout, pending) if fanout is not None]
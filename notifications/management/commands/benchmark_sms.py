@@ -0,0 +1,37 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.sms_service import LocmemSMSBackend, SMSService
+
+
+class Command(BaseCommand):
+    help = 'Measure SMS throughput against the local stub backend (nothing is sent or stored)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Simulated provider round trip in seconds')
+        parser.add_argument('--rate', type=float, default=getattr(settings, 'SMS_RATE_LIMIT', 10),
+                            help='Token bucket rate in messages per second (0 = unlimited)')
+        parser.add_argument('--workers', type=int, nargs='+',
+                            default=[1, getattr(settings, 'BACKGROUND_WORKERS', {}).get('sms', 8)])
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        for workers in options['workers']:
+            backend = LocmemSMSBackend(latency=options['latency'])
+            service = SMSService(backend=backend, rate=options['rate'], burst=workers)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    lambda i: service.send(f'+2547{i:08d}', 'Benchmark message'), range(count)
+                ))
+            elapsed = time.perf_counter() - started
+            sent = sum(result['success'] for result in results)
+            self.stdout.write(
+                f'{workers:>3} workers: {sent}/{count} sent in {elapsed:.2f}s '
+                f'({sent / elapsed:.1f} msg/s, rate limit {options["rate"] or "none"})'
+            )
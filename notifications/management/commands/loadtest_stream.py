@@ -0,0 +1,92 @@
+import asyncio
+import resource
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+from notifications.streaming import broker, event_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold many idle notification streams open and report the cost per connection. '
+        'Without --url the streams run in this process against the broker; with --url '
+        'they are real HTTP connections to a running ASGI server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--url', help='Stream URL, e.g. http://127.0.0.1:8000/api/notifications/stream/?token=...')
+        parser.add_argument('--hold', type=float, default=30.0, help='Seconds to hold HTTP connections open')
+
+    def handle(self, *args, **options):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = options['connections'] + 100
+        if soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+        if options['url']:
+            asyncio.run(self.http_connections(options['url'], options['connections'], options['hold']))
+        else:
+            asyncio.run(self.in_process(options['connections']))
+
+    async def in_process(self, count):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        streams = [event_stream(user_id, keepalive=3600) for user_id in range(1, count + 1)]
+        # The first frame subscribes each stream; after that they sit idle
+        for stream in streams:
+            await stream.__anext__()
+        readers = [asyncio.ensure_future(stream.__anext__()) for stream in streams]
+        await asyncio.sleep(0)
+        held = tracemalloc.get_traced_memory()[0] - before
+        self.stdout.write(
+            f'{broker.connection_count()} idle streams: {held / 1024 / 1024:.1f} MiB '
+            f'({held / count / 1024:.1f} KiB per connection)'
+        )
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        broker.deliver([
+            (user_id, {'id': user_id, 'title': 'Load test'}) for user_id in range(1, count + 1)
+        ])
+        await asyncio.gather(*readers)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Delivered one event to every stream in {elapsed * 1000:.1f} ms')
+
+        for stream in streams:
+            await stream.aclose()
+
+    async def http_connections(self, url, count, hold):
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            'Accept: text/event-stream\r\n\r\n'
+        ).encode()
+
+        async def connect():
+            reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            writer.write(request)
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                writer.close()
+                raise ConnectionError(status.decode().strip())
+            return reader, writer
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(connect() for _ in range(count)), return_exceptions=True)
+        connections = [result for result in results if not isinstance(result, BaseException)]
+        failures = [result for result in results if isinstance(result, BaseException)]
+        self.stdout.write(
+            f'Opened {len(connections)}/{count} streams in {time.perf_counter() - started:.1f}s'
+            + (f' (first error: {failures[0]!r})' if failures else '')
+        )
+
+        await asyncio.sleep(hold)
+        alive = sum(not reader.at_eof() for reader, _ in connections)
+        self.stdout.write(f'{alive}/{len(connections)} streams still open after {hold:.0f}s')
+        for _, writer in connections:
+            writer.close()
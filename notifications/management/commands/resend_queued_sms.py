@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.models import SMSMessage
+from notifications.sms_service import resend_stale_sms
+
+
+class Command(BaseCommand):
+    help = 'Send SMS messages left queued by a process that exited before sending them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=getattr(settings, 'SMS_RESEND_AFTER', 900),
+                            help='Only messages queued at least this many seconds ago')
+
+    def handle(self, *args, **options):
+        messages = resend_stale_sms(options['older_than'])
+        if not messages:
+            self.stdout.write('No stale queued SMS.')
+            return
+        sent = sum(sms.status == SMSMessage.Status.SENT for sms in messages)
+        self.stdout.write(self.style.SUCCESS(
+            f'Resent {len(messages)} queued SMS: {sent} sent, {len(messages) - sent} failed'
+        ))
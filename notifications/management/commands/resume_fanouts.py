@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from notifications.fanout import resume_pending_fanouts
+from notifications.models import NotificationFanout
+
+
+class Command(BaseCommand):
+    help = 'Resume notification fan-outs that were interrupted or never started'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true',
+                            help='Only list unfinished fan-outs and their progress')
+
+    def handle(self, *args, **options):
+        pending = NotificationFanout.objects.exclude(status=NotificationFanout.Status.COMPLETED)
+        if options['status']:
+            for fanout in pending.order_by('created_at'):
+                self.stdout.write(
+                    f"#{fanout.pk} {fanout.title} [{fanout.status}] "
+                    f"{fanout.processed}/{fanout.total_recipients} ({fanout.progress}%)"
+                )
+            if not pending.exists():
+                self.stdout.write('No unfinished fan-outs.')
+            return
+
+        for fanout in resume_pending_fanouts():
+            self.stdout.write(self.style.SUCCESS(
+                f"Fan-out #{fanout.pk} completed: {fanout.processed} notifications, "
+                f"{fanout.sms_enqueued} SMS queued"
+            ))
@@ -39,7 +39,92 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
             models.Index(fields=['content_type', 'object_id']),
+            # Keeps the unread-count fallback an index-only count
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
         ]
 
     def __str__(self):
         return f"{self.notification_type} for {self.recipient.email}"
+
+
+class NotificationFanout(models.Model):
+    """
+    A broadcast of one notification to every active user with a role.
+
+    Recipients are processed in primary-key order and ``last_recipient_id``
+    is committed with each chunk, so an interrupted fan-out resumes where it
+    stopped instead of notifying anyone twice. The worker running it renews
+    ``lease_expires_at`` with every chunk; until it passes, no other worker
+    takes the fan-out over.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    notification_type = models.CharField(
+        max_length=50,
+        choices=Notification.NotificationType.choices
+    )
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    sms_message = models.TextField(blank=True, help_text='Sent to recipients who opted into SMS')
+    recipient_role = models.CharField(max_length=20, default='creator')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object = GenericForeignKey('content_type', 'object_id')
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    last_recipient_id = models.PositiveBigIntegerField(default=0)
+    total_recipients = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    sms_enqueued = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} ({self.processed}/{self.total_recipients})"
+
+    @property
+    def progress(self):
+        if not self.total_recipients:
+            return 100.0 if self.status == self.Status.COMPLETED else 0.0
+        return round(100.0 * self.processed / self.total_recipients, 1)
+
+
+class SMSMessage(models.Model):
+    """The delivery result of one SMS sent through ``notifications.sms_service``."""
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    phone_number = models.CharField(max_length=20)
+    message = models.TextField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+    sms_count = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone_number} ({self.status})"
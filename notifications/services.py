@@ -1,5 +1,49 @@
+import logging
+from itertools import islice
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import models, transaction
 from .models import Notification
+from .streaming import broker
+
+logger = logging.getLogger(__name__)
+
+def unread_count_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+def get_unread_count(user):
+    """Number of unread notifications, cached per user and recounted on a miss."""
+    key = unread_count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = user.notifications.filter(is_read=False).count()
+        cache.add(key, count, getattr(settings, 'NOTIFICATION_UNREAD_COUNT_TTL', 3600))
+    return count
+
+def _adjust_unread_count(user_id, delta):
+    def adjust():
+        try:
+            cache.incr(unread_count_key(user_id), delta)
+        except ValueError:
+            # Not cached: the next read counts from the database
+            pass
+    transaction.on_commit(adjust)
+
+def _forget_unread_counts(user_ids):
+    keys = [unread_count_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def _publish_on_commit(notifications):
+    def publish():
+        try:
+            broker.publish(notifications)
+        except Exception:
+            # The rows are saved; streams that miss them catch up from the list endpoint
+            logger.exception('Could not publish %s notifications to their streams', len(notifications))
+    transaction.on_commit(publish)
+
 
 def create_notification(recipient, notification_type, title, message, related_object=None):
     """
@@ -24,19 +68,70 @@ def create_notification(recipient, notification_type, title, message, related_ob
         notification.object_id = related_object.id
 
     notification.save()
+    _adjust_unread_count(recipient.pk, 1)
+    _publish_on_commit([notification])
     return notification
 
+def create_notifications_bulk(recipients, notification_type, title, message, related_object=None, batch_size=None):
+    """
+    Create the same notification for many users with batched inserts.
+
+    Args:
+        recipients: iterable of users or user ids, or a User queryset (streamed by id)
+        notification_type, title, message, related_object: as for ``create_notification``
+        batch_size: rows per INSERT (default ``NOTIFICATION_BULK_BATCH_SIZE``)
+
+    Returns:
+        int: the number of notifications created
+    """
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BULK_BATCH_SIZE', 1000)
+    if isinstance(recipients, models.QuerySet):
+        recipients = recipients.values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    recipient_ids = (getattr(recipient, 'pk', recipient) for recipient in recipients)
+
+    content_type_id = object_id = None
+    if related_object:
+        content_type_id = ContentType.objects.get_for_model(related_object).id
+        object_id = related_object.id
+
+    created = 0
+    while True:
+        batch = [
+            Notification(
+                recipient_id=recipient_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                content_type_id=content_type_id,
+                object_id=object_id
+            )
+            for recipient_id in islice(recipient_ids, batch_size)
+        ]
+        if not batch:
+            break
+        # One transaction per batch, so a large send does not hold every row until the end
+        with transaction.atomic():
+            Notification.objects.bulk_create(batch)
+            _forget_unread_counts({notification.recipient_id for notification in batch})
+            _publish_on_commit(batch)
+        created += len(batch)
+    return created
+
 def get_unread_notifications(user):
     """Get all unread notifications for a user."""
     return user.notifications.filter(is_read=False).order_by('-created_at')
 
 def mark_notification_as_read(notification_id, user):
     """Mark a specific notification as read."""
-    notification = Notification.objects.get(id=notification_id, recipient=user)
-    notification.is_read = True
-    notification.save()
-    return notification
+    # Conditional, so of two concurrent requests only one decrements the count
+    updated = Notification.objects.filter(id=notification_id, recipient=user, is_read=False).update(is_read=True)
+    if updated == 1:
+        _adjust_unread_count(user.pk, -1)
+    return Notification.objects.get(id=notification_id, recipient=user)
 
 def mark_all_notifications_as_read(user):
     """Mark all notifications as read for a user."""
     user.notifications.filter(is_read=False).update(is_read=True)
+    transaction.on_commit(lambda: cache.set(
+        unread_count_key(user.pk), 0, getattr(settings, 'NOTIFICATION_UNREAD_COUNT_TTL', 3600)
+    ))
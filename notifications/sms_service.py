@@ -1,45 +1,304 @@
-import os
+"""
+SMS delivery.
+
+All messages go through one ``SMSService`` per process. It holds a single
+provider client (and so a single HTTP connection pool), limits the send rate
+to ``SMS_RATE_LIMIT`` messages per second, retries transient provider
+failures with exponential backoff and records the outcome of each message as
+an ``SMSMessage``.
+
+``SMS_RATE_LIMITER`` chooses how the limit is kept:
+
+* ``'memory'`` - a token bucket in this process (bursts of up to
+  ``SMS_RATE_BURST``). Every worker process gets the whole limit.
+* ``'cache'`` - a counter per one-second window in the default cache, shared
+  by every process, so the limit holds however many workers send.
+
+The provider is chosen with ``SMS_BACKEND``:
+
+* ``notifications.sms_service.BrevoSMSBackend`` - the Brevo transactional SMS API.
+* ``notifications.sms_service.LocmemSMSBackend`` - keeps messages in
+  ``outbox`` without sending anything; for tests and offline benchmarks
+  (``manage.py benchmark_sms``).
+
+``enqueue_sms()``/``enqueue_sms_batch()`` hand messages to the bounded
+background ``'sms'`` pool; ``send_sms_notification()`` sends synchronously.
+Messages still queued when their process exited are sent by
+``manage.py resend_queued_sms`` (``resend_stale_sms()``).
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
+from urllib3.exceptions import HTTPError
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from ocontest import background
 
-def send_sms_notification(phone_number, message):
-    """
-    Send an SMS notification using the Brevo API
-    
-    Args:
-        phone_number (str): The recipient's phone number in international format (e.g., +1234567890)
-        message (str): The SMS message content
-        
-    Returns:
-        dict: Response from the Brevo API
-    """
-    # Configure API key authorization
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = os.getenv('BREVO_API_KEY')
-    
-    # Create an instance of the API class
-    api_instance = sib_api_v3_sdk.TransactionalSMSApi(sib_api_v3_sdk.ApiClient(configuration))
-    
-    # Create the SMS object
-    sms_request = sib_api_v3_sdk.SendTransacSms(
-        sender="OContest",  # Sender name
-        recipient=phone_number,
-        content=message,
-        type="transactional"
-    )
-    
-    try:
-        # Send the SMS
-        api_response = api_instance.send_transac_sms(sms_request)
+logger = logging.getLogger(__name__)
+
+
+class SMSError(Exception):
+    """The provider rejected the message; retrying will not help."""
+
+
+class TransientSMSError(SMSError):
+    """The provider could not be reached or asked us to slow down."""
+
+
+class BrevoSMSBackend:
+    """Brevo transactional SMS, sharing one API client between threads."""
+
+    def __init__(self):
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = settings.BREVO_API_KEY
+        # One pooled connection per SMS worker
+        configuration.connection_pool_maxsize = getattr(settings, 'BACKGROUND_WORKERS', {}).get('sms', 8)
+        self.api = sib_api_v3_sdk.TransactionalSMSApi(sib_api_v3_sdk.ApiClient(configuration))
+
+    def send(self, phone_number, message):
+        sms_request = sib_api_v3_sdk.SendTransacSms(
+            sender=settings.BREVO_DEFAULT_SENDER,
+            recipient=phone_number,
+            content=message,
+            type="transactional"
+        )
+        try:
+            api_response = self.api.send_transac_sms(sms_request)
+        except ApiException as e:
+            error = f"Exception when calling TransactionalSMSApi->send_transac_sms: {e}"
+            if e.status is None or e.status == 429 or e.status >= 500:
+                raise TransientSMSError(error) from e
+            raise SMSError(error) from e
+        except HTTPError as e:
+            raise TransientSMSError(str(e)) from e
         return {
-            'success': True,
             'message_id': api_response.message_id,
             'sms_count': api_response.sms_count,
             'remaining_credits': api_response.remaining_credits
         }
-    except ApiException as e:
+
+
+class LocmemSMSBackend:
+    """Collects messages in ``outbox``; ``SMS_STUB_LATENCY`` simulates the provider round trip."""
+
+    def __init__(self, latency=None):
+        self.latency = getattr(settings, 'SMS_STUB_LATENCY', 0) if latency is None else latency
+        self.outbox = []
+        self._lock = threading.Lock()
+
+    def send(self, phone_number, message):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.outbox.append((phone_number, message))
         return {
-            'success': False,
-            'error': f"Exception when calling TransactionalSMSApi->send_transac_sms: {e}"
+            'message_id': f'<{uuid.uuid4()}@locmem>',
+            'sms_count': 1,
+            'remaining_credits': None
         }
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Returns the time waited."""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CacheRateLimiter:
+    """Allows ``rate`` acquisitions per second between every process sharing the default cache."""
+    prefix = 'sms-rate'
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.allowance = max(round(rate), 1)
+
+    def acquire(self):
+        """Take a slot in the current second, sleeping until the next one when it is full. Returns the time waited."""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            now = time.time()
+            window = int(now)
+            key = f'{self.prefix}:{window}'
+            cache.add(key, 0, timeout=5)
+            try:
+                if cache.incr(key) <= self.allowance:
+                    return waited
+            except ValueError:
+                # Evicted between add() and incr()
+                continue
+            delay = window + 1 - now
+            time.sleep(delay)
+            waited += delay
+
+
+class SMSService:
+    def __init__(self, backend=None, rate=None, burst=None, max_retries=None, backoff=None):
+        self.backend = backend or import_string(settings.SMS_BACKEND)()
+        rate = getattr(settings, 'SMS_RATE_LIMIT', 10) if rate is None else rate
+        if getattr(settings, 'SMS_RATE_LIMITER', 'memory') == 'cache':
+            self.bucket = CacheRateLimiter(rate)
+        else:
+            self.bucket = TokenBucket(rate, getattr(settings, 'SMS_RATE_BURST', None) if burst is None else burst)
+        self.max_retries = getattr(settings, 'SMS_MAX_RETRIES', 3) if max_retries is None else max_retries
+        self.backoff = getattr(settings, 'SMS_RETRY_BACKOFF', 1.0) if backoff is None else backoff
+
+    def send(self, phone_number, message):
+        """
+        Send one SMS, retrying transient failures.
+
+        Returns a dict with ``success`` and ``attempts`` plus either the
+        provider's ``message_id``/``sms_count``/``remaining_credits`` or ``error``.
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            self.bucket.acquire()
+            try:
+                result = self.backend.send(phone_number, message)
+            except TransientSMSError as e:
+                if attempts > self.max_retries:
+                    return {'success': False, 'error': str(e), 'attempts': attempts}
+                delay = self.backoff * (2 ** (attempts - 1))
+                logger.warning(f"SMS to {phone_number} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+            except SMSError as e:
+                return {'success': False, 'error': str(e), 'attempts': attempts}
+            else:
+                return {'success': True, 'attempts': attempts, **result}
+
+    def deliver(self, sms_id):
+        """Send a queued ``SMSMessage`` and store the result on it."""
+        from .models import SMSMessage
+
+        with transaction.atomic():
+            # Locked while sending: a resend of the same message skips it rather than sending it twice
+            sms = SMSMessage.objects.select_for_update(skip_locked=True).filter(pk=sms_id).first()
+            if sms is None or sms.status != SMSMessage.Status.QUEUED:
+                return sms
+            result = self.send(sms.phone_number, sms.message)
+            sms.attempts = result['attempts']
+            if result['success']:
+                sms.status = SMSMessage.Status.SENT
+                sms.provider_message_id = result['message_id'] or ''
+                sms.sms_count = result['sms_count']
+                sms.sent_at = timezone.now()
+            else:
+                sms.status = SMSMessage.Status.FAILED
+                sms.error = result['error']
+                logger.error(f"Failed to send SMS {sms.pk} to {sms.phone_number}: {sms.error}")
+            sms.save(update_fields=['status', 'attempts', 'provider_message_id', 'sms_count', 'error', 'sent_at'])
+        return sms
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_sms_service():
+    """The per-process ``SMSService``."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SMSService()
+    return _service
+
+
+@receiver(setting_changed)
+def reset_sms_service(setting, **kwargs):
+    global _service
+    if setting.startswith('SMS_') or setting.startswith('BREVO_'):
+        _service = None
+
+
+def send_sms_notification(phone_number, message):
+    """
+    Send an SMS notification and wait for the result
+
+    Args:
+        phone_number (str): The recipient's phone number in international format (e.g., +1234567890)
+        message (str): The SMS message content
+
+    Returns:
+        dict: ``success`` plus the provider response or an ``error``
+    """
+    return get_sms_service().send(phone_number, message)
+
+
+def enqueue_sms_batch(phone_numbers, message):
+    """
+    Record one queued ``SMSMessage`` per number and send them on the background
+    SMS pool once the current transaction commits. Returns the messages.
+    """
+    from .models import SMSMessage
+
+    messages = SMSMessage.objects.bulk_create([
+        SMSMessage(phone_number=phone_number, message=message)
+        for phone_number in phone_numbers
+    ])
+    service = get_sms_service()
+
+    def submit():
+        for sms in messages:
+            background.submit('sms', service.deliver, sms.pk)
+
+    transaction.on_commit(submit)
+    return messages
+
+
+def resend_stale_sms(older_than=None):
+    """
+    Send the messages still queued ``older_than`` seconds (default
+    ``SMS_RESEND_AFTER``) after they were recorded: their process exited
+    before its pool got to them. Returns the messages delivered.
+    """
+    from .models import SMSMessage
+
+    if older_than is None:
+        older_than = getattr(settings, 'SMS_RESEND_AFTER', 900)
+    stale = SMSMessage.objects.filter(
+        status=SMSMessage.Status.QUEUED,
+        created_at__lt=timezone.now() - timedelta(seconds=older_than),
+    ).order_by('created_at').values_list('pk', flat=True)
+    service = get_sms_service()
+    delivered = (service.deliver(sms_id) for sms_id in list(stale))
+    return [sms for sms in delivered if sms is not None]
+
+
+def enqueue_sms(phone_number, message):
+    """Send an SMS on the background SMS pool without blocking the caller."""
+    return enqueue_sms_batch([phone_number], message)[0]
@@ -0,0 +1,213 @@
+"""
+Real-time notification delivery over Server-Sent Events.
+
+``NotificationStreamView`` (``/api/notifications/stream/``) keeps one
+long-lived response open per client and writes each new notification as an
+SSE ``notification`` event; the browser's ``EventSource`` reconnects on its
+own and sends ``Last-Event-ID`` so nothing created while it was away is
+missed. Serve the project through ``ocontest.asgi`` (e.g. uvicorn) - under
+WSGI every open stream would hold a worker thread.
+
+New notifications are published by ``notifications.services`` after their
+transaction commits. ``broker`` fans them out to the streams connected to
+this process. With ``NOTIFICATION_STREAM_REDIS_URL`` set, publishing goes
+through a Redis pub/sub channel instead and every worker relays the messages
+it receives to its own streams, so a user connected to any worker is reached.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from ocontest.authentication import authenticate
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = 'notifications:stream'
+
+
+def notification_payload(notification):
+    """The ``NotificationSerializer`` representation, without extra queries."""
+    content_type = ContentType.objects.get_for_id(notification.content_type_id) if notification.content_type_id else None
+    return {
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'related_object_type': content_type.model if content_type else None,
+        'related_object_id': notification.object_id or None,
+    }
+
+
+class NotificationBroker:
+    """
+    In-process pub/sub keyed by user id.
+
+    Subscribers are asyncio queues owned by the event loop serving the
+    stream; ``publish`` may be called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._redis = None
+        self._listener = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100))
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, notifications):
+        """Push saved notifications to their recipients' streams."""
+        redis_client = self._get_redis()
+        if redis_client is None:
+            with self._lock:
+                connected = [n for n in notifications if n.recipient_id in self._subscribers]
+            self.deliver([(n.recipient_id, notification_payload(n)) for n in connected])
+            return
+        messages = [(n.recipient_id, notification_payload(n)) for n in notifications]
+        if not messages:
+            return
+        pipeline = redis_client.pipeline(transaction=False)
+        for user_id, payload in messages:
+            pipeline.publish(REDIS_CHANNEL, json.dumps({'user_id': user_id, 'payload': payload}))
+        pipeline.execute()
+
+    def deliver(self, messages):
+        """Hand ``(user_id, payload)`` pairs to the streams connected here."""
+        with self._lock:
+            targets = [
+                (subscriber, payload)
+                for user_id, payload in messages
+                for subscriber in self._subscribers.get(user_id, ())
+            ]
+        for (loop, queue), payload in targets:
+            loop.call_soon_threadsafe(self._put, queue, payload)
+
+    @staticmethod
+    def _put(queue, payload):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # A stalled client; it catches up from Last-Event-ID when it reconnects
+            pass
+
+    def _get_redis(self):
+        url = getattr(settings, 'NOTIFICATION_STREAM_REDIS_URL', '')
+        if not url:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(url)
+        return self._redis
+
+    def _ensure_listener(self):
+        if self._listener is not None or self._get_redis() is None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name='notification-stream-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        delay = 1
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                delay = 1
+                for message in pubsub.listen():
+                    try:
+                        data = json.loads(message['data'])
+                        self.deliver([(data['user_id'], data['payload'])])
+                    except Exception:
+                        logger.exception('Dropped malformed notification stream message')
+            except Exception:
+                # Streams miss what is published meanwhile; they catch up with Last-Event-ID on reconnect
+                logger.exception('Notification stream listener lost its connection')
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+broker = NotificationBroker()
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+async def event_stream(user_id, last_event_id=None, keepalive=None):
+    """Yield SSE frames for ``user_id`` until the client goes away."""
+    keepalive = keepalive or getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE', 15)
+    subscriber = broker.subscribe(user_id)
+    try:
+        yield f"retry: {getattr(settings, 'NOTIFICATION_STREAM_RETRY_MS', 3000)}\n\n"
+        if last_event_id is not None:
+            missed = await sync_to_async(list)(
+                Notification.objects.filter(recipient_id=user_id, pk__gt=last_event_id).order_by('pk')[:100]
+            )
+            for notification in missed:
+                last_event_id = notification.pk
+                yield format_event(notification_payload(notification))
+        queue = subscriber[1]
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            if last_event_id is not None and payload['id'] <= last_event_id:
+                continue
+            yield format_event(payload)
+    finally:
+        broker.unsubscribe(user_id, subscriber)
+
+
+class NotificationStreamView(View):
+    async def get(self, request):
+        user = await sync_to_async(authenticate)(request)
+        if user is None or not user.is_active:
+            return HttpResponse(status=401)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            event_stream(user.pk, last_event_id), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -1,3 +1,424 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CreatorProfile, User
+from ocontest.testing import create_brand, create_contest, create_creator
+from .fanout import create_fanout, resume_pending_fanouts, run_fanout
+from .models import Notification, NotificationFanout, SMSMessage
+from .services import (
+    create_notification, create_notifications_bulk, mark_all_notifications_as_read,
+    mark_notification_as_read,
+)
+from .sms_service import (
+    CacheRateLimiter, LocmemSMSBackend, SMSError, SMSService, TokenBucket, TransientSMSError,
+    enqueue_sms_batch, get_sms_service,
+)
+from .streaming import NotificationBroker, broker, event_stream
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, NOTIFICATION_FANOUT_CHUNK_SIZE=3)
+class NotificationFanoutTests(TestCase):
+    def setUp(self):
+        self.brand = create_brand()
+        self.creators = [
+            create_creator(f'creator{i}@example.com', phone_number=f'+25470000000{i}')
+            for i in range(7)
+        ]
+        CreatorProfile.objects.filter(user=self.creators[0]).update(receive_sms_notifications=True)
+        self.contest = create_contest(self.brand, 'Launch Contest', prize=500, status='upcoming')
+
+    @mock.patch('notifications.fanout.enqueue_sms_batch')
+    def test_going_live_fans_out_to_every_creator_in_chunks(self, enqueue_sms):
+        self.contest.status = 'live'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contest.save()
+
+        fanout = NotificationFanout.objects.get()
+        self.assertEqual(fanout.status, NotificationFanout.Status.COMPLETED)
+        self.assertEqual(fanout.processed, 7)
+        self.assertEqual(fanout.total_recipients, 7)
+        self.assertEqual(fanout.last_recipient_id, self.creators[-1].pk)
+        self.assertEqual(
+            Notification.objects.filter(notification_type='new_contest').count(), 7
+        )
+        self.assertFalse(Notification.objects.filter(recipient=self.brand).exists())
+        enqueue_sms.assert_called_once_with([self.creators[0].phone_number], fanout.sms_message)
+
+    @mock.patch('notifications.fanout.enqueue_sms_batch')
+    def test_saving_a_live_contest_again_does_not_notify(self, enqueue_sms):
+        self.contest.status = 'live'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contest.save()
+            self.contest.save()
+        self.assertEqual(NotificationFanout.objects.count(), 1)
+
+    @mock.patch('notifications.fanout.enqueue_sms_batch')
+    def test_interrupted_fanout_resumes_without_duplicates(self, enqueue_sms):
+        with self.captureOnCommitCallbacks(execute=False):
+            fanout = create_fanout(
+                notification_type='new_contest', title='New Contest Available',
+                message='Hello', related_object=self.contest
+            )
+
+        original_bulk_create = Notification.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError('worker died')
+            return original_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                run_fanout(fanout.pk)
+
+        fanout.refresh_from_db()
+        self.assertEqual(fanout.status, NotificationFanout.Status.FAILED)
+        self.assertEqual(fanout.processed, 3)
+        self.assertEqual(Notification.objects.count(), 3)
+
+        run_fanout(fanout.pk)
+        fanout.refresh_from_db()
+        self.assertEqual(fanout.status, NotificationFanout.Status.COMPLETED)
+        self.assertEqual(fanout.processed, 7)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient_id', flat=True)),
+            sorted(creator.pk for creator in self.creators)
+        )
+
+
+    @mock.patch('notifications.fanout.enqueue_sms_batch')
+    def test_running_fanout_is_left_to_its_worker_until_the_lease_expires(self, enqueue_sms):
+        with self.captureOnCommitCallbacks(execute=False):
+            fanout = create_fanout(
+                notification_type='new_contest', title='New Contest Available',
+                message='Hello', related_object=self.contest
+            )
+        NotificationFanout.objects.filter(pk=fanout.pk).update(
+            status=NotificationFanout.Status.RUNNING,
+            lease_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertIsNone(run_fanout(fanout.pk))
+        self.assertEqual(resume_pending_fanouts(), [])
+        self.assertFalse(Notification.objects.exists())
+
+        NotificationFanout.objects.filter(pk=fanout.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        [resumed] = resume_pending_fanouts()
+        self.assertEqual(resumed.status, NotificationFanout.Status.COMPLETED)
+        self.assertIsNone(resumed.lease_expires_at)
+        self.assertEqual(Notification.objects.count(), 7)
+        self.assertIsNone(run_fanout(fanout.pk))
+
+class FlakySMSBackend(LocmemSMSBackend):
+    def __init__(self, failures, error=TransientSMSError):
+        super().__init__(latency=0)
+        self.failures = failures
+        self.error = error
+
+    def send(self, phone_number, message):
+        if self.failures:
+            self.failures -= 1
+            raise self.error('provider unavailable')
+        return super().send(phone_number, message)
+
+
+@override_settings(
+    BACKGROUND_TASKS_EAGER=True,
+    SMS_BACKEND='notifications.sms_service.LocmemSMSBackend',
+    SMS_RATE_LIMIT=0,
+)
+class SMSServiceTests(TestCase):
+    def test_transient_failures_are_retried_with_backoff(self):
+        service = SMSService(backend=FlakySMSBackend(failures=2), max_retries=3, backoff=0.01)
+        with mock.patch('notifications.sms_service.time.sleep') as sleep:
+            result = service.send('+254700000000', 'Hello')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.01, 0.02])
+
+    def test_permanent_failures_are_not_retried(self):
+        service = SMSService(backend=FlakySMSBackend(failures=1, error=SMSError), backoff=0)
+        result = service.send('+254700000000', 'Hello')
+        self.assertFalse(result['success'])
+        self.assertEqual(result['attempts'], 1)
+
+    def test_batch_records_a_result_per_message(self):
+        numbers = ['+254700000001', '+254700000002', '+254700000003']
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_sms_batch(numbers, 'New contest!')
+
+        self.assertEqual(
+            SMSMessage.objects.filter(status=SMSMessage.Status.SENT).count(), 3
+        )
+        self.assertEqual(
+            sorted(number for number, _ in get_sms_service().backend.outbox), numbers
+        )
+        self.assertTrue(all(sms.provider_message_id for sms in SMSMessage.objects.all()))
+
+    def test_stale_queued_messages_are_resent(self):
+        stale, fresh = SMSMessage.objects.bulk_create([
+            SMSMessage(phone_number='+254700000001', message='Lost with its worker'),
+            SMSMessage(phone_number='+254700000002', message='Still in the pool'),
+        ])
+        SMSMessage.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        outbox = get_sms_service().backend.outbox
+        outbox.clear()
+
+        out = io.StringIO()
+        call_command('resend_queued_sms', stdout=out)
+        self.assertIn('Resent 1 queued SMS: 1 sent, 0 failed', out.getvalue())
+        self.assertEqual(outbox, [('+254700000001', 'Lost with its worker')])
+        self.assertEqual(SMSMessage.objects.get(pk=stale.pk).status, SMSMessage.Status.SENT)
+        self.assertEqual(SMSMessage.objects.get(pk=fresh.pk).status, SMSMessage.Status.QUEUED)
+
+        call_command('resend_queued_sms', stdout=out)
+        self.assertIn('No stale queued SMS.', out.getvalue())
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+
+    def test_cache_rate_limiter_is_shared_between_processes(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        clock = [1000.5]
+
+        def sleep(delay):
+            clock[0] += delay
+
+        # Two limiters stand in for two worker processes sharing the cache
+        first, second = CacheRateLimiter(rate=2), CacheRateLimiter(rate=2)
+        with mock.patch('notifications.sms_service.time.time', side_effect=lambda: clock[0]), \
+                mock.patch('notifications.sms_service.time.sleep', side_effect=sleep):
+            self.assertEqual(first.acquire(), 0.0)
+            self.assertEqual(second.acquire(), 0.0)
+            self.assertEqual(first.acquire(), 0.5)
+            self.assertEqual(second.acquire(), 0.0)
+            self.assertEqual(clock[0], 1001.0)
+
+
+class BulkNotificationTests(APITestCase):
+    def setUp(self):
+        self.brand = create_brand()
+        self.contest = create_contest(self.brand, 'Launch Contest', prize=500, status='upcoming')
+
+    def create_creators(self, count):
+        # Plain rows: the bulk path never needs the profiles
+        return User.objects.bulk_create([
+            User(email=f'bulk{i}@example.com', role='creator', is_active=True)
+            for i in range(count)
+        ])
+
+    def test_batches_inserts_and_links_related_object(self):
+        creators = self.create_creators(25)
+        with CaptureQueriesContext(connection) as queries:
+            count = create_notifications_bulk(
+                iter(creators), 'new_contest', 'Title', 'Message',
+                related_object=self.contest, batch_size=10
+            )
+        self.assertEqual(count, 25)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            Notification.objects.filter(object_id=self.contest.pk, content_type__model='contest').count(), 25
+        )
+
+    def test_each_batch_is_committed_on_its_own(self):
+        creators = self.create_creators(25)
+        bulk_create = Notification.objects.bulk_create
+        calls = []
+
+        def fail_third_batch(batch):
+            calls.append(len(batch))
+            if len(calls) == 3:
+                raise DatabaseError('connection lost')
+            return bulk_create(batch)
+
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=fail_third_batch):
+            with self.assertRaises(DatabaseError):
+                create_notifications_bulk(creators, 'new_contest', 'Title', 'Message', self.contest, batch_size=10)
+        self.assertEqual(Notification.objects.count(), 20)
+
+    def test_create_view_query_count_does_not_grow_with_recipients(self):
+        self.client.force_authenticate(user=self.brand)
+        url = reverse('notifications:create-notification')
+        payload = {
+            'type': 'new_contest', 'title': 'Hello', 'message': 'World',
+            'link': f'/contests/{self.contest.pk}', 'recipientRole': 'creator'
+        }
+
+        self.create_creators(2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.data['count'], 2)
+
+        Notification.objects.all().delete()
+        User.objects.bulk_create([
+            User(email=f'more{i}@example.com', role='creator', is_active=True) for i in range(6)
+        ])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Notification.objects.filter(object_id=self.contest.pk).count(), 8)
+
+
+class UnreadCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.brand = create_brand()
+        self.creator = create_creator()
+        self.contest = create_contest(self.brand, 'Launch Contest', prize=500, status='upcoming')
+        self.url = reverse('notifications:unread-notification-count')
+        self.client.force_authenticate(user=self.creator)
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification(self.creator, 'new_contest', 'Title', 'Message', self.contest)
+
+    def get_count(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data['unread_count']
+
+    def test_count_is_cached_after_first_read(self):
+        self.notify()
+        self.notify()
+        self.assertEqual(self.get_count(), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_count(), 2)
+        self.assertFalse(any('COUNT' in q['sql'] for q in queries.captured_queries))
+
+    def test_writes_keep_cached_count_in_step(self):
+        first = self.notify()
+        self.assertEqual(self.get_count(), 1)
+
+        self.notify()
+        self.assertEqual(self.get_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_notification_as_read(first.pk, self.creator)
+            mark_notification_as_read(first.pk, self.creator)
+        self.assertEqual(self.get_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notifications_bulk([self.creator], 'new_contest', 'Title', 'Message', self.contest)
+        self.assertEqual(self.get_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_all_notifications_as_read(self.creator)
+        self.assertEqual(self.get_count(), 0)
+        self.assertFalse(self.creator.notifications.filter(is_read=False).exists())
+
+
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.brand = create_brand()
+        self.creator = create_creator()
+        self.contest = create_contest(self.brand, 'Launch Contest', prize=500, status='upcoming')
+        self.url = reverse('notifications:notification-stream')
+
+    def test_new_notifications_are_pushed_to_connected_streams(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        stream = event_stream(self.creator.pk)
+        self.assertTrue(loop.run_until_complete(stream.__anext__()).startswith('retry:'))
+        self.assertEqual(broker.connection_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = create_notification(
+                self.creator, 'new_contest', 'Contest is live', 'Message', self.contest
+            )
+            create_notification(self.brand, 'new_submission', 'Not for this stream', 'Message', self.contest)
+
+        frame = loop.run_until_complete(asyncio.wait_for(stream.__anext__(), timeout=1))
+        self.assertIn(f'id: {notification.pk}\nevent: notification\n', frame)
+        self.assertIn('Contest is live', frame)
+        self.assertIn('"related_object_type": "contest"', frame)
+
+        loop.run_until_complete(stream.aclose())
+        self.assertEqual(broker.connection_count(), 0)
+
+    def test_publish_failure_does_not_fail_the_commit(self):
+        with mock.patch.object(broker, 'publish', side_effect=ConnectionError('redis is down')):
+            with self.assertLogs('notifications.services', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    create_notification(self.creator, 'new_contest', 'Contest is live', 'Message', self.contest)
+                    create_notifications_bulk([self.creator], 'new_contest', 'Again', 'Message', self.contest)
+        self.assertEqual(self.creator.notifications.count(), 2)
+
+    def test_redis_listener_reconnects(self):
+        class StopListening(BaseException):
+            pass
+
+        def pubsub(*user_ids, error=None):
+            def messages_then_error():
+                for user_id in user_ids:
+                    yield {'data': json.dumps({'user_id': user_id, 'payload': {'id': user_id}})}
+                raise error or StopListening
+            connection = mock.Mock()
+            connection.listen.side_effect = messages_then_error
+            return connection
+
+        lost = mock.Mock()
+        lost.subscribe.side_effect = ConnectionError('still down')
+        relay = NotificationBroker()
+        relay._redis = mock.Mock()
+        relay._redis.pubsub.side_effect = [pubsub(1, error=ConnectionError('connection reset')), lost, pubsub(2)]
+
+        with mock.patch.object(relay, 'deliver') as deliver, \
+                mock.patch('notifications.streaming.time.sleep') as sleep, \
+                self.assertLogs('notifications.streaming', 'ERROR'), self.assertRaises(StopListening):
+            relay._listen()
+
+        self.assertEqual(
+            [call.args[0] for call in deliver.call_args_list], [[(1, {'id': 1})], [(2, {'id': 2})]]
+        )
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2])
+
+    def test_stream_requires_a_valid_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, {'token': 'not-a-token'}).status_code, 401)
+
+        response = self.client.get(self.url, {'token': str(AccessToken.for_user(self.creator))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.streaming)
+
+
+class NotificationListConditionalGetTests(APITestCase):
+    def setUp(self):
+        brand = create_brand()
+        self.creator = create_creator()
+        self.contest = create_contest(brand, 'Launch Contest', prize=500, status='upcoming')
+        self.notification = create_notification(self.creator, 'new_contest', 'Title', 'Message', self.contest)
+        self.url = reverse('notifications:notification-list')
+        self.client.force_authenticate(user=self.creator)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual((response.status_code, len(queries.captured_queries)), (304, 1))
+
+        # Reading a notification changes the list without touching created_at
+        mark_notification_as_read(self.notification.pk, self.creator)
+        response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
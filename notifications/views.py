@@ -2,27 +2,46 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Max, Q
+from ocontest.conditional import ConditionalGetMixin
+from ocontest.pagination import FeedCursorPagination
 from .models import Notification
 from .serializers import NotificationSerializer
-from .services import mark_notification_as_read, mark_all_notifications_as_read
+from .streaming import NotificationStreamView
+from .services import create_notifications_bulk, get_unread_count, mark_notification_as_read, mark_all_notifications_as_read
 from contests.models import Contest
 
 User = get_user_model()
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedCursorPagination
+    validator_aggregates = {
+        'modified': Max('created_at'),
+        'count': Count('pk'),
+        'unread': Count('pk', filter=Q(is_read=False)),
+    }
 
     def get_queryset(self):
-        return self.request.user.notifications.all().order_by('-created_at')
+        return self.request.user.notifications.select_related('content_type')
+
+    def get_validator_queryset(self):
+        return self.request.user.notifications.all()
 
 class UnreadNotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedCursorPagination
 
     def get_queryset(self):
-        return self.request.user.notifications.filter(is_read=False).order_by('-created_at')
+        return self.request.user.notifications.filter(is_read=False).select_related('content_type')
+
+class UnreadNotificationCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread_count': get_unread_count(request.user)})
 
 class MarkNotificationReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -53,35 +72,23 @@ class CreateNotificationView(APIView):
             if link and '/contests/' in link:
                 contest_id = link.split('/contests/')[-1].split('/')[0]
 
+            # If this is a contest notification, link it to the contest
+            contest = None
+            if contest_id:
+                contest = Contest.objects.filter(id=contest_id).first()
+
             # Create notification for all users with the specified role
-            notifications = []
-            recipients = User.objects.filter(role=recipient_role, is_active=True)
-
-            for recipient in recipients:
-                notification_data = {
-                    'recipient': recipient,
-                    'notification_type': notification_type,
-                    'title': title,
-                    'message': message
-                }
-
-                # If this is a contest notification, link it to the contest
-                if contest_id:
-                    try:
-                        contest = Contest.objects.get(id=contest_id)
-                        notification_data.update({
-                            'content_type': ContentType.objects.get_for_model(Contest),
-                            'object_id': contest.id
-                        })
-                    except Contest.DoesNotExist:
-                        pass
-
-                notification = Notification.objects.create(**notification_data)
-                notifications.append(notification)
+            count = create_notifications_bulk(
+                User.objects.filter(role=recipient_role, is_active=True),
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                related_object=contest
+            )
 
             return Response({
                 'status': 'success',
-                'count': len(notifications)
+                'count': count
             })
         except Exception as e:
             return Response(
@@ -0,0 +1,22 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+def authenticate(request):
+    """
+    Return the JWT-authenticated user of a plain Django request, or ``None``.
+
+    ``EventSource`` and ``<video>`` requests cannot set headers, so besides
+    the usual ``Authorization: Bearer`` header the access token may be passed
+    as ``?token=``.
+    """
+    authentication = JWTAuthentication()
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        result = authentication.authenticate(request)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return result[0] if result else None
@@ -0,0 +1,60 @@
+"""
+Bounded in-process worker pools for work that must not block a request.
+
+Each named pool is a ``ThreadPoolExecutor`` whose size comes from
+``BACKGROUND_WORKERS`` (falling back to ``'default'``). Database connections
+opened by a task are closed when it finishes.
+
+Set ``BACKGROUND_TASKS_EAGER = True`` to run tasks inline, e.g. in tests.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(name):
+    with _lock:
+        if name not in _pools:
+            sizes = getattr(settings, 'BACKGROUND_WORKERS', {})
+            max_workers = sizes.get(name, sizes.get('default', 4))
+            _pools[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'bg-{name}')
+        return _pools[name]
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+        raise
+    finally:
+        if not getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+            connection.close()
+
+
+def submit(pool_name, fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the named pool and return a ``Future``."""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        future = Future()
+        try:
+            future.set_result(_run(fn, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_pool(pool_name).submit(_run, fn, args, kwargs)
+
+
+def shutdown(wait=True):
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
@@ -0,0 +1,332 @@
+"""
+Buffered view/like counters.
+
+Hot read endpoints (contest detail, featured contests, video views) used to
+issue an UPDATE per request. Instead they now call ``increment()``, which only
+records the delta in a buffer; a background flusher applies the buffered
+deltas in batches with ``F()`` expressions so no increment is lost.
+
+Two buffer backends are available, selected by ``COUNTER_BUFFER_BACKEND``:
+
+* ``'memory'`` - a per-process dictionary. Cheapest, but pending deltas are
+  only visible to (and flushable by) the process that recorded them.
+* ``'cache'`` - deltas live in the default cache (Redis in production), so
+  every worker sees the same approximate counts and ``manage.py
+  flush_counters`` can flush them from outside the web process.
+
+``live_value()`` returns the stored value plus the pending delta and is what
+serializers should display. ``LiveCounterField`` does so for each row; a list
+serialized with ``LiveCounterListSerializer`` reads the pending deltas of the
+whole page with one ``pending()`` call instead.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, models, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Sent once per (model, field) after a flush with ``deltas={pk: delta}``.
+counters_flushed = Signal()
+
+FLUSH_BATCH_SIZE = 500
+
+
+def make_key(model, pk, field):
+    return f'{model._meta.label_lower}:{field}:{pk}'
+
+
+def parse_key(key):
+    label, field, pk = key.rsplit(':', 2)
+    model = apps.get_model(label)
+    return model, field, model._meta.pk.to_python(pk)
+
+
+class MemoryCounterBackend:
+    """Pending deltas kept in this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas = defaultdict(int)
+
+    def incr(self, key, amount):
+        with self._lock:
+            self._deltas[key] += amount
+
+    def pending(self, keys):
+        with self._lock:
+            return {key: self._deltas.get(key, 0) for key in keys}
+
+    def collect(self):
+        with self._lock:
+            deltas = dict(self._deltas)
+            self._deltas.clear()
+        return deltas
+
+    def acknowledge(self, deltas):
+        pass
+
+    def requeue(self, deltas):
+        for key, amount in deltas.items():
+            self.incr(key, amount)
+
+
+class CacheCounterBackend:
+    """
+    Pending deltas kept in the cache backend and shared by all workers.
+
+    Each counter has a delta key that is only ever changed with atomic
+    ``incr``/``decr``. The first increment after a flush also registers the
+    counter in a numbered slot so that the flusher can find dirty counters
+    without scanning the keyspace.
+
+    A slot number is handed out before the slot is written, so ``collect()``
+    stops at the first slot that is still missing and picks it up on a later
+    flush. A slot still missing after ``register_timeout`` seconds belonged
+    to a worker that died in between; it is skipped, and its counter
+    registers again once its dirty marker expires.
+    """
+    prefix = 'counters'
+    register_timeout = 30
+    dirty_timeout = 600
+
+    def _delta_key(self, key):
+        return f'{self.prefix}:delta:{key}'
+
+    def _dirty_key(self, key):
+        return f'{self.prefix}:dirty:{key}'
+
+    def _slot_key(self, slot):
+        return f'{self.prefix}:slot:{slot}'
+
+    def incr(self, key, amount):
+        delta_key = self._delta_key(key)
+        if not cache.add(delta_key, amount, timeout=None):
+            try:
+                cache.incr(delta_key, amount)
+            except ValueError:
+                # The key was evicted between add() and incr()
+                cache.add(delta_key, amount, timeout=None)
+        self._register(key)
+
+    def _register(self, key):
+        if not cache.add(self._dirty_key(key), 1, timeout=self.dirty_timeout):
+            return
+        seq_key = f'{self.prefix}:seq'
+        cache.add(seq_key, 0, timeout=None)
+        slot = cache.incr(seq_key)
+        cache.set(self._slot_key(slot), key, timeout=None)
+
+    def pending(self, keys):
+        stored = cache.get_many([self._delta_key(key) for key in keys])
+        return {key: stored.get(self._delta_key(key), 0) for key in keys}
+
+    def collect(self):
+        lock_key = f'{self.prefix}:flush-lock'
+        if not cache.add(lock_key, 1, timeout=60):
+            return {}
+        try:
+            seq = cache.get(f'{self.prefix}:seq', 0)
+            start = cache.get(f'{self.prefix}:flushed', 0)
+            slots = cache.get_many([self._slot_key(slot) for slot in range(start + 1, seq + 1)])
+            end = self._last_written_slot(slots, start, seq)
+            slot_keys = [self._slot_key(slot) for slot in range(start + 1, end + 1)]
+            keys = {slots[slot_key] for slot_key in slot_keys if slot_key in slots}
+            # Unregister before reading so that concurrent increments re-register
+            cache.delete_many([self._dirty_key(key) for key in keys])
+            pending = self.pending(keys)
+            cache.set(f'{self.prefix}:flushed', end, timeout=None)
+            cache.delete_many(slot_keys)
+        finally:
+            cache.delete(lock_key)
+        return {key: amount for key, amount in pending.items() if amount}
+
+    def _last_written_slot(self, slots, start, seq):
+        """The last slot up to which every slot after ``start`` has been written (or given up on)."""
+        gap_key = f'{self.prefix}:gap'
+        for slot in range(start + 1, seq + 1):
+            if self._slot_key(slot) in slots:
+                continue
+            gap = cache.get(gap_key)
+            if gap is None or gap[0] != slot:
+                cache.set(gap_key, (slot, time.time()), timeout=None)
+                return slot - 1
+            if time.time() - gap[1] < self.register_timeout:
+                return slot - 1
+            logger.warning('Counter slot %s was never written; skipping it', slot)
+        return seq
+
+    def acknowledge(self, deltas):
+        for key, amount in deltas.items():
+            try:
+                cache.decr(self._delta_key(key), amount)
+            except ValueError:
+                pass
+
+    def requeue(self, deltas):
+        for key in deltas:
+            self._register(key)
+
+
+BACKENDS = {
+    'memory': MemoryCounterBackend,
+    'cache': CacheCounterBackend,
+}
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backend = None
+        self._flusher = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            name = getattr(settings, 'COUNTER_BUFFER_BACKEND', 'memory')
+            self._backend = BACKENDS[name]()
+        return self._backend
+
+    def increment(self, model, pk, field, amount=1):
+        self.backend.incr(make_key(model, pk, field), amount)
+        self._ensure_flusher()
+
+    def pending(self, model, pks, field):
+        return self.pending_fields(model, pks, [field])[field]
+
+    def pending_fields(self, model, pks, fields):
+        """``{field: {pk: delta}}`` for several counters of the same rows, read at once."""
+        keys = {make_key(model, pk, field): (field, pk) for field in fields for pk in pks}
+        result = {field: {} for field in fields}
+        for key, amount in self.backend.pending(keys).items():
+            field, pk = keys[key]
+            result[field][pk] = amount
+        return result
+
+    def flush(self):
+        """Apply all buffered deltas to the database. Returns the number of rows updated."""
+        deltas = self.backend.collect()
+        if not deltas:
+            return 0
+
+        grouped = defaultdict(lambda: defaultdict(list))
+        for key, amount in deltas.items():
+            model, field, pk = parse_key(key)
+            grouped[(model, field)][amount].append(pk)
+
+        updated = 0
+        try:
+            with transaction.atomic():
+                for (model, field), by_amount in grouped.items():
+                    for amount, pks in by_amount.items():
+                        for start in range(0, len(pks), FLUSH_BATCH_SIZE):
+                            updated += model._default_manager.filter(
+                                pk__in=pks[start:start + FLUSH_BATCH_SIZE]
+                            ).update(**{field: F(field) + amount})
+        except Exception:
+            self.backend.requeue(deltas)
+            raise
+        self.backend.acknowledge(deltas)
+
+        for (model, field), by_amount in grouped.items():
+            counters_flushed.send(
+                sender=model,
+                field=field,
+                deltas={pk: amount for amount, pks in by_amount.items() for pk in pks}
+            )
+        return updated
+
+    def clear(self):
+        """Drop every pending delta without writing it."""
+        self.backend.acknowledge(self.backend.collect())
+
+    def _ensure_flusher(self):
+        interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 10)
+        if not interval or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run_flusher, args=(interval,), name='counter-flusher', daemon=True
+                )
+                self._flusher.start()
+                atexit.register(self.flush_quietly)
+
+    def _run_flusher(self, interval):
+        while True:
+            time.sleep(interval)
+            self.flush_quietly()
+            close_old_connections()
+
+    def flush_quietly(self):
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Failed to flush buffered counters')
+            return 0
+
+
+buffer = CounterBuffer()
+
+
+def increment(instance, field, amount=1):
+    """Buffer ``amount`` for ``instance.<field>``; no database write happens here."""
+    buffer.increment(type(instance), instance.pk, field, amount)
+
+
+def live_value(instance, field):
+    """Stored value plus any increments that have not been flushed yet."""
+    pending = buffer.pending(type(instance), [instance.pk], field)[instance.pk]
+    return (getattr(instance, field) or 0) + pending
+
+
+def flush():
+    return buffer.flush()
+
+
+class LiveCounterField(serializers.ReadOnlyField):
+    """Read-only serializer field showing the approximate live value of a counter."""
+
+    def get_attribute(self, instance):
+        batch = getattr(self, '_pending_batch', None)
+        if batch is not None and instance.pk in batch:
+            return (getattr(instance, self.source) or 0) + batch[instance.pk]
+        return live_value(instance, self.source)
+
+
+@contextmanager
+def batched_pending(serializer, instances):
+    """Read the pending deltas behind ``serializer``'s ``LiveCounterField``s for all ``instances`` at once."""
+    fields = [field for field in serializer._readable_fields if isinstance(field, LiveCounterField)]
+    if not fields or not instances:
+        yield
+        return
+    pending = buffer.pending_fields(
+        type(instances[0]), [instance.pk for instance in instances], [field.source for field in fields]
+    )
+    for field in fields:
+        field._pending_batch = pending[field.source]
+    try:
+        yield
+    finally:
+        for field in fields:
+            del field._pending_batch
+
+
+class LiveCounterListSerializer(serializers.ListSerializer):
+    """Serializes a page of rows with one ``pending()`` call for their live counters."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        with batched_pending(self.child, items):
+            return super().to_representation(items)
@@ -0,0 +1,139 @@
+"""
+Cached serialized representations ("fragments") of individual rows.
+
+A serializer with ``FragmentCacheMixin`` stores what it renders for a row in
+the default cache under ``(model, pk, updated_at, serializer, fragment_version)``.
+Saving the row moves ``updated_at`` and with it the key, so stale fragments
+are never read and simply expire; code that writes with ``update()`` sets
+``updated_at`` itself. Bump ``fragment_version`` when a serializer's output
+changes.
+
+Fields listed in ``fragment_volatile`` (live counters, annotated counts,
+values read from related rows) are left out of the fragment and rendered
+fresh on every call. With ``Meta.list_serializer_class = FragmentListSerializer``
+a page of rows is read with one ``get_many``, only the misses are serialized
+and they are written back with one ``set_many``; the page's live counters are
+read at once as by ``LiveCounterListSerializer``.
+
+Hits and misses are counted per serializer in this process (``stats()``).
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from rest_framework.fields import SkipField
+
+from .counters import LiveCounterListSerializer
+
+KEY_PREFIX = 'fragment:'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'FRAGMENT_CACHE_ENABLED', True)
+
+
+def record(serializer_name, outcome):
+    with _stats_lock:
+        _stats[(serializer_name, outcome)] += 1
+
+
+def stats():
+    """``{serializer: {'hits', 'misses', 'hit_ratio'}}`` for this process."""
+    with _stats_lock:
+        counts = dict(_stats)
+    serializers_seen = {}
+    for (name, outcome), count in counts.items():
+        serializers_seen.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+    for entry in serializers_seen.values():
+        total = entry['hits'] + entry['misses']
+        entry['hit_ratio'] = round(entry['hits'] / total, 3) if total else None
+    return serializers_seen
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class FragmentCacheMixin:
+    """
+    Serve a ``ModelSerializer``'s representation of unchanged rows from the cache.
+
+    Rows without a primary key or ``updated_at`` render as usual.
+    """
+    fragment_version = 1
+    fragment_volatile = ()
+    fragment_timeout = None
+
+    def fragment_key(self, instance):
+        updated_at = getattr(instance, 'updated_at', None)
+        if not enabled() or instance.pk is None or updated_at is None:
+            return None
+        serializer = type(self)
+        return (
+            f'{KEY_PREFIX}{instance._meta.label_lower}:{instance.pk}:{updated_at.isoformat()}:'
+            f'{serializer.__module__}.{serializer.__qualname__}:{self.fragment_version}'
+        )
+
+    def fragment_cache_timeout(self):
+        return self.fragment_timeout or getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+    def render_volatile(self, instance, fragment):
+        ret = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            if name not in self.fragment_volatile:
+                ret[name] = fragment[name]
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            ret[name] = None if attribute is None else field.to_representation(attribute)
+        return ret
+
+    def to_representation(self, instance):
+        key = self.fragment_key(instance)
+        if key is None:
+            return super().to_representation(instance)
+
+        batch = getattr(self, '_fragment_batch', None)
+        fragment = batch['fragments'].get(key) if batch is not None else cache.get(key)
+        if fragment is not None:
+            record(type(self).__name__, 'hits')
+            return self.render_volatile(instance, fragment)
+
+        record(type(self).__name__, 'misses')
+        data = super().to_representation(instance)
+        fragment = {name: value for name, value in data.items() if name not in self.fragment_volatile}
+        if batch is not None:
+            batch['misses'][key] = fragment
+        else:
+            cache.set(key, fragment, self.fragment_cache_timeout())
+        return data
+
+
+class FragmentListSerializer(LiveCounterListSerializer):
+    """Reads the fragments of a whole page with one ``get_many``."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        child = self.child
+        keys = [key for key in map(child.fragment_key, items) if key]
+        if not keys:
+            return super().to_representation(items)
+
+        child._fragment_batch = {'fragments': cache.get_many(keys), 'misses': {}}
+        try:
+            representation = super().to_representation(items)
+            misses = child._fragment_batch['misses']
+        finally:
+            del child._fragment_batch
+        if misses:
+            cache.set_many(misses, child.fragment_cache_timeout())
+        return representation
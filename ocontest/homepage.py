@@ -0,0 +1,99 @@
+"""
+The landing page's data in one response.
+
+``build(sections)`` returns ``{section: data}`` for the requested entries of
+``SECTIONS``. Each section is cached on its own for its ``HOMEPAGE_SECTION_TTLS``
+entry and stamped with the versions of the response cache tags it depends on
+(``ocontest.response_cache``). The sections and those tag versions are read
+with a single ``get_many``, so a save that invalidates a tag also invalidates
+the sections built from it. Only the stale sections are rebuilt, each with a
+fixed number of queries.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from accounts.models import User
+from contests.models import Contest
+from contests.serializers import ContestSerializer, FeaturedContestSerializer
+from videos.models import Video
+from videos.serializers import VideoCardSerializer
+from . import counters
+from .response_cache import TAG_PREFIX, record, tag_versions
+
+KEY_PREFIX = 'response-cache:homepage:'
+PAGE_SIZE = 6
+
+
+def featured_contests():
+    return FeaturedContestSerializer(Contest.objects.featured()[:PAGE_SIZE], many=True).data
+
+
+def active_contests():
+    contests = Contest.objects.for_listing().filter(status='live').order_by('-created_at')[:PAGE_SIZE]
+    return ContestSerializer(contests, many=True).data
+
+
+def featured_videos():
+    videos = Video.objects.featured().filter(approval_status=Video.ApprovalStatus.APPROVED)[:PAGE_SIZE]
+    return VideoCardSerializer(videos, many=True).data
+
+
+def stats():
+    contests = Contest.objects.aggregate(
+        total=Count('pk'),
+        live=Count('pk', filter=Q(status='live')),
+        prize_money=Sum('prize'),
+    )
+    return {
+        'total_contests': contests['total'],
+        'live_contests': contests['live'],
+        'total_prize_money': str(contests['prize_money'] or 0),
+        'creators': User.objects.filter(role='creator').count(),
+        'videos': Video.objects.filter(approval_status=Video.ApprovalStatus.APPROVED).count(),
+    }
+
+
+# name: (builder, response cache tags it depends on)
+SECTIONS = {
+    'featured_contests': (featured_contests, ('contests',)),
+    'active_contests': (active_contests, ('contests',)),
+    'featured_videos': (featured_videos, ('videos',)),
+    'stats': (stats, ('contests', 'videos')),
+}
+
+
+def section_timeout(name):
+    return getattr(settings, 'HOMEPAGE_SECTION_TTLS', {}).get(name, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def build(sections):
+    """``{section: data}`` for ``sections``, rebuilding only what is missing or stale."""
+    tags = sorted({tag for name in sections for tag in SECTIONS[name][1]})
+    tag_keys = {tag: f'{TAG_PREFIX}{tag}' for tag in tags}
+    cached = cache.get_many([f'{KEY_PREFIX}{name}' for name in sections] + list(tag_keys.values()))
+
+    versions = {tag: cached[key] for tag, key in tag_keys.items() if key in cached}
+    missing_tags = [tag for tag in tags if tag not in versions]
+    if missing_tags:
+        versions.update(zip(missing_tags, tag_versions(missing_tags)))
+
+    payload = {}
+    rebuilt = {}
+    for name in sections:
+        builder, section_tags = SECTIONS[name]
+        stamp = [versions[tag] for tag in section_tags]
+        entry = cached.get(f'{KEY_PREFIX}{name}')
+        if entry is not None and entry[0] == stamp:
+            record(f'homepage:{name}', 'hits')
+            payload[name] = entry[1]
+            continue
+        record(f'homepage:{name}', 'misses')
+        payload[name] = builder()
+        rebuilt.setdefault(section_timeout(name), {})[f'{KEY_PREFIX}{name}'] = (stamp, payload[name])
+    for timeout, entries in rebuilt.items():
+        cache.set_many(entries, timeout)
+
+    # Showing the featured contests is a view of each, as on their own endpoint
+    for contest in payload.get('featured_contests', ()):
+        counters.buffer.increment(Contest, contest['id'], 'view_count')
+    return payload
@@ -0,0 +1,216 @@
+"""
+Resized WebP and JPEG copies of uploaded images.
+
+Every entry of ``IMAGE_PRESETS`` (``card``, ``avatar``, ``banner``, ``full``)
+describes a box an image is scaled into, cropped to fill it when ``crop`` is
+set and never upscaled. The derivative of an image ``name`` lives at the
+predictable ``image_derivatives/<name>/<preset>.<webp|jpg>``, so serializers
+can list the URLs (``ImageVariantsField``) without touching storage.
+
+``track_image_derivatives`` registers a model image field: new uploads have
+their derivatives built on the background ``'media'`` pool after commit, and
+the derivatives of replaced or deleted images are removed. A derivative that
+is still missing when requested is built by ``serve_media``
+(``ensure_derivative``). ``manage.py image_derivatives`` regenerates or
+purges them in bulk.
+"""
+import io
+import logging
+import posixpath
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from rest_framework import serializers
+from . import background
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = 'image_derivatives'
+FORMATS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+# (model, field name, presets) for every tracked field
+_tracked = []
+
+
+def derivative_name(name, preset, image_format):
+    return f'{DERIVATIVE_DIR}/{name}/{preset}.{FORMATS[image_format]}'
+
+
+def render_derivative(image, preset):
+    """Encode ``image`` for ``preset``: ``{'webp': bytes, 'jpeg': bytes}``."""
+    spec = settings.IMAGE_PRESETS[preset]
+    box = (spec['width'], spec['height'])
+    if spec.get('crop'):
+        # Fill the box, shrunk to the image if it is smaller so nothing is upscaled
+        scale = min(1, image.width / box[0], image.height / box[1])
+        resized = ImageOps.fit(image, (max(1, round(box[0] * scale)), max(1, round(box[1] * scale))), Image.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+    encoded = {}
+    for image_format in FORMATS:
+        frame = resized
+        if image_format == 'jpeg' and frame.mode != 'RGB':
+            # JPEG has no alpha; flatten onto white instead of black
+            frame = Image.new('RGB', resized.size, 'white')
+            rgba = resized.convert('RGBA')
+            frame.paste(rgba, mask=rgba.getchannel('A'))
+        elif frame.mode not in ('RGB', 'RGBA'):
+            frame = frame.convert('RGBA')
+        buffer = io.BytesIO()
+        frame.save(buffer, format=image_format.upper(), quality=quality)
+        encoded[image_format] = buffer.getvalue()
+    return encoded
+
+
+def _open(storage, name):
+    with storage.open(name, 'rb') as original:
+        image = Image.open(original)
+        image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def _save(storage, name, content, overwrite):
+    if storage.exists(name):
+        if not overwrite:
+            return False
+        storage.delete(name)
+    saved = storage.save(name, ContentFile(content))
+    if saved != name:
+        # Another worker wrote it first
+        storage.delete(saved)
+    return True
+
+
+def generate_derivatives(storage, name, presets, overwrite=False):
+    """Write the missing (or, with ``overwrite``, all) derivatives of ``name``; returns how many."""
+    wanted = [
+        preset for preset in presets
+        if overwrite or not all(storage.exists(derivative_name(name, preset, f)) for f in FORMATS)
+    ]
+    if not wanted:
+        return 0
+    image = _open(storage, name)
+    written = 0
+    for preset in wanted:
+        for image_format, content in render_derivative(image, preset).items():
+            written += _save(storage, derivative_name(name, preset, image_format), content, overwrite)
+    return written
+
+
+def purge_derivatives(storage, name):
+    """Delete every derivative of ``name``."""
+    directory = f'{DERIVATIVE_DIR}/{name}'
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for filename in files:
+        storage.delete(f'{directory}/{filename}')
+    return len(files)
+
+
+def _build(model, field_name, pk, name, presets):
+    instance = model.objects.filter(pk=pk).first()
+    # Skip work for an image that was replaced before the task ran
+    if instance is None or getattr(instance, field_name).name != name:
+        return 0
+    try:
+        return generate_derivatives(getattr(instance, field_name).storage, name, presets)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f'Could not build image derivatives of {name}: {e}')
+        return 0
+
+
+def track_image_derivatives(model, field_name, presets):
+    """Build ``presets`` for ``model.<field_name>`` on upload and drop them with the image."""
+    _tracked.append((model, field_name, tuple(presets)))
+    uid = f'image-derivatives-{model._meta.label_lower}-{field_name}'
+
+    def remember_name(sender, instance, raw=False, update_fields=None, **kwargs):
+        instance._image_name_before = None
+        if instance.pk and not raw and (update_fields is None or field_name in update_fields):
+            instance._image_name_before = model.objects.filter(pk=instance.pk).values_list(
+                field_name, flat=True
+            ).first()
+
+    def schedule(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        field_file = getattr(instance, field_name)
+        before = getattr(instance, '_image_name_before', None)
+        if before and before != field_file.name:
+            storage = field_file.storage
+            transaction.on_commit(lambda: purge_derivatives(storage, before))
+        if field_file and (created or before != field_file.name):
+            args = (model, field_name, instance.pk, field_file.name, presets)
+            transaction.on_commit(lambda: background.submit('media', _build, *args))
+
+    def purge(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        if field_file:
+            storage, name = field_file.storage, field_file.name
+            transaction.on_commit(lambda: purge_derivatives(storage, name))
+
+    pre_save.connect(remember_name, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(schedule, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(purge, sender=model, weak=False, dispatch_uid=uid)
+
+
+def variant_urls(field_file, presets):
+    """``{preset: {'webp': url, 'jpeg': url}}`` for an image field's value, or ``None`` without one."""
+    if not field_file:
+        return None
+    return {
+        preset: {
+            image_format: field_file.storage.url(derivative_name(field_file.name, preset, image_format))
+            for image_format in FORMATS
+        }
+        for preset in presets
+    }
+
+
+def tracked_fields():
+    return list(_tracked)
+
+
+def ensure_derivative(name):
+    """
+    Build the derivative ``name`` if it is one a tracked field asks for.
+
+    Returns whether the file now exists. Only originals under a tracked
+    field's ``upload_to`` are read, and only for that field's presets.
+    """
+    if not name.startswith(f'{DERIVATIVE_DIR}/'):
+        return False
+    original, filename = posixpath.split(name[len(DERIVATIVE_DIR) + 1:])
+    preset, _, extension = filename.partition('.')
+    if extension not in FORMATS.values():
+        return False
+    for model, field_name, presets in _tracked:
+        field = model._meta.get_field(field_name)
+        upload_to = str(field.upload_to)
+        if preset in presets and original.startswith(upload_to) and field.storage.exists(original):
+            try:
+                generate_derivatives(field.storage, original, [preset])
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+                logger.warning(f'Could not build image derivatives of {original}: {e}')
+                return False
+            return field.storage.exists(name)
+    return False
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of an image field's derivatives: ``{preset: {'webp': url, 'jpeg': url}}``."""
+
+    def __init__(self, presets, **kwargs):
+        self.presets = presets
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(value, self.presets)
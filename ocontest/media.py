@@ -0,0 +1,174 @@
+"""
+Serving user-uploaded media.
+
+``serve_media`` answers every request under ``MEDIA_URL``. It checks access
+to unapproved videos (``videos.access``), sends ``ETag``/``Last-Modified``
+validators so clients revalidate with a ``304`` and then, depending on
+``MEDIA_SERVE_MODE``:
+
+* ``'django'`` streams the file with ``FileResponse``. WSGI servers with
+  ``wsgi.file_wrapper`` send it with ``sendfile()``; under ASGI (uvicorn, as
+  deployed) it is read in chunks, so prefer nginx for heavy media. A single
+  ``Range`` (honouring ``If-Range``) gets a ``206`` with just those bytes,
+  so seeking in a video does not download it again.
+* ``'x-accel-redirect'`` hands the file to nginx, which then handles ranges
+  itself, from an internal location at ``MEDIA_ACCEL_REDIRECT_PREFIX``::
+
+      location /protected-media/ {
+          internal;
+          alias /path/to/media/;
+      }
+
+* ``'x-sendfile'`` does the same with ``X-Sendfile`` (Apache, lighttpd).
+
+A missing image derivative (``ocontest.images``) is built before serving it.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from videos.access import check_media_access
+from . import images
+from .authentication import authenticate
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# HLS segments; the default table maps .ts to Qt translation files
+mimetypes.add_type('video/mp2t', '.ts')
+
+
+class FileRange:
+    """A file-like object reading at most ``length`` bytes of ``file`` from ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    The inclusive ``(start, end)`` of a single ``bytes=`` range.
+
+    Returns ``None`` when the whole file should be sent instead (no usable
+    range, or several ranges) and raises ``ValueError`` when the range lies
+    outside the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if not int(last):
+            raise ValueError('Empty suffix range')
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Range starts past the end of the file')
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, last_modified):
+    """Whether a ``Range`` may be honoured given the request's ``If-Range``."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Strong comparison only
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def file_response(request, path, name, size, etag, last_modified):
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(name)}"
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    byte_range = None
+    if request.headers.get('Range') and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    response = FileResponse(
+        FileRange(open(path, 'rb'), start, end - start + 1), content_type=content_type, status=206
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _stat(path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        return full_path, os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Media file not found')
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path, file_stat = _stat(path)
+    except Http404:
+        # Image derivatives are built the first time they are asked for
+        if not images.ensure_derivative(path):
+            raise
+        full_path, file_stat = _stat(path)
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404('Media file not found')
+
+    name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    user = request.user if request.user.is_authenticated else authenticate(request)
+    allowed, public = check_media_access(user, name)
+    if not allowed:
+        # Same answer as a missing file, so private uploads cannot be probed
+        raise Http404('Media file not found')
+
+    etag = f'"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"'
+    last_modified = int(file_stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = file_response(request, full_path, name, file_stat.st_size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if public:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400))
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
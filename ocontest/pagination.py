@@ -0,0 +1,69 @@
+"""
+Project-wide pagination for the REST API.
+
+Two modes are available:
+
+* ``StandardPagination`` - page-number pagination with a total count, used by
+  default for admin-style screens (``?page=2&page_size=50``).
+* ``FeedCursorPagination`` - keyset pagination ordered on ``(-created_at, -id)``
+  for large, append-heavy feeds. It never issues a ``COUNT(*)`` and the cost of
+  a page does not depend on how deep the client has scrolled.
+
+Views may set ``page_size`` and ``max_page_size`` attributes to tune the
+defaults; ``API_MAX_PAGE_SIZE`` is a hard ceiling that no view can exceed.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+def get_hard_max_page_size():
+    return getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+
+class ViewPageSizeMixin:
+    """Resolve the page size from the view, the query string and the hard maximum."""
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_max_page_size(self):
+        view_max = getattr(self.view, 'max_page_size', None) or self.max_page_size
+        hard_max = get_hard_max_page_size()
+        return min(view_max, hard_max) if view_max else hard_max
+
+    def get_page_size(self, request):
+        max_page_size = self.get_max_page_size()
+        default = getattr(self.view, 'page_size', None) or self.default_page_size
+        if self.page_size_query_param:
+            try:
+                requested = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                requested = 0
+            if requested > 0:
+                return min(requested, max_page_size)
+        return min(default, max_page_size)
+
+
+class StandardPagination(ViewPageSizeMixin, PageNumberPagination):
+    """Page-number pagination with ``count``, ``next`` and ``previous`` links."""
+    default_page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+    max_page_size = None
+
+
+class FeedCursorPagination(ViewPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination for feeds.
+
+    Views can override the ordering by defining ``get_cursor_ordering()``;
+    the ordering must end in a unique column so that pages never overlap.
+    """
+    default_page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+    max_page_size = None
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            return tuple(view.get_cursor_ordering())
+        return super().get_ordering(request, queryset, view)
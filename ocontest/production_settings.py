@@ -34,6 +34,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+# Set to 'x-accel-redirect' once nginx has the internal location from ocontest/media.py
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'django')
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',')
@@ -87,13 +89,30 @@ LOGGING = {
 }
 
 # Cache settings
+# Hot response and fragment keys are also kept in each worker for a few
+# seconds (see ocontest/two_tier_cache.py); the rest always goes to Redis
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'ocontest.two_tier_cache.TwoTierCache',
         'LOCATION': 'redis://127.0.0.1:6379/1',
+        'OPTIONS': {
+            'REMOTE_BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCAL_KEY_PREFIXES': ['response-cache:', 'fragment:'],
+            'LOCAL_MAX_ENTRIES': 2000,
+            'LOCAL_TIMEOUT': 5,
+        },
     }
 }
 
+# Share buffered counters between workers so flush_counters can drain them
+COUNTER_BUFFER_BACKEND = 'cache'
+
+# Hold SMS_RATE_LIMIT across all workers, not per process
+SMS_RATE_LIMITER = 'cache'
+
+# Relay notification stream events between ASGI workers
+NOTIFICATION_STREAM_REDIS_URL = 'redis://127.0.0.1:6379/2'
+
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -0,0 +1,158 @@
+"""
+Cached GET responses for public list endpoints.
+
+``CachedResponseMixin`` stores a view's response data in the default cache
+(Redis in production) under a key built from the host, path, query string,
+the kind of user asking (``user_class``) and the current version of each of
+the view's ``cache_tags``. ``invalidate_on_change`` bumps the tag versions
+when rows of a model are saved or deleted. Every key built on an old version
+then misses, so nothing has to be deleted or enumerated.
+
+Hits and misses are counted per view in this process (``stats()``) and sent
+back in an ``X-Cache`` header. ``ETag``/``Last-Modified`` set by the view
+(``ocontest.conditional``) are cached along with the data, so a conditional
+request that hits the cache is answered without touching the database.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+TAG_PREFIX = 'response-cache:tag:'
+KEY_PREFIX = 'response-cache:'
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def user_class(request):
+    """Users who are shown the same body share cache entries."""
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    return 'staff' if user.is_staff else 'user'
+
+
+def tag_versions(tags):
+    keys = [f'{TAG_PREFIX}{tag}' for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so an evicted tag never brings old entries back
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*tags):
+    """Make every cached response tagged with any of ``tags`` stale."""
+    for tag in tags:
+        key = f'{TAG_PREFIX}{tag}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def invalidate_on_change(model, *tags, fields=None):
+    """
+    Invalidate ``tags`` whenever a ``model`` row is saved or deleted.
+
+    With ``fields``, saves limited by ``update_fields`` to other fields (a
+    login stamping ``last_login``) are ignored. ``QuerySet.update()`` sends
+    no signals; code using it calls ``invalidate``.
+    """
+
+    def changed(sender, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        if fields and update_fields is not None and not set(update_fields) & set(fields):
+            return
+        invalidate(*tags)
+        # Again once committed, in case a request cached the old rows in between
+        transaction.on_commit(lambda: invalidate(*tags))
+
+    uid = f'response-cache-{model._meta.label_lower}-{"-".join(tags)}'
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+
+
+def response_key(request, tags):
+    parts = [
+        request.get_host(), request.path, sorted(request.query_params.lists()), user_class(request),
+        tag_versions(tags),
+    ]
+    return KEY_PREFIX + hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def record(view_name, outcome):
+    with _stats_lock:
+        _stats[(view_name, outcome)] += 1
+
+
+def stats():
+    """``{view: {'hits', 'misses', 'hit_ratio'}}`` for this process."""
+    with _stats_lock:
+        counts = dict(_stats)
+    views = {}
+    for (view_name, outcome), count in counts.items():
+        views.setdefault(view_name, {'hits': 0, 'misses': 0})[outcome] = count
+    for entry in views.values():
+        total = entry['hits'] + entry['misses']
+        entry['hit_ratio'] = round(entry['hits'] / total, 3) if total else None
+    return views
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests from the response cache.
+
+    Set ``cache_tags`` to what the response depends on and optionally
+    ``cache_timeout`` (default ``RESPONSE_CACHE_TIMEOUT``). Views whose
+    handler has side effects repeat them for cached data in ``cache_hit``.
+    """
+    cache_tags = ()
+    cache_timeout = None
+
+    def cache_hit(self, data):
+        pass
+
+    def get(self, request, *args, **kwargs):
+        view_name = type(self).__name__
+        key = response_key(request, self.cache_tags)
+        cached = cache.get(key)
+        if cached is not None:
+            record(view_name, 'hits')
+            data, headers = cached
+            self.cache_hit(data)
+            response = get_conditional_response(
+                request, etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified') or ''),
+            ) or Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record(view_name, 'misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            cache.set(key, (response.data, headers), timeout)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -372,8 +372,116 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    # Page-number pagination by default; feeds opt into cursor pagination
+    'DEFAULT_PAGINATION_CLASS': 'ocontest.pagination.StandardPagination',
+    'PAGE_SIZE': 20,
 }
 
+# Hard ceiling for ?page_size= and per-view page sizes
+API_MAX_PAGE_SIZE = 100
+
+# Buffered view/like counters (see ocontest/counters.py)
+COUNTER_BUFFER_BACKEND = 'memory'
+COUNTER_FLUSH_INTERVAL = 10  # seconds; 0 disables the background flusher
+
+# In-process background pools (see ocontest/background.py)
+BACKGROUND_WORKERS = {'default': 4, 'fanout': 2, 'sms': 8, 'media': 2, 'transcode': 1}
+BACKGROUND_TASKS_EAGER = False  # run tasks inline (tests)
+
+# Notifications written per transaction by a broadcast fan-out
+NOTIFICATION_FANOUT_CHUNK_SIZE = 1000
+# Seconds a running fan-out stays claimed by its worker without finishing a chunk
+NOTIFICATION_FANOUT_LEASE = 300
+# Rows per INSERT in notifications.services.create_notifications_bulk
+NOTIFICATION_BULK_BATCH_SIZE = 1000
+# Lifetime of the cached per-user unread count; bounds drift from untracked writes
+NOTIFICATION_UNREAD_COUNT_TTL = 3600
+
+# Server-Sent Events notification stream (see notifications/streaming.py)
+NOTIFICATION_STREAM_REDIS_URL = os.getenv('NOTIFICATION_STREAM_REDIS_URL', '')  # set when running several workers
+NOTIFICATION_STREAM_KEEPALIVE = 15  # seconds between keepalive comments
+NOTIFICATION_STREAM_QUEUE_SIZE = 100  # pending events per connection before dropping
+NOTIFICATION_STREAM_RETRY_MS = 3000
+
+# SMS delivery (see notifications/sms_service.py)
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'notifications.sms_service.BrevoSMSBackend')
+SMS_RATE_LIMIT = 10  # messages per second allowed by the provider; 0 disables
+SMS_RATE_LIMITER = 'memory'  # 'memory' (per process) or 'cache' (shared by all workers)
+SMS_RATE_BURST = 10  # 'memory' only
+SMS_MAX_RETRIES = 3
+SMS_RETRY_BACKOFF = 1.0  # seconds, doubled on every retry
+SMS_RESEND_AFTER = 900  # seconds a message stays queued before resend_queued_sms sends it
+
+# Largest video accepted by any upload path (see videos/sniffing.py)
+VIDEO_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+
+# Uploads are hashed as they stream in so duplicate videos are stored once (see videos/blobs.py)
+FILE_UPLOAD_HANDLERS = [
+    'videos.blobs.HashingMemoryFileUploadHandler',
+    'videos.blobs.HashingTemporaryFileUploadHandler',
+]
+
+# Resumable chunked uploads (see videos/uploads.py)
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'upload_sessions'  # outside MEDIA_ROOT so partial files are never served
+CHUNKED_UPLOAD_MAX_SIZE = VIDEO_UPLOAD_MAX_SIZE
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # largest body accepted per PUT
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60  # seconds an unfinished upload is kept
+
+# Media serving (see ocontest/media.py)
+MEDIA_SERVE_MODE = 'django'  # 'django', 'x-accel-redirect' (nginx) or 'x-sendfile'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # nginx internal location aliasing MEDIA_ROOT
+MEDIA_CACHE_MAX_AGE = 24 * 60 * 60  # seconds, for public files
+
+# Video thumbnails (see videos/thumbnails.py)
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', '')  # defaults to ffmpeg on PATH
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', '')  # defaults to ffprobe on PATH
+THUMBNAIL_SIZES = {'small': 320, 'medium': 640, 'large': 1280}  # name: max width in px
+THUMBNAIL_POSTER_SIZE = 'medium'  # stored in Video.thumbnail
+THUMBNAIL_POSTER_OFFSET = 1.0  # seconds into the video
+THUMBNAIL_QUALITY = 82
+THUMBNAIL_FFMPEG_TIMEOUT = 60  # seconds
+THUMBNAIL_MAX_ATTEMPTS = 3
+THUMBNAIL_RETRY_BACKOFF = 5.0  # seconds, doubled on every retry
+
+# Cached responses of public list endpoints (see ocontest/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = 60  # seconds; saves and deletes invalidate sooner
+
+# Sections of the landing page endpoint (see ocontest/homepage.py)
+HOMEPAGE_SECTION_TTLS = {  # seconds; saves invalidate sooner
+    'featured_contests': 60,
+    'active_contests': 60,
+    'featured_videos': 120,
+    'stats': 300,
+}
+
+# Cached serializer output per row (see ocontest/fragments.py)
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60  # seconds; a save changes the key instead
+
+# Trending ranking of videos and contests (see ocontest/trending.py)
+TRENDING_HALF_LIFE = 24 * 60 * 60  # seconds for an event to lose half its weight
+TRENDING_WEIGHTS = {'created': 10.0, 'view': 1.0, 'like': 5.0, 'submission': 20.0}
+
+# Resized copies of uploaded images (see ocontest/images.py)
+IMAGE_PRESETS = {
+    'card': {'width': 640, 'height': 360, 'crop': True},
+    'avatar': {'width': 256, 'height': 256, 'crop': True},
+    'banner': {'width': 1500, 'height': 500, 'crop': True},
+    'full': {'width': 1920, 'height': 1920, 'crop': False},  # fits inside, keeps the aspect ratio
+}
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# HLS renditions of approved videos (see videos/transcoding.py); rungs taller than the source are skipped
+HLS_LADDER = [
+    {'name': '360p', 'height': 360, 'video_bitrate': 800_000, 'audio_bitrate': 96_000},
+    {'name': '720p', 'height': 720, 'video_bitrate': 2_800_000, 'audio_bitrate': 128_000},
+    {'name': '1080p', 'height': 1080, 'video_bitrate': 5_000_000, 'audio_bitrate': 160_000},
+]
+HLS_SEGMENT_DURATION = 6  # seconds
+HLS_FFMPEG_TIMEOUT = 60 * 60  # seconds per rendition
+HLS_MAX_ATTEMPTS = 2
+HLS_RETRY_BACKOFF = 30.0  # seconds, doubled on every retry
+
 # Social Auth settings
 AUTHENTICATION_BACKENDS = (
     'social_core.backends.google.GoogleOAuth2',
@@ -0,0 +1,45 @@
+"""
+Factories for the rows most tests start from.
+
+Each test case creates what it needs in ``setUp``; these keep the defaults
+in one place so a test only spells out what matters to it::
+
+    brand = create_brand()
+    contest = create_contest(brand, 'Launch', is_featured=True)
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.models import User
+from contests.models import Contest
+
+PASSWORD = 'testpass123'
+
+
+def create_user(role, email=None, **extra):
+    """An active user with ``role``, by default ``<role>@example.com``."""
+    return User.objects.create_user(
+        email=email or f'{role}@example.com', password=PASSWORD, role=role, is_active=True, **extra
+    )
+
+
+def create_brand(email=None, **extra):
+    return create_user('brand', email, **extra)
+
+
+def create_creator(email=None, **extra):
+    return create_user('creator', email, **extra)
+
+
+def create_contest(brand, title='Contest', **extra):
+    """A live contest of ``brand`` with a deadline a week away."""
+    fields = {
+        'description': 'Description',
+        'brief': 'Brief',
+        'prize': 100,
+        'deadline': timezone.now() + timedelta(days=7),
+        'status': Contest.Status.LIVE,
+        **extra,
+    }
+    return Contest.objects.create(title=title, brand=brand, **fields)
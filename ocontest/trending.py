@@ -0,0 +1,79 @@
+"""
+Time-decayed "trending" ranking for videos and contests.
+
+Each event (creation, a view, a like, a submission) is worth its
+``TRENDING_WEIGHTS`` entry times ``2 ** (t / TRENDING_HALF_LIFE)``, with
+``t`` measured from a fixed epoch, and ``trending_score`` stores log2 of the
+sum. Weighting new events up instead of decaying old ones down ranks rows
+exactly as activity decayed to "now" would, yet a score only changes when
+something happens to its row. ``ORDER BY trending_score DESC`` then reads one
+page from an index instead of scoring the whole table.
+
+``track_trending`` adds the deltas of buffered counters (``ocontest.counters``)
+when they are flushed; ``record`` adds any other event.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .counters import counters_flushed
+from .pagination import FeedCursorPagination
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+TRENDING_ORDERING = ('-trending_score', '-id')
+
+
+def event_score(weight, when=None):
+    """Score of a single event of ``weight`` happening at ``when`` (default now)."""
+    when = when or timezone.now()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 24 * 60 * 60)
+    return math.log2(weight) + (when - EPOCH).total_seconds() / half_life
+
+
+def combine(score, other):
+    """log2(2 ** score + 2 ** other) without overflowing."""
+    high, low = max(score, other), min(score, other)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def initial_score():
+    """Score of a row that was just created; the default of every ``trending_score`` column."""
+    return event_score(settings.TRENDING_WEIGHTS['created'])
+
+
+def record(model, weights, when=None):
+    """Add events worth ``{pk: weight}`` to those rows' ``trending_score``."""
+    weights = {pk: weight for pk, weight in weights.items() if weight > 0}
+    if not weights:
+        return
+    with transaction.atomic():
+        rows = list(
+            model._default_manager.select_for_update().filter(pk__in=weights).only('pk', 'trending_score')
+        )
+        for row in rows:
+            row.trending_score = combine(row.trending_score, event_score(weights[row.pk], when))
+        model._default_manager.bulk_update(rows, ['trending_score'], batch_size=500)
+
+
+def track_trending(model, events):
+    """Count flushes of ``model``'s buffered counters as events: ``{counter field: event name}``."""
+
+    def add_flushed(sender, field, deltas, **kwargs):
+        weight = settings.TRENDING_WEIGHTS.get(events.get(field))
+        if weight:
+            record(model, {pk: weight * delta for pk, delta in deltas.items()})
+
+    counters_flushed.connect(
+        add_flushed, sender=model, weak=False, dispatch_uid=f'trending-{model._meta.label_lower}'
+    )
+
+
+class TrendingSortMixin:
+    """Feed views: ``?sort=trending`` pages through the trending index instead of by date."""
+
+    def get_cursor_ordering(self):
+        if self.request.query_params.get('sort') == 'trending':
+            return TRENDING_ORDERING
+        return FeedCursorPagination.ordering
@@ -0,0 +1,350 @@
+"""
+A cache backend that keeps hot keys in process memory in front of Redis.
+
+``TwoTierCache`` answers reads from a bounded, per-process LRU first and only
+goes to the shared ("remote") backend on a local miss, remembering what it
+read for at most ``LOCAL_TIMEOUT`` seconds. Writes go to the remote backend,
+drop the key locally and are announced on an invalidation channel so every
+other worker process drops its copy too. A lost announcement is bounded by
+``LOCAL_TIMEOUT``.
+
+Only keys starting with one of ``LOCAL_KEY_PREFIXES`` are held locally (all
+keys when it is ``None``). Keys used to coordinate workers, such as the
+counter buffer's (``ocontest.counters``), must not be, because a worker must
+always see the others' latest writes to them::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'ocontest.two_tier_cache.TwoTierCache',
+            'LOCATION': 'redis://127.0.0.1:6379/1',
+            'OPTIONS': {
+                'REMOTE_BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCAL_KEY_PREFIXES': ['response-cache:', 'fragment:'],
+                'LOCAL_MAX_ENTRIES': 2000,
+                'LOCAL_TIMEOUT': 5,
+            },
+        },
+    }
+
+Invalidations travel over Redis pub/sub when the remote backend is
+``RedisCache`` (or ``INVALIDATION_URL`` is set), and between the instances of
+this process otherwise. Hits are counted per tier (``tier_stats()``).
+"""
+import json
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+REMOTE_OPTIONS = (
+    'REMOTE_BACKEND', 'LOCAL_KEY_PREFIXES', 'LOCAL_MAX_ENTRIES', 'LOCAL_TIMEOUT',
+    'INVALIDATION_URL', 'INVALIDATION_CHANNEL',
+)
+REDIS_BACKEND = 'django.core.cache.backends.redis.RedisCache'
+
+
+class LocalBus:
+    """Invalidation channel between the caches of this process."""
+    _subscribers = defaultdict(list)
+    _lock = threading.Lock()
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers[self.channel].append(callback)
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers[self.channel])
+        for callback in subscribers:
+            callback(message)
+
+
+class RedisBus:
+    """Invalidation channel between worker processes over Redis pub/sub."""
+
+    def __init__(self, channel, url):
+        import redis
+        self.channel = channel
+        self.redis = redis.Redis.from_url(url)
+
+    def subscribe(self, callback):
+        listener = threading.Thread(
+            target=self._listen, args=(callback,), name='two-tier-cache-listener', daemon=True
+        )
+        listener.start()
+
+    def publish(self, message):
+        self.redis.publish(self.channel, json.dumps(message))
+
+    def _listen(self, callback):
+        delay = 1
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything published while we were away is lost; start clean
+                callback({'origin': None, 'clear': True})
+                delay = 1
+                for message in pubsub.listen():
+                    callback(json.loads(message['data']))
+            except Exception:
+                logger.exception('Cache invalidation listener lost its connection')
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+class LocalTier:
+    """
+    The in-process LRU of one configured cache, shared by the backend
+    instances Django creates per thread.
+    """
+
+    def __init__(self, max_entries, timeout, bus):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so a read racing one does not store old data
+        self.generation = 0
+        self._stats = Counter()
+        self._origin = uuid.uuid4().hex
+        self.bus = bus
+        bus.subscribe(self._receive)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Stored pickled so callers cannot change the cached value in place
+        return pickle.loads(value)
+
+    def set(self, key, value, generation, timeout=None):
+        ttl = self.timeout if timeout is None else min(self.timeout, timeout)
+        if ttl <= 0:
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, pickled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def drop(self, keys=None):
+        with self._lock:
+            self.generation += 1
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+    def invalidate(self, keys=None):
+        """Drop ``keys`` (all when ``None``) here and in every other process."""
+        self.drop(keys)
+        message = {'origin': self._origin, 'clear': True} if keys is None else {'origin': self._origin, 'keys': keys}
+        try:
+            self.bus.publish(message)
+        except Exception:
+            logger.exception('Could not publish a cache invalidation; other workers expire it on their own')
+
+    def _receive(self, message):
+        if message.get('origin') != self._origin:
+            self.drop(None if message.get('clear') else message.get('keys', []))
+
+    def record(self, outcome, count=1):
+        if count:
+            with self._lock:
+                self._stats[outcome] += count
+
+    def stats(self):
+        """Reads answered by each tier."""
+        with self._lock:
+            counts = dict(self._stats)
+            entries = len(self._entries)
+        local, remote, misses = (counts.get(name, 0) for name in ('local_hits', 'remote_hits', 'misses'))
+        total = local + remote + misses
+        return {
+            'local_hits': local,
+            'remote_hits': remote,
+            'misses': misses,
+            'local_hit_ratio': round(local / total, 3) if total else None,
+            'remote_hit_ratio': round(remote / (remote + misses), 3) if remote + misses else None,
+            'local_entries': entries,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """``LocalTier`` in front of the ``REMOTE_BACKEND`` built from the same ``LOCATION`` and parameters."""
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = dict(params.get('OPTIONS', {}))
+        remote_params = dict(params, OPTIONS={k: v for k, v in options.items() if k not in REMOTE_OPTIONS})
+        remote_backend = options.get('REMOTE_BACKEND', REDIS_BACKEND)
+        self.remote = import_string(remote_backend)(server, remote_params)
+
+        prefixes = options.get('LOCAL_KEY_PREFIXES')
+        self.local_prefixes = tuple(self.make_key(prefix) for prefix in prefixes) if prefixes is not None else None
+        channel = options.get('INVALIDATION_CHANNEL', 'cache:invalidate')
+        url = options.get('INVALIDATION_URL')
+        if url is None and remote_backend == REDIS_BACKEND:
+            url = server.split(',')[0] if isinstance(server, str) else server[0]
+        with _tiers_lock:
+            tier_key = (str(server), channel, self.key_prefix, self.version)
+            if tier_key not in _tiers:
+                _tiers[tier_key] = LocalTier(
+                    options.get('LOCAL_MAX_ENTRIES', 1000), options.get('LOCAL_TIMEOUT', 5),
+                    RedisBus(channel, url) if url else LocalBus(channel),
+                )
+            self.tier = _tiers[tier_key]
+
+    def _is_local(self, key):
+        return self.local_prefixes is None or key.startswith(self.local_prefixes)
+
+    def _invalidate(self, keys=None):
+        if keys is not None:
+            keys = [key for key in keys if self._is_local(key)]
+            if not keys:
+                return
+        self.tier.invalidate(keys)
+
+    def _local_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def tier_stats(self):
+        return self.tier.stats()
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self._is_local(local_key):
+            value = self.tier.get(local_key)
+            if value is not None:
+                self.tier.record('local_hits')
+                return value
+        generation = self.tier.generation
+        value = self.remote.get(key, version=version)
+        if value is None:
+            self.tier.record('misses')
+            return default
+        self.tier.record('remote_hits')
+        if self._is_local(local_key):
+            self.tier.set(local_key, value, generation)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            local_key = self.make_and_validate_key(key, version=version)
+            value = self.tier.get(local_key) if self._is_local(local_key) else None
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.tier.record('local_hits', len(found))
+        if missing:
+            generation = self.tier.generation
+            fetched = self.remote.get_many(missing, version=version)
+            self.tier.record('remote_hits', len(fetched))
+            self.tier.record('misses', len(missing) - len(fetched))
+            for key, value in fetched.items():
+                local_key = self.make_key(key, version=version)
+                if self._is_local(local_key):
+                    self.tier.set(local_key, value, generation)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self._is_local(local_key) and self.tier.get(local_key) is not None:
+            return True
+        return self.remote.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.remote.set(key, value, timeout=timeout, version=version)
+        local_key = self.make_and_validate_key(key, version=version)
+        self._invalidate([local_key])
+        if self._is_local(local_key):
+            self.tier.set(local_key, value, self.tier.generation, self._local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.remote.add(key, value, timeout=timeout, version=version)
+        if added:
+            self._invalidate([self.make_and_validate_key(key, version=version)])
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.remote.set_many(data, timeout=timeout, version=version)
+        self._invalidate([self.make_and_validate_key(key, version=version) for key in data])
+        generation = self.tier.generation
+        for key, value in data.items():
+            local_key = self.make_key(key, version=version)
+            if key not in failed and self._is_local(local_key):
+                self.tier.set(local_key, value, generation, self._local_timeout(timeout))
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.remote.delete(key, version=version)
+        self._invalidate([self.make_and_validate_key(key, version=version)])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.remote.delete_many(keys, version=version)
+        self._invalidate([self.make_and_validate_key(key, version=version) for key in keys])
+
+    def incr(self, key, delta=1, version=None):
+        value = self.remote.incr(key, delta, version=version)
+        self._invalidate([self.make_and_validate_key(key, version=version)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.remote.clear()
+        self._invalidate()
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
+
+
+def tier_stats():
+    """``{alias: per-tier stats}`` for every configured ``TwoTierCache``."""
+    return {
+        alias: caches[alias].tier_stats()
+        for alias in caches.settings
+        if isinstance(caches[alias], TwoTierCache)
+    }
@@ -14,16 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 import django
 from django.contrib import admin
-from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.admin.views.decorators import staff_member_required
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
+from .media import serve_media
 from .stats import StatsView
 
 # Development URLs
@@ -37,6 +37,8 @@ urlpatterns += [
     path('', views.api_root, name='api-root'),
     path('admin/statistics/', staff_member_required(StatsView.as_view()), name='admin_stats'),
     path('admin/', admin.site.urls),
+    path('api/cache/stats/', views.cache_stats, name='cache-stats'),
+    path('api/home/', views.home, name='homepage'),
     # Authentication URLs
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -50,7 +52,7 @@ urlpatterns += [
     path('api/', include('contact.urls')),
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    from django.conf.urls.static import static
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploaded media, in production too: access checks, Range requests, X-Accel-Redirect (see ocontest/media.py)
+urlpatterns += [
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', serve_media, name='media'),
+]
@@ -1,7 +1,9 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from . import fragments, homepage, response_cache, two_tier_cache
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -10,6 +12,7 @@ def api_root(request, format=None):
     API root view that provides links to the main API endpoints.
     """
     return Response({
+        'home': reverse('homepage', request=request, format=format),
         'auth': {
             'register': reverse('accounts:register', request=request, format=format),
             'login': reverse('accounts:login', request=request, format=format),
@@ -30,3 +33,32 @@ def api_root(request, format=None):
             'search': reverse('contests:contest-search', request=request, format=format),
         }
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Cache hits and misses per view, serializer and cache tier, as seen by this worker process."""
+    return Response({
+        'response_cache': response_cache.stats(),
+        'fragment_cache': fragments.stats(),
+        'cache_tiers': two_tier_cache.tier_stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def home(request):
+    """
+    Featured and active contests, featured videos and platform stats in one
+    response. ``?sections=stats,featured_videos`` returns only those.
+    """
+    requested = request.query_params.get('sections')
+    if requested:
+        sections = list(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+    else:
+        sections = list(homepage.SECTIONS)
+    unknown = [name for name in sections if name not in homepage.SECTIONS]
+    if unknown or not sections:
+        raise ValidationError({'sections': [f'Choose from: {", ".join(homepage.SECTIONS)}']})
+    return Response(homepage.build(sections))
@@ -0,0 +1,53 @@
+"""
+Who may download which video file.
+
+Approved videos are public. Until then a video's upload, its HLS renditions
+and its submission file are only served to its creator, the brand running
+its contest and staff. Other media (thumbnails, avatars, contest images) is
+always public.
+"""
+from contests.models import Submission
+from .models import Video
+
+PROTECTED_PREFIXES = ('videos/', 'contest_videos/', 'video_streams/')
+MAX_OWNERS = 50
+
+
+def _is_participant(user, owners):
+    """Whether ``user`` is staff or one of the ``(creator_id, brand_id)`` pairs."""
+    return user is not None and user.is_authenticated and (
+        user.is_staff or any(user.pk in pair for pair in owners)
+    )
+
+
+def check_media_access(user, name):
+    """
+    ``(allowed, public)`` for the media file ``name`` requested by ``user``.
+
+    ``public`` tells whether shared caches may keep the response.
+    """
+    if not name.startswith(PROTECTED_PREFIXES):
+        return True, True
+
+    videos = Video.objects.all()
+    if name.startswith('video_streams/'):
+        video_id = name.split('/')[1]
+        videos = videos.filter(pk=int(video_id)) if video_id.isdigit() else videos.none()
+    else:
+        videos = videos.filter(url=name)
+    # Identical uploads share one file (videos/blobs.py), so several rows may point at it
+    videos = list(videos.values(
+        'approval_status', 'creator_id', 'contest__brand_id', 'submission__contest__brand_id'
+    )[:MAX_OWNERS])
+    if any(video['approval_status'] == Video.ApprovalStatus.APPROVED for video in videos):
+        return True, True
+    owners = [
+        (video['creator_id'], video['contest__brand_id'] or video['submission__contest__brand_id'])
+        for video in videos
+    ]
+    if not owners:
+        owners = list(Submission.objects.filter(video_file=name).values_list(
+            'creator_id', 'contest__brand_id'
+        )[:MAX_OWNERS])
+    # With no owners left only staff can see the file
+    return _is_participant(user, owners or [(None, None)]), False
@@ -1,13 +1,14 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Video
+from .models import MediaBlob, Video
+from .transcoding import queue_transcodes
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
     list_display = ['title', 'creator', 'category', 'approval_status', 'created_at']
     list_filter = ['approval_status', 'category', 'created_at']
     search_fields = ['title', 'description', 'creator__username']
-    readonly_fields = ['created_at', 'updated_at', 'views', 'likes']
+    readonly_fields = ['created_at', 'updated_at', 'views', 'likes', 'thumbnail_status', 'thumbnail_attempts', 'hls_status', 'hls_manifest', 'width', 'height', 'video_codec', 'bitrate']
     actions = ['approve_videos', 'reject_videos']
 
     fieldsets = [
@@ -15,7 +16,7 @@ class VideoAdmin(admin.ModelAdmin):
             'fields': ['title', 'description', 'creator', 'category']
         }),
         ('Media', {
-            'fields': ['url', 'thumbnail', 'duration']
+            'fields': ['url', 'thumbnail', 'thumbnail_status', 'thumbnail_attempts', 'hls_status', 'hls_manifest', 'duration', 'width', 'height', 'video_codec', 'bitrate']
         }),
         ('Approval', {
             'fields': ['approval_status', 'approval_date', 'approval_notes']
@@ -33,18 +34,30 @@ class VideoAdmin(admin.ModelAdmin):
     ]
 
     def approve_videos(self, request, queryset):
+        video_ids = list(queryset.values_list('pk', flat=True))
         queryset.update(
             approval_status=Video.ApprovalStatus.APPROVED,
             approval_date=timezone.now(),
-            # Video is approved
+            updated_at=timezone.now(),
         )
+        # update() sends no signals, so queue the HLS renditions here
+        queue_transcodes(video_ids)
     approve_videos.short_description = 'Approve selected videos'
 
     def reject_videos(self, request, queryset):
         queryset.update(
             approval_status=Video.ApprovalStatus.REJECTED,
-            approval_date=timezone.now()
+            approval_date=timezone.now(),
+            updated_at=timezone.now(),
         )
     reject_videos.short_description = 'Reject selected videos'
 
 
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'created_at']
+    search_fields = ['name', 'sha256']
+    readonly_fields = [field.name for field in MediaBlob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class VideosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'videos'
+
+    def ready(self):
+        import videos.signals  # noqa
+        from accounts.models import CreatorProfile, User
+        from contests.models import Contest, Submission
+        from ocontest.response_cache import invalidate_on_change
+        from ocontest.trending import track_trending
+        from .blobs import track_blob_references
+        from .models import Video
+
+        track_blob_references(Video, 'url')
+        track_blob_references(Submission, 'video_file')
+        track_trending(Video, {'views': 'view', 'likes': 'like'})
+        invalidate_on_change(Video, 'videos')
+        # Video cards show the contest, the submission status and the creator's name and avatar
+        invalidate_on_change(Contest, 'videos')
+        invalidate_on_change(Submission, 'videos')
+        invalidate_on_change(CreatorProfile, 'videos')
+        invalidate_on_change(User, 'videos', fields=('first_name', 'last_name'))
@@ -0,0 +1,182 @@
+"""
+Content-addressed storage for uploaded video files.
+
+``Video.url`` and ``Submission.video_file`` use ``blob_storage``. Every file
+it stores is recorded as a ``MediaBlob`` keyed by its SHA-256; storing
+content that already exists returns the existing file's name instead of
+writing a copy. Uploads are hashed as they stream in by the upload handlers
+below (``FILE_UPLOAD_HANDLERS``), so the check costs no extra read; content
+without a digest is hashed when it is saved.
+
+``MediaBlob.ref_count`` is the number of model fields pointing at the file.
+Storing a file takes its first reference under a row lock on the blob, so a
+concurrent ``release()`` cannot delete a file that was just handed out;
+``track_blob_references`` keeps the count current from model signals for
+everything else, and the file is deleted once the last reference is gone.
+A model save that fails after its file was stored leaves a reference nobody
+holds; ``manage.py dedupe_media`` recounts the references, deletes the blobs
+nothing refers to and merges the duplicates already on disk.
+"""
+import hashlib
+import logging
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(content):
+    """SHA-256 hex digest of a Django ``File``, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashingUploadHandlerMixin:
+    """Hashes the chunks this handler keeps and sets ``sha256`` on the uploaded file."""
+
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed_on = super().receive_data_chunk(raw_data, start)
+        if passed_on is None:
+            self.sha256.update(raw_data)
+        return passed_on
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    pass
+
+
+class DeduplicatingStorage(FileSystemStorage):
+    """``FileSystemStorage`` that stores each distinct content once."""
+
+    def _save(self, name, content):
+        """Store ``content`` once and take a reference to it for the field being saved."""
+        from .models import MediaBlob
+
+        digest = getattr(content, 'sha256', None) or file_digest(content)
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is not None and self.exists(blob.name):
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                return blob.name
+        name = super()._save(name, content)
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.update_or_create(
+                    sha256=digest, defaults={'name': name, 'size': content.size, 'ref_count': 1}
+                )
+        except IntegrityError:
+            # The same content was stored concurrently; keep that copy
+            super().delete(name)
+            with transaction.atomic():
+                blob = MediaBlob.objects.select_for_update().get(sha256=digest)
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            return blob.name
+        return name
+
+
+_storage = None
+
+
+def blob_storage():
+    global _storage
+    if _storage is None:
+        _storage = DeduplicatingStorage()
+    return _storage
+
+
+def retain(name):
+    from .models import MediaBlob
+
+    if name and not MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        logger.warning(f'No media blob for {name}; run dedupe_media to backfill it')
+
+
+def release(name):
+    """Drop a reference to ``name``; the file is deleted after commit when none are left."""
+    from .models import MediaBlob
+
+    if not name:
+        return
+    with transaction.atomic():
+        # Serializes with DeduplicatingStorage._save handing out the same blob
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+
+    def delete_file():
+        # The same content may have been stored again under this name since
+        if MediaBlob.objects.filter(name=name).exists():
+            return
+        logger.info(f'Deleting unreferenced media blob {name}')
+        blob_storage().delete(name)
+
+    transaction.on_commit(delete_file)
+
+
+def track_blob_references(model, field_name):
+    """Keep ``MediaBlob.ref_count`` in step with ``model.<field_name>``."""
+    uid = f'blob-references-{model._meta.label_lower}-{field_name}'
+
+    def remember_name(sender, instance, raw=False, update_fields=None, **kwargs):
+        instance._blob_name_before = None
+        instance._blob_counted = False
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        # A file not stored yet is stored by this save, which takes its reference
+        field_file = getattr(instance, field_name)
+        instance._blob_counted = bool(field_file) and not field_file._committed
+        if instance.pk:
+            instance._blob_name_before = model.objects.filter(pk=instance.pk).values_list(
+                field_name, flat=True
+            ).first()
+
+    def update_references(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        name = getattr(instance, field_name).name
+        before = getattr(instance, '_blob_name_before', None)
+        counted = getattr(instance, '_blob_counted', False)
+        if created:
+            if not counted:
+                retain(name)
+        elif before is not None and before != name:
+            if not counted:
+                retain(name)
+            release(before)
+        elif counted:
+            # The row already held this file; drop the reference storing it again took
+            release(name)
+
+    def drop_reference(sender, instance, **kwargs):
+        release(getattr(instance, field_name).name)
+
+    pre_save.connect(remember_name, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(drop_reference, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,75 @@
+"""
+Helpers for running the local ``ffmpeg``/``ffprobe`` binaries.
+
+Both are optional: ``FFMPEG_BINARY``/``FFPROBE_BINARY`` or the first match on
+``PATH`` is used, and callers get ``FFmpegUnavailable`` when there is none.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class FFmpegError(Exception):
+    """ffmpeg failed on the given input."""
+
+
+class FFmpegUnavailable(FFmpegError):
+    """No ffmpeg binary on this machine; retrying will not help."""
+
+
+def ffmpeg_binary():
+    return getattr(settings, 'FFMPEG_BINARY', '') or shutil.which('ffmpeg')
+
+
+def ffprobe_binary():
+    return getattr(settings, 'FFPROBE_BINARY', '') or shutil.which('ffprobe')
+
+
+def run(command, timeout):
+    """Run ``command`` and return its stdout as bytes, raising ``FFmpegError`` on failure."""
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        raise FFmpegError(f'{os.path.basename(command[0])} timed out after {timeout}s') from e
+    if result.returncode != 0:
+        raise FFmpegError(result.stderr.decode(errors='replace').strip() or f'{command[0]} failed')
+    return result.stdout
+
+
+def probe_dimensions(path):
+    """``(width, height)`` of the first video stream, or ``None`` when ffprobe is missing or fails."""
+    binary = ffprobe_binary()
+    if not binary:
+        return None
+    command = [
+        binary, '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height', '-of', 'json', path,
+    ]
+    try:
+        streams = json.loads(run(command, timeout=30))['streams']
+        return streams[0]['width'], streams[0]['height']
+    except (FFmpegError, ValueError, KeyError, IndexError):
+        return None
+
+
+@contextmanager
+def local_path(field_file):
+    """A filesystem path for ``field_file``, copying it locally for remote storages."""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+    suffix = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as local, field_file.open('rb') as remote:
+        for chunk in remote.chunks():
+            local.write(chunk)
+        local.flush()
+        yield local.name
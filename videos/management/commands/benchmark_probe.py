@@ -0,0 +1,114 @@
+import os
+import struct
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from videos import probe
+
+
+def _box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def _trak(handler, codec, duration, width, height):
+    tkhd = _box(b'tkhd', bytes(4) + struct.pack('>5I', 0, 0, 1, 0, duration) + bytes(52)
+                + struct.pack('>II', width << 16, height << 16))
+    hdlr = _box(b'hdlr', bytes(8) + handler + bytes(13))
+    entry = struct.pack('>I4s', 86, codec) + bytes(6) + struct.pack('>H', 1) + bytes(16) \
+        + struct.pack('>HH', width, height) + bytes(50)
+    stbl = _box(b'stbl', _box(b'stsd', bytes(4) + struct.pack('>I', 1) + entry))
+    return _box(b'trak', tkhd + _box(b'mdia', _box(b'mdhd', bytes(24)) + hdlr + _box(b'minf', stbl)))
+
+
+def write_mp4(file, size, seconds=90.5, width=1920, height=1080, moov_at_end=True):
+    """A sparse MP4 of ``size`` bytes with a video and an audio track; the media data is zeros."""
+    timescale = 1000
+    duration = int(seconds * timescale)
+    ftyp = _box(b'ftyp', b'isom' + struct.pack('>I', 512) + b'isomiso2avc1mp41')
+    moov = _box(b'moov', _box(b'mvhd', bytes(4) + struct.pack('>4I', 0, 0, timescale, duration) + bytes(80))
+                + _trak(b'soun', b'mp4a', duration, 0, 0)
+                + _trak(b'vide', b'avc1', duration, width, height))
+    mdat_size = size - len(ftyp) - len(moov)
+    file.write(ftyp)
+    if not moov_at_end:
+        file.write(moov)
+    file.write(struct.pack('>I4sQ', 1, b'mdat', mdat_size))
+    file.seek(mdat_size - 16, os.SEEK_CUR)
+    if moov_at_end:
+        file.write(moov)
+    file.truncate(size)
+
+
+def _element(element_id, payload):
+    size = (1 << 56) | len(payload)  # 8-byte size vint
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + size.to_bytes(8, 'big') + payload
+
+
+def write_webm(file, size, seconds=90.5, width=1280, height=720, duration=None):
+    """A sparse WebM of ``size`` bytes: headers, then one cluster of zeros. ``duration`` overrides the encoded Duration."""
+    header = _element(probe.EBML, _element(0x4282, b'webm'))
+    if duration is None:
+        duration = struct.pack('>d', seconds * 1000)
+    info = _element(probe.INFO, _element(probe.TIMECODE_SCALE, (1000000).to_bytes(3, 'big'))
+                    + _element(probe.DURATION, duration))
+    video = _element(probe.VIDEO, _element(probe.PIXEL_WIDTH, width.to_bytes(2, 'big'))
+                     + _element(probe.PIXEL_HEIGHT, height.to_bytes(2, 'big')))
+    tracks = _element(probe.TRACKS, _element(probe.TRACK_ENTRY, _element(probe.TRACK_TYPE, b'\x01')
+                                             + _element(probe.CODEC_ID, b'V_VP9') + video))
+    # Segment of unknown size, as written by live encoders
+    segment = probe.SEGMENT.to_bytes(4, 'big') + b'\x01\xff\xff\xff\xff\xff\xff\xff' + info + tracks
+    cluster_size = size - len(header) - len(segment) - 12
+    file.write(header + segment + probe.CLUSTER.to_bytes(4, 'big') + ((1 << 56) | cluster_size).to_bytes(8, 'big'))
+    file.truncate(size)
+
+
+class CountingFile:
+    def __init__(self, file):
+        self.file = file
+        self.bytes_read = 0
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def tell(self):
+        return self.file.tell()
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the container probe on sparse MP4/WebM files of growing size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 1000, 10000],
+                            help='File sizes in MB')
+        parser.add_argument('--repeat', type=int, default=200, help='Probes per file')
+
+    def handle(self, *args, **options):
+        formats = [
+            ('mp4 (moov first)', lambda f, size: write_mp4(f, size, moov_at_end=False)),
+            ('mp4 (moov last)', write_mp4),
+            ('webm', write_webm),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            for label, writer in formats:
+                for megabytes in options['sizes']:
+                    path = os.path.join(directory, 'sample')
+                    with open(path, 'wb') as sample:
+                        writer(sample, megabytes * 1024 * 1024)
+                    with open(path, 'rb') as sample:
+                        counting = CountingFile(sample)
+                        start = time.perf_counter()
+                        for _ in range(options['repeat']):
+                            info = probe.probe(counting)
+                        elapsed = (time.perf_counter() - start) / options['repeat']
+                    os.remove(path)
+                    self.stdout.write(
+                        f'{label:<17} {megabytes:>6} MB: {elapsed * 1e6:8.1f} us/probe, '
+                        f'{counting.bytes_read // options["repeat"]:>5} bytes read, '
+                        f"{info['duration']} {info['width']}x{info['height']} {info['video_codec']}"
+                    )
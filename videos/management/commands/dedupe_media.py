@@ -0,0 +1,91 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from contests.models import Submission
+from videos.blobs import blob_storage, file_digest
+from videos.models import MediaBlob, Video
+
+DIRECTORIES = ['videos', 'contest_videos']
+REFERENCES = [(Video, 'url'), (Submission, 'video_file')]
+# Blobs younger than this may belong to a save still in progress
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+def megabytes(size):
+    return f'{size / (1024 * 1024):.1f} MB'
+
+
+class Command(BaseCommand):
+    help = 'Merge identical video files under MEDIA_ROOT into one blob each and report the space reclaimed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be reclaimed')
+
+    def handle(self, *args, **options):
+        storage = blob_storage()
+        dry_run = options['dry_run']
+
+        referenced = defaultdict(int)
+        for model, field in REFERENCES:
+            for name in model.objects.exclude(**{field: ''}).values_list(field, flat=True):
+                referenced[name] += 1
+
+        by_digest = defaultdict(list)
+        hashed = 0
+        for directory in DIRECTORIES:
+            for root, _, filenames in os.walk(storage.path(directory)):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(root, filename), storage.location).replace(os.sep, '/')
+                    with storage.open(name, 'rb') as content:
+                        by_digest[file_digest(content)].append((name, content.size))
+                    hashed += 1
+
+        reclaimed = orphaned = duplicates = released = 0
+        for digest, files in by_digest.items():
+            # Keep the copy the blob table already knows, else a referenced one, else the oldest
+            blob = MediaBlob.objects.filter(sha256=digest).first()
+            known = blob.name if blob else None
+            files.sort(key=lambda item: (item[0] != known, not referenced.get(item[0]), storage.get_created_time(item[0])))
+            canonical, size = files[0]
+            copies = [name for name, _ in files[1:]]
+            ref_count = sum(referenced.get(name, 0) for name, _ in files)
+            if not ref_count:
+                if blob is None or blob.created_at > timezone.now() - ORPHAN_GRACE:
+                    orphaned += size * len(files)
+                    continue
+                # Stored for a save that failed, or whose rows are all gone
+                released += 1
+                reclaimed += size * len(files)
+                if not dry_run:
+                    with transaction.atomic():
+                        # Unless an upload has taken a reference to it since it was read
+                        if MediaBlob.objects.filter(pk=blob.pk, ref_count=blob.ref_count).delete()[0]:
+                            transaction.on_commit(lambda files=files: [storage.delete(name) for name, _ in files])
+                continue
+            duplicates += len(copies)
+            reclaimed += size * len(copies)
+            if dry_run:
+                continue
+            with transaction.atomic():
+                for model, field in REFERENCES:
+                    model.objects.filter(**{f'{field}__in': copies}).update(
+                        **{field: canonical}, updated_at=timezone.now()
+                    )
+                MediaBlob.objects.update_or_create(
+                    sha256=digest, defaults={'name': canonical, 'size': size, 'ref_count': ref_count}
+                )
+                transaction.on_commit(lambda copies=copies: [storage.delete(name) for name in copies])
+
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(
+            f'Hashed {hashed} files; {duplicates} duplicate copies of {len(by_digest)} distinct files.'
+        )
+        if released:
+            self.stdout.write(f'{released} blobs nothing refers to any more.')
+        if orphaned:
+            self.stdout.write(f'{megabytes(orphaned)} in files no video or submission refers to (left in place).')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {megabytes(reclaimed)}.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from videos.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads (and their partial files) that have expired'
+
+    def handle(self, *args, **options):
+        removed = expire_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired uploads.'))
@@ -0,0 +1,35 @@
+from collections import Counter
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from ocontest import background
+from videos.models import Video
+from videos.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for videos that do not have them yet, on the background media pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Only these video ids')
+        parser.add_argument('--all', action='store_true', help='Regenerate thumbnails that already exist')
+        parser.add_argument('--limit', type=int, help='Process at most this many videos')
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(url='').order_by('pk')
+        if options['ids']:
+            videos = videos.filter(pk__in=options['ids'])
+        if not options['all']:
+            videos = videos.exclude(thumbnail_status=Video.ThumbnailStatus.READY)
+        video_ids = list(videos.values_list('pk', flat=True)[:options['limit']])
+
+        futures = [background.submit('media', generate_thumbnails, video_id) for video_id in video_ids]
+        outcomes = Counter()
+        for future in as_completed(futures):
+            try:
+                outcomes[future.result()] += 1
+            except Exception:
+                outcomes['error'] += 1
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(outcomes.items(), key=str)) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(video_ids)} videos: {summary}.'))
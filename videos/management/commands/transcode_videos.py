@@ -0,0 +1,35 @@
+from collections import Counter
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from ocontest import background
+from videos.models import Video
+from videos.transcoding import transcode_video
+
+
+class Command(BaseCommand):
+    help = 'Build HLS renditions for approved videos that do not have them yet, on the background transcode pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Only these video ids')
+        parser.add_argument('--all', action='store_true', help='Transcode videos that already have renditions again')
+        parser.add_argument('--limit', type=int, help='Process at most this many videos')
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(approval_status=Video.ApprovalStatus.APPROVED).exclude(url='').order_by('pk')
+        if options['ids']:
+            videos = videos.filter(pk__in=options['ids'])
+        if not options['all']:
+            videos = videos.exclude(hls_status=Video.StreamStatus.READY)
+        video_ids = list(videos.values_list('pk', flat=True)[:options['limit']])
+
+        futures = [background.submit('transcode', transcode_video, video_id) for video_id in video_ids]
+        outcomes = Counter()
+        for future in as_completed(futures):
+            try:
+                outcomes[future.result()] += 1
+            except Exception:
+                outcomes['error'] += 1
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(outcomes.items(), key=str)) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(video_ids)} videos: {summary}.'))
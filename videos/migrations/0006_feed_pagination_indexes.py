@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0008_feed_pagination_indexes'),
+        ('videos', '0005_video_is_standalone_alter_video_contest_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['approval_status', '-created_at', '-id'], name='videos_vide_approva_0f1588_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-created_at', '-id'], name='videos_vide_created_6df2ef_idx'),
+        ),
+    ]
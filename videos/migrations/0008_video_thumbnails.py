@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed'), ('unavailable', 'Unavailable')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
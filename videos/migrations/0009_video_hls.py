@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_video_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='hls_manifest',
+            field=models.CharField(blank=True, help_text='Storage name of the master playlist', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='hls_renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='hls_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('ready', 'Ready'), ('failed', 'Failed'), ('unavailable', 'Unavailable')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0010_creator_stats'),
+        ('videos', '0009_video_hls'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['url'], name='video_url_idx'),
+        ),
+    ]
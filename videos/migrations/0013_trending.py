@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:08
+
+import ocontest.trending
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    # Existing activity is counted as having happened when the video was created
+    from ocontest.trending import combine, event_score
+
+    weights = settings.TRENDING_WEIGHTS
+    Video = apps.get_model('videos', 'Video')
+    videos = list(Video.objects.only('created_at', 'views', 'likes'))
+    for video in videos:
+        score = event_score(weights['created'], video.created_at)
+        activity = video.views * weights['view'] + video.likes * weights['like']
+        if activity:
+            score = combine(score, event_score(activity, video.created_at))
+        video.trending_score = score
+    Video.objects.bulk_update(videos, ['trending_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='trending_score',
+            field=models.FloatField(default=ocontest.trending.initial_score, editable=False),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['approval_status', '-trending_score', '-id'], name='videos_vide_approva_abab69_idx'),
+        ),
+    ]
@@ -1,7 +1,34 @@
+import os
+import uuid
+
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from contests.models import Contest, Submission
+from ocontest import counters, trending
+from .blobs import blob_storage
+
+
+class VideoQuerySet(models.QuerySet):
+    def with_contest_counts(self):
+        """Annotate ``contest_submission_count`` with a correlated subquery instead of a join."""
+        counts = Submission.objects.filter(contest=OuterRef('contest')).order_by().values('contest').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.annotate(
+            contest_submission_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        )
+
+    def for_feed(self):
+        """Queryset used by every video list endpoint, read by ``VideoCardSerializer``."""
+        return self.select_related('creator__creator_profile', 'contest', 'submission').with_contest_counts()
+
+    def featured(self):
+        """Featured videos for the feed, most trending first."""
+        return self.for_feed().filter(is_featured=True).order_by(*trending.TRENDING_ORDERING)
+
 
 class Video(models.Model):
     class Category(models.TextChoices):
@@ -16,6 +43,19 @@ class Video(models.Model):
         APPROVED = 'approved', _('Approved')
         REJECTED = 'rejected', _('Rejected')
 
+    class ThumbnailStatus(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        READY = 'ready', _('Ready')
+        FAILED = 'failed', _('Failed')
+        UNAVAILABLE = 'unavailable', _('Unavailable')  # no ffmpeg on the worker
+
+    class StreamStatus(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        QUEUED = 'queued', _('Queued')
+        READY = 'ready', _('Ready')
+        FAILED = 'failed', _('Failed')
+        UNAVAILABLE = 'unavailable', _('Unavailable')  # no ffmpeg on the worker
+
     title = models.CharField(max_length=200)
     description = models.TextField()
     creator = models.ForeignKey(
@@ -24,8 +64,25 @@ class Video(models.Model):
         related_name='videos',
         limit_choices_to={'role': 'creator'}
     )
-    url = models.FileField(upload_to='videos/')
+    url = models.FileField(upload_to='videos/', storage=blob_storage)
     thumbnail = models.ImageField(upload_to='video_thumbnails/', blank=True)
+    # {size: {'width', 'height', 'jpeg', 'webp'}} with storage names, see videos/thumbnails.py
+    thumbnails = models.JSONField(default=dict, blank=True)
+    thumbnail_status = models.CharField(
+        max_length=20,
+        choices=ThumbnailStatus.choices,
+        default=ThumbnailStatus.PENDING
+    )
+    thumbnail_attempts = models.PositiveSmallIntegerField(default=0)
+    # HLS renditions of approved videos, see videos/transcoding.py
+    hls_status = models.CharField(
+        max_length=20,
+        choices=StreamStatus.choices,
+        default=StreamStatus.PENDING
+    )
+    hls_manifest = models.CharField(max_length=255, blank=True, help_text='Storage name of the master playlist')
+    # [{'name', 'height', 'bandwidth', 'playlist'}] from lowest to highest quality
+    hls_renditions = models.JSONField(default=list, blank=True)
     category = models.CharField(
         max_length=50,
         choices=Category.choices,
@@ -34,6 +91,13 @@ class Video(models.Model):
     views = models.PositiveIntegerField(default=0)
     likes = models.PositiveIntegerField(default=0)
     duration = models.DurationField(null=True, blank=True)
+    # Read from the container headers at upload, see videos/probe.py
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    video_codec = models.CharField(max_length=32, blank=True)
+    bitrate = models.PositiveIntegerField(null=True, blank=True, help_text='Overall bits per second')
+    # Time-decayed activity, see ocontest/trending.py
+    trending_score = models.FloatField(default=trending.initial_score, editable=False)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -65,16 +129,98 @@ class Video(models.Model):
         help_text='Whether this is a standalone video not associated with any contest'
     )
 
+    objects = VideoQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on the video feeds
+            models.Index(fields=['approval_status', '-created_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['approval_status', '-trending_score', '-id']),
+            # Access checks in ocontest.media look videos up by file name
+            models.Index(fields=['url'], name='video_url_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     def increment_views(self):
-        self.views += 1
-        self.save(update_fields=['views'])
+        """Buffer a view; ``ocontest.counters`` applies it in a batched UPDATE."""
+        counters.increment(self, 'views')
 
     def increment_likes(self):
-        self.likes += 1
-        self.save(update_fields=['likes'])
+        """Buffer a like; ``ocontest.counters`` applies it in a batched UPDATE."""
+        counters.increment(self, 'likes')
+
+
+class MediaBlob(models.Model):
+    """One stored file, shared by every upload with the same content; see videos/blobs.py."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True, help_text='Storage name of the file')
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count} references)'
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload (see ``videos.uploads``).
+
+    Chunks are appended to ``part_path`` as they arrive; ``offset`` and the
+    running CRC-32 ``checksum`` describe what has been received so far.
+    """
+    class Purpose(models.TextChoices):
+        VIDEO = 'video', _('Standalone Video')
+        SUBMISSION = 'submission', _('Contest Submission')
+
+    class Status(models.TextChoices):
+        ACTIVE = 'active', _('Active')
+        COMPLETED = 'completed', _('Completed')
+        ABORTED = 'aborted', _('Aborted')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    purpose = models.CharField(max_length=20, choices=Purpose.choices, default=Purpose.VIDEO)
+    contest = models.ForeignKey(
+        Contest,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    checksum = models.PositiveBigIntegerField(default=0, help_text='CRC-32 of the bytes received so far')
+    metadata = models.JSONField(default=dict, blank=True, help_text='Fields for the video or submission created on finalize')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    submission = models.ForeignKey(Submission, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.total_size})'
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.pk}.part')
+
+    @property
+    def is_complete(self):
+        return self.offset == self.total_size
@@ -0,0 +1,279 @@
+"""
+Container metadata from MP4/MOV (ISO base media) and WebM/Matroska headers.
+
+``probe()`` seeks from header to header and only reads the small boxes or
+elements that carry metadata: the ``moov`` boxes of an MP4 (wherever they
+are, skipping ``mdat`` with a seek) or the ``Info``/``Tracks`` elements of a
+WebM up to its first ``Cluster``. The amount read is bounded by
+``MAX_ELEMENTS`` and ``MAX_READ`` whatever the size of the file, so it can
+run on the uploaded file while the upload request is saved; see
+``videos.signals``.
+"""
+import logging
+import math
+import struct
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+MAX_ELEMENTS = 1000  # boxes/elements visited before giving up
+MAX_READ = 64 * 1024  # largest single metadata read
+
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+MP4_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264', 'hvc1': 'hevc', 'hev1': 'hevc', 'vp08': 'vp8',
+    'vp09': 'vp9', 'av01': 'av1', 'mp4v': 'mpeg4', 'jpeg': 'mjpeg',
+    'apcn': 'prores', 'apch': 'prores', 'apcs': 'prores', 'apco': 'prores', 'ap4h': 'prores',
+}
+MATROSKA_CODECS = {
+    'V_VP8': 'vp8', 'V_VP9': 'vp9', 'V_AV1': 'av1', 'V_MPEG4/ISO/AVC': 'h264', 'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_THEORA': 'theora',
+}
+
+# Matroska element ids
+EBML = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+MATROSKA_CONTAINERS = {SEGMENT, INFO, TRACKS, TRACK_ENTRY, VIDEO}
+MATROSKA_VALUES = {TIMECODE_SCALE, DURATION, TRACK_TYPE, CODEC_ID, PIXEL_WIDTH, PIXEL_HEIGHT}
+
+
+class ProbeError(Exception):
+    """The file is truncated or not a container we understand."""
+
+
+class _Reader:
+    """Bounded reads at absolute offsets of a seekable file."""
+
+    def __init__(self, file, size):
+        self.file = file
+        self.size = size
+        self.elements = 0
+
+    def read(self, offset, length):
+        if length > MAX_READ:
+            raise ProbeError(f'Refusing to read {length} bytes of metadata')
+        self.file.seek(offset)
+        data = self.file.read(length)
+        if len(data) != length:
+            raise ProbeError('Unexpected end of file')
+        return data
+
+    def visit(self):
+        self.elements += 1
+        if self.elements > MAX_ELEMENTS:
+            raise ProbeError('Too many boxes')
+
+
+def _mp4_boxes(reader, start, end):
+    """Yield ``(type, payload_offset, payload_size)`` for the boxes in ``[start, end)``."""
+    offset = start
+    while offset + 8 <= end:
+        reader.visit()
+        size, box_type = struct.unpack('>I4s', reader.read(offset, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', reader.read(offset + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            raise ProbeError('Malformed box')
+        yield box_type, offset + header, min(size, end - offset) - header
+        offset += size
+
+
+def _probe_mp4(reader):
+    info = {}
+    tracks = []
+
+    def walk(start, end, track):
+        for box_type, offset, size in _mp4_boxes(reader, start, end):
+            if box_type in MP4_CONTAINERS:
+                if box_type == b'trak':
+                    track = {}
+                    tracks.append(track)
+                walk(offset, offset + size, track)
+            elif box_type == b'mvhd':
+                version = reader.read(offset, 1)[0]
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', reader.read(offset + 20, 12))
+                else:
+                    timescale, duration = struct.unpack('>II', reader.read(offset + 12, 8))
+                if timescale:
+                    info['duration'] = duration / timescale
+            elif box_type == b'tkhd' and track is not None:
+                version = reader.read(offset, 1)[0]
+                width, height = struct.unpack('>II', reader.read(offset + (88 if version == 1 else 76), 8))
+                track['width'], track['height'] = width >> 16, height >> 16
+            elif box_type == b'hdlr' and track is not None:
+                track['handler'] = reader.read(offset + 8, 4)
+            elif box_type == b'stsd' and track is not None:
+                entry = reader.read(offset + 8, 40)
+                track['codec'] = entry[4:8].decode('latin-1')
+                if not track.get('width'):
+                    track['width'], track['height'] = struct.unpack('>HH', entry[32:36])
+
+    # Only the top level is scanned for moov; mdat and free boxes are skipped with a seek
+    for box_type, offset, size in _mp4_boxes(reader, 0, reader.size):
+        if box_type == b'moov':
+            walk(offset, offset + size, None)
+            break
+    else:
+        raise ProbeError('No moov box')
+
+    video = next((track for track in tracks if track.get('handler') == b'vide'), None)
+    if video:
+        info['width'], info['height'] = video.get('width') or None, video.get('height') or None
+        codec = video.get('codec', '')
+        info['video_codec'] = MP4_CODECS.get(codec, codec.strip())
+    return info
+
+
+def _ebml_vint(reader, offset, strip_marker=True):
+    """A variable-length integer at ``offset``: ``(value, length)``; ``value`` is ``None`` for 'unknown'."""
+    first = reader.read(offset, 1)[0]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ProbeError('Malformed EBML')
+    data = reader.read(offset, length)
+    value = int.from_bytes(data, 'big')
+    if strip_marker:
+        value &= (1 << (7 * length)) - 1
+        if value == (1 << (7 * length)) - 1:
+            return None, length
+    return value, length
+
+
+def _matroska_elements(reader, start, end):
+    """Yield ``(id, payload_offset, payload_size)``; an unknown size runs to ``end``."""
+    offset = start
+    while offset < end:
+        reader.visit()
+        element_id, id_length = _ebml_vint(reader, offset, strip_marker=False)
+        size, size_length = _ebml_vint(reader, offset + id_length)
+        payload = offset + id_length + size_length
+        if size is None:
+            size = end - payload
+        yield element_id, payload, size
+        offset = payload + size
+
+
+def _ebml_float(data):
+    """An EBML float element: empty (0), 4 or 8 byte IEEE, or 10 byte x87 extended."""
+    if len(data) == 0:
+        return 0.0
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    if len(data) == 10:
+        sign_exponent, mantissa = struct.unpack('>HQ', data)
+        exponent = sign_exponent & 0x7fff
+        if exponent == 0x7fff:
+            raise ProbeError('Non-finite float')
+        value = math.ldexp(mantissa, exponent - 16383 - 63)
+        return -value if sign_exponent & 0x8000 else value
+    raise ProbeError(f'Malformed float of {len(data)} bytes')
+
+
+def _probe_matroska(reader):
+    values = {'timecode_scale': 1000000}
+    tracks = []
+
+    def walk(start, end, track):
+        for element_id, offset, size in _matroska_elements(reader, start, end):
+            if element_id == CLUSTER:
+                # Media data follows; everything we need comes before it
+                return True
+            if element_id in MATROSKA_CONTAINERS:
+                if element_id == TRACK_ENTRY:
+                    track = {}
+                    tracks.append(track)
+                if walk(offset, offset + size, track):
+                    return True
+            elif element_id in MATROSKA_VALUES:
+                data = reader.read(offset, size)
+                target = values if track is None else track
+                if element_id == DURATION:
+                    target['duration'] = _ebml_float(data)
+                elif element_id == CODEC_ID:
+                    target['codec'] = data.rstrip(b'\0').decode('ascii', 'replace')
+                elif element_id == TIMECODE_SCALE:
+                    target['timecode_scale'] = int.from_bytes(data, 'big')
+                elif element_id == TRACK_TYPE:
+                    target['type'] = int.from_bytes(data, 'big')
+                elif element_id == PIXEL_WIDTH:
+                    target['width'] = int.from_bytes(data, 'big')
+                elif element_id == PIXEL_HEIGHT:
+                    target['height'] = int.from_bytes(data, 'big')
+        return False
+
+    first = next(_matroska_elements(reader, 0, reader.size), None)
+    if first is None or first[0] != EBML:
+        raise ProbeError('Not an EBML file')
+    walk(first[1] + first[2], reader.size, None)
+
+    info = {}
+    if 'duration' in values:
+        info['duration'] = values['duration'] * values['timecode_scale'] / 1e9
+    video = next((track for track in tracks if track.get('type') == 1), None)
+    if video:
+        info['width'], info['height'] = video.get('width'), video.get('height')
+        codec = video.get('codec', '')
+        info['video_codec'] = MATROSKA_CODECS.get(codec, codec.lower())
+    return info
+
+
+def probe(file, size=None):
+    """
+    ``duration`` (a ``timedelta``), ``width``, ``height``, ``video_codec``
+    and the overall ``bitrate`` in bits per second of a seekable video file,
+    as far as its headers tell. Raises ``ProbeError`` for anything else.
+    """
+    if size is None:
+        file.seek(0, 2)
+        size = file.tell()
+    reader = _Reader(file, size)
+    head = reader.read(0, 8) if size >= 8 else b''
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        info = _probe_matroska(reader)
+    elif head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+        info = _probe_mp4(reader)
+    else:
+        raise ProbeError('Unsupported container')
+
+    seconds = info.pop('duration', None)
+    if seconds and seconds > 0:
+        info['duration'] = timedelta(seconds=seconds)
+        info['bitrate'] = int(size * 8 / seconds)
+    return info
+
+
+def probe_video_file(field_file):
+    """``probe()`` the file of a ``FileField``, fresh upload or stored; ``{}`` when that fails."""
+    try:
+        if not field_file._committed:
+            # Not saved yet: read the upload itself, before storage moves it
+            upload = field_file.file
+            try:
+                return probe(upload, upload.size)
+            finally:
+                upload.seek(0)
+        with field_file.storage.open(field_file.name, 'rb') as stored:
+            return probe(stored)
+    except (ProbeError, OSError, struct.error) as e:
+        logger.info(f'Could not read the metadata of {field_file.name}: {e}')
+        return {}
@@ -1,9 +1,19 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Video
+from .models import UploadSession, Video
+from . import sniffing
+from .uploads import format_checksum
 from accounts.serializers import CreatorProfileSerializer
 from contests.serializers import ContestSerializer
+from ocontest.counters import LiveCounterField
+from ocontest.fragments import FragmentCacheMixin, FragmentListSerializer
+from ocontest.images import variant_urls
 
-class VideoSerializer(serializers.ModelSerializer):
+class VideoSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    fragment_volatile = (
+        'creator_profile', 'creator_name', 'contest_details', 'submission_status', 'views', 'likes',
+    )
     creator_profile = serializers.SerializerMethodField()
     creator_name = serializers.SerializerMethodField()
     duration_str = serializers.SerializerMethodField()
@@ -11,16 +21,21 @@ class VideoSerializer(serializers.ModelSerializer):
     submission_status = serializers.SerializerMethodField()
     url = serializers.SerializerMethodField()
     thumbnail = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+    stream_url = serializers.SerializerMethodField()
+    views = LiveCounterField()
+    likes = LiveCounterField()
 
     class Meta:
         model = Video
         fields = [
-            'id', 'title', 'description', 'url', 'thumbnail',
+            'id', 'title', 'description', 'url', 'stream_url', 'thumbnail', 'thumbnails',
             'category', 'views', 'likes', 'duration_str',
             'is_featured', 'created_at', 'creator_profile', 'creator_name',
             'contest_details', 'submission_status', 'approval_status',
             'approval_date', 'approval_notes'
         ]
+        list_serializer_class = FragmentListSerializer
 
     def get_duration_str(self, obj):
         if not obj.duration:
@@ -47,7 +62,7 @@ class VideoSerializer(serializers.ModelSerializer):
                 'id': obj.creator.id,
                 'name': f'{obj.creator.first_name} {obj.creator.last_name}'.strip() or 'Anonymous',
                 'bio': profile.bio,
-                'country': profile.country,
+                'country': profile.shipping_country,
                 'profilePicture': profile.profile_picture.url if profile.profile_picture else None,
                 'experienceLevel': profile.experience_level
             }
@@ -58,11 +73,29 @@ class VideoSerializer(serializers.ModelSerializer):
             return obj.url.url
         return None
 
+    def get_stream_url(self, obj):
+        # HLS master playlist; players fall back to ``url`` until it is ready
+        if obj.hls_status == Video.StreamStatus.READY and obj.hls_manifest:
+            return default_storage.url(obj.hls_manifest)
+        return None
+
     def get_thumbnail(self, obj):
         if obj.thumbnail:
             return obj.thumbnail.url
         return None
 
+    def get_thumbnails(self, obj):
+        storage = obj.thumbnail.storage
+        return {
+            size: {
+                'width': variant['width'],
+                'height': variant['height'],
+                'jpeg': storage.url(variant['jpeg']),
+                'webp': storage.url(variant['webp']),
+            }
+            for size, variant in (obj.thumbnails or {}).items()
+        }
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         # Format created_at to ISO format
@@ -71,6 +104,44 @@ class VideoSerializer(serializers.ModelSerializer):
         return data
 
 
+class VideoCardSerializer(VideoSerializer):
+    """
+    Compact video for list endpoints: no nested contest serializer, and every
+    field is read from ``Video.objects.for_feed()`` without further queries.
+    """
+    fragment_volatile = ('creator', 'contest', 'submission_status', 'views', 'likes')
+    creator = serializers.SerializerMethodField()
+    contest = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Video
+        fields = [
+            'id', 'title', 'url', 'stream_url', 'thumbnail', 'thumbnails',
+            'category', 'views', 'likes', 'duration_str', 'is_featured', 'created_at',
+            'creator', 'contest', 'submission_status', 'approval_status'
+        ]
+        list_serializer_class = FragmentListSerializer
+
+    def get_creator(self, obj):
+        creator = obj.creator
+        profile = getattr(creator, 'creator_profile', None)
+        return {
+            'id': creator.id,
+            'name': self.get_creator_name(obj),
+            'avatar': variant_urls(profile.profile_picture, ('avatar',)) if profile else None,
+        }
+
+    def get_contest(self, obj):
+        if obj.contest is None:
+            return None
+        return {
+            'id': obj.contest.id,
+            'title': obj.contest.title,
+            'status': obj.contest.status,
+            'submission_count': getattr(obj, 'contest_submission_count', None),
+        }
+
+
 class VideoUploadSerializer(serializers.ModelSerializer):
     """
     Serializer for video uploads with additional validation.
@@ -94,10 +165,14 @@ class VideoUploadSerializer(serializers.ModelSerializer):
         """
         Validate the uploaded video file.
         """
-        # Check file size (max 500MB)
-        max_size = 500 * 1024 * 1024  # 500MB in bytes
-        if value.size > max_size:
-            raise serializers.ValidationError('Video file too large. Maximum size is 500MB.')
+        if value.size > settings.VIDEO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(sniffing.too_large_message())
+        
+        # Check the container itself, not just what the client claims
+        head = value.read(sniffing.SNIFF_BYTES)
+        value.seek(0)
+        if sniffing.sniff_video(head) is None:
+            raise serializers.ValidationError(sniffing.NOT_A_VIDEO)
         
         # Check file type
         valid_mime_types = [
@@ -138,25 +213,29 @@ class VideoUploadSerializer(serializers.ModelSerializer):
         if 'is_standalone' not in validated_data:
             validated_data['is_standalone'] = True
             
-        # Create the video instance
+        # Create the video instance; thumbnails are generated in the background (videos/thumbnails.py)
         video = Video.objects.create(
             **validated_data,
-            url=video_file,  # This will be handled by FileField's upload_to
-            thumbnail=None  # Thumbnail will be generated by a signal or task
+            url=video_file  # This will be handled by FileField's upload_to
         )
         
-        # Generate thumbnail (this would typically be done by a background task)
-        # self._generate_thumbnail(video)
-        
         return video
-    
-    def _generate_thumbnail(self, video):
-        """
-        Generate a thumbnail from the video.
-        This is a placeholder - in a real app, you would use a library like ffmpeg.
-        """
-        # This is a placeholder - in a real app, you would:
-        # 1. Extract a frame from the video using ffmpeg
-        # 2. Save it as an image file
-        # 3. Set it as the video's thumbnail
-        pass
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    checksum = serializers.SerializerMethodField()
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'purpose', 'contest', 'filename', 'total_size', 'offset',
+            'checksum', 'chunk_size', 'status', 'expires_at', 'video', 'submission'
+        ]
+        read_only_fields = fields
+
+    def get_checksum(self, obj):
+        return format_checksum(obj.checksum)
+
+    def get_chunk_size(self, obj):
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
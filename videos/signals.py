@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from contests import creator_stats
+from ocontest.counters import counters_flushed
+from .models import Video
+from .probe import probe_video_file
+from .thumbnails import schedule_thumbnails
+from .transcoding import queue_transcodes
+
+
+def video_contribution(video_fields):
+    is_standalone, views = video_fields
+    return {'standalone_videos': int(is_standalone), 'total_views': views}
+
+
+@receiver(pre_save, sender=Video)
+def remember_video_contribution(sender, instance, **kwargs):
+    instance._stats_before = None
+    if instance.pk:
+        instance._stats_before = Video.objects.filter(pk=instance.pk).values_list(
+            'creator_id', 'is_standalone', 'views'
+        ).first()
+
+
+@receiver(pre_save, sender=Video)
+def read_container_metadata(sender, instance, raw=False, **kwargs):
+    # Runs before FileField.pre_save stores the upload, so the file is only read once
+    if not raw and instance.pk is None and instance.url and instance.duration is None:
+        for field, value in probe_video_file(instance.url).items():
+            setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Video)
+def update_video_stats(sender, instance, **kwargs):
+    after = video_contribution((instance.is_standalone, instance.views))
+    before = getattr(instance, '_stats_before', None)
+    if before and before[0] != instance.creator_id:
+        creator_stats.apply_deltas(before[0], creator_stats.difference({}, video_contribution(before[1:])))
+        before = None
+    creator_stats.apply_deltas(
+        instance.creator_id,
+        creator_stats.difference(after, video_contribution(before[1:]) if before else {})
+    )
+
+
+@receiver(post_save, sender=Video)
+def queue_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.url and not instance.thumbnail:
+        schedule_thumbnails(instance)
+
+
+@receiver(post_save, sender=Video)
+def queue_hls_renditions(sender, instance, raw=False, **kwargs):
+    if (
+        not raw
+        and instance.approval_status == Video.ApprovalStatus.APPROVED
+        and instance.hls_status == Video.StreamStatus.PENDING
+        and queue_transcodes([instance.pk])
+    ):
+        instance.hls_status = Video.StreamStatus.QUEUED
+
+
+@receiver(post_delete, sender=Video)
+def remove_video_stats(sender, instance, **kwargs):
+    creator_stats.apply_deltas(
+        instance.creator_id,
+        creator_stats.difference({}, video_contribution((instance.is_standalone, instance.views)))
+    )
+
+
+@receiver(counters_flushed, sender=Video)
+def add_flushed_views(sender, field, deltas, **kwargs):
+    if field != 'views':
+        return
+    views_by_creator = defaultdict(int)
+    for pk, creator_id in Video.objects.filter(pk__in=deltas).values_list('pk', 'creator_id'):
+        views_by_creator[creator_id] += deltas[pk]
+    creator_stats.apply_bulk_deltas({
+        creator_id: {'total_views': views} for creator_id, views in views_by_creator.items()
+    })
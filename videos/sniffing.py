@@ -0,0 +1,111 @@
+"""
+Reject bad video uploads while they stream in.
+
+Views that accept a video put ``VideoSniffingUploadHandler`` in front of the
+regular upload handlers (``install_upload_handler``). It refuses a request
+whose ``Content-Length`` already exceeds ``VIDEO_UPLOAD_MAX_SIZE`` before
+reading the body. It checks the first bytes of the video field against known
+container signatures and counts bytes as they arrive. When a check fails, it
+stops reading the request with ``StopUpload``. The view then answers with
+the reason from ``rejected_upload``. Junk is turned away after a
+few KB instead of after the whole transfer.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+SNIFF_BYTES = 16
+# Room for the other form fields next to the file
+FORM_OVERHEAD = 64 * 1024
+
+QUICKTIME_BOXES = (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot')
+
+
+def sniff_video(head):
+    """The container recognised from the first bytes of a file, or ``None``."""
+    if len(head) < 12:
+        return None
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return 'quicktime'
+        if brand.startswith(b'3g'):
+            return '3gpp'
+        return 'mp4'
+    if head[4:8] in QUICKTIME_BOXES:
+        return 'quicktime'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'matroska'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    if head[:8] == b'\x30\x26\xb2\x75\x8e\x66\xcf\x11':
+        return 'asf'
+    if head[:4] == b'FLV\x01':
+        return 'flv'
+    return None
+
+
+def max_upload_size():
+    return settings.VIDEO_UPLOAD_MAX_SIZE
+
+
+def too_large_message():
+    return f'Video file too large. Maximum size is {max_upload_size() // (1024 * 1024)}MB.'
+
+
+NOT_A_VIDEO = 'The uploaded file is not a supported video container.'
+
+
+class VideoSniffingUploadHandler(FileUploadHandler):
+    """Checks the video fields of a multipart upload and passes the data on unchanged."""
+
+    def __init__(self, request=None, field_names=('video',)):
+        super().__init__(request)
+        self.field_names = set(field_names)
+        self.active = False
+
+    def reject(self, message):
+        self.request._rejected_upload = message
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > max_upload_size() + FORM_OVERHEAD:
+            self.request._rejected_upload = too_large_message()
+            # Claim the parse so nothing of the body is read
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in self.field_names
+        self.head = b''
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.active:
+            self.received += len(raw_data)
+            if self.received > max_upload_size():
+                self.reject(too_large_message())
+            if len(self.head) < SNIFF_BYTES:
+                self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+                if len(self.head) >= SNIFF_BYTES and sniff_video(self.head) is None:
+                    self.reject(NOT_A_VIDEO)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.active and len(self.head) < SNIFF_BYTES and sniff_video(self.head) is None:
+            # Too short to have been checked while streaming
+            self.request._rejected_upload = NOT_A_VIDEO
+        return None
+
+
+def install_upload_handler(request, field_names=('video',)):
+    """Check ``field_names`` of this request's multipart body; call before ``request.data`` is read."""
+    request.upload_handlers.insert(0, VideoSniffingUploadHandler(request._request, field_names))
+
+
+def rejected_upload(request):
+    """Parse the body and return why the handler rejected it, or ``None``."""
+    request.data
+    return getattr(request._request, '_rejected_upload', None)
@@ -1,3 +1,807 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CreatorProfile
+from contests.models import ContestApplication, Submission
+from ocontest import counters, trending
+from ocontest.testing import create_brand, create_contest, create_creator
+from . import blobs, probe, sniffing, thumbnails, transcoding
+from .management.commands.benchmark_probe import write_mp4, write_webm
+from .models import MediaBlob, UploadSession, Video
+from .serializers import VideoSerializer
+
+# An ISO BMFF ``ftyp`` box: enough for the upload sniffing to accept the bytes after it
+MP4_HEADER = b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2'
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'upload_sessions'),
+            CHUNKED_UPLOAD_CHUNK_SIZE=1024,
+            CHUNKED_UPLOAD_MAX_SIZE=10 * 1024,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        self.client.force_authenticate(user=self.creator)
+        self.data = MP4_HEADER + os.urandom(2500 - len(MP4_HEADER))
+
+    def start(self, **extra):
+        payload = {'filename': 'reel.mp4', 'size': len(self.data), 'title': 'My reel', **extra}
+        response = self.client.post(reverse('videos:chunked-upload-list'), payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def put_chunk(self, upload_id, offset, chunk, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum is not None:
+            headers['HTTP_UPLOAD_CHECKSUM'] = f'crc32 {checksum:08x}'
+        return self.client.generic(
+            'PUT', reverse('videos:chunked-upload-detail', args=[upload_id]),
+            chunk, content_type='application/offset+octet-stream', **headers
+        )
+
+    def upload_all(self, upload_id):
+        for offset in range(0, len(self.data), 1024):
+            chunk = self.data[offset:offset + 1024]
+            response = self.put_chunk(upload_id, offset, chunk, zlib.crc32(chunk))
+            self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def finalize(self, upload_id, **payload):
+        return self.client.post(
+            reverse('videos:chunked-upload-finalize', args=[upload_id]), payload, format='json'
+        )
+
+    def test_chunked_upload_creates_video(self):
+        upload_id = self.start(category='animation')
+        response = self.upload_all(upload_id)
+        self.assertEqual(response['Upload-Offset'], str(len(self.data)))
+        self.assertEqual(response.data['checksum'], f'{zlib.crc32(self.data):08x}')
+
+        response = self.finalize(upload_id, checksum=f'{zlib.crc32(self.data):08x}')
+        self.assertEqual(response.status_code, 201, response.data)
+        video = Video.objects.get()
+        self.assertEqual(video.title, 'My reel')
+        self.assertEqual(video.category, 'animation')
+        self.assertTrue(video.is_standalone)
+        with video.url.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+
+        session = UploadSession.objects.get()
+        self.assertEqual(session.status, UploadSession.Status.COMPLETED)
+        self.assertEqual(session.video, video)
+        self.assertFalse(os.path.exists(session.part_path))
+
+    def test_finalize_locks_the_session_and_runs_once(self):
+        upload_id = self.start()
+        self.upload_all(upload_id)
+        select_for_update = mock.Mock(wraps=UploadSession.objects.select_for_update)
+        with mock.patch.object(UploadSession.objects, 'select_for_update', select_for_update):
+            self.assertEqual(self.finalize(upload_id).status_code, 201)
+        select_for_update.assert_called_once()
+
+        # A retried finalize finds the session completed rather than building a second video
+        self.assertEqual(self.finalize(upload_id).status_code, 410)
+        self.assertEqual(Video.objects.count(), 1)
+
+    def test_resume_after_offset_mismatch(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data[:1024])
+
+        # The client lost the response and retries the first chunk
+        response = self.put_chunk(upload_id, 0, self.data[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 1024)
+
+        status = self.client.get(reverse('videos:chunked-upload-detail', args=[upload_id]))
+        self.assertEqual(status['Upload-Offset'], '1024')
+
+        for offset in (1024, 2048):
+            self.put_chunk(upload_id, offset, self.data[offset:offset + 1024])
+        self.assertEqual(self.finalize(upload_id).status_code, 201)
+        with Video.objects.get().url.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+
+    def test_corrupt_chunk_is_discarded(self):
+        upload_id = self.start()
+        chunk = self.data[:1024]
+        response = self.put_chunk(upload_id, 0, chunk, zlib.crc32(chunk) ^ 1)
+        self.assertEqual(response.status_code, 400)
+        session = UploadSession.objects.get()
+        self.assertEqual(session.offset, 0)
+        self.assertEqual(os.path.getsize(session.part_path), 0)
+
+    def test_rejects_oversized_and_incomplete_uploads(self):
+        response = self.client.post(
+            reverse('videos:chunked-upload-list'),
+            {'filename': 'huge.mp4', 'size': 20 * 1024}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        upload_id = self.start()
+        response = self.put_chunk(upload_id, 0, os.urandom(2048))
+        self.assertEqual(response.status_code, 400)
+
+        self.put_chunk(upload_id, 0, self.data[:1024])
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 1024)
+
+    def test_first_chunk_must_be_a_video(self):
+        upload_id = self.start()
+        response = self.put_chunk(upload_id, 0, os.urandom(1024))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).offset, 0)
+
+        response = self.put_chunk(upload_id, 0, self.data[:1024])
+        self.assertEqual(response.status_code, 200)
+
+    def test_chunked_contest_submission(self):
+        brand = create_brand()
+        contest = create_contest(brand)
+        ContestApplication.objects.create(
+            contest=contest, creator=self.creator, status=ContestApplication.Status.APPROVED
+        )
+
+        upload_id = self.start(purpose='submission', contest=contest.pk, description='Entry')
+        self.upload_all(upload_id)
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+
+        response = self.finalize(upload_id, terms_accepted=True)
+        self.assertEqual(response.status_code, 201, response.data)
+        submission = Submission.objects.get()
+        self.assertEqual(submission.contest, contest)
+        self.assertEqual(submission.status, Submission.Status.PENDING_APPROVAL)
+        self.assertEqual(Video.objects.get().submission, submission)
+        with submission.video_file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+
+    def test_sessions_are_private(self):
+        upload_id = self.start()
+        other = create_creator('other@example.com')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:1024]).status_code, 404)
+
+
+@override_settings(
+    BACKGROUND_TASKS_EAGER=True,
+    THUMBNAIL_SIZES={'small': 160, 'medium': 320},
+    THUMBNAIL_POSTER_SIZE='medium',
+    THUMBNAIL_RETRY_BACKOFF=0,
+)
+class ThumbnailPipelineTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        self.frame = Image.new('RGB', (640, 360), 'purple')
+
+    def create_video(self, **extra):
+        return Video.objects.create(
+            title='Reel', description='Description', creator=self.creator,
+            url=ContentFile(b'not really a video', name='reel.mp4'), **extra
+        )
+
+    def test_thumbnails_generated_after_commit(self):
+        with mock.patch.object(thumbnails, 'extract_poster_frame', return_value=self.frame) as extract:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                video = self.create_video()
+            # Nothing runs inside the creating request's transaction
+            extract.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        video.refresh_from_db()
+        self.assertEqual(video.thumbnail_status, Video.ThumbnailStatus.READY)
+        self.assertEqual(video.thumbnail.name, video.thumbnails['medium']['jpeg'])
+        self.assertEqual((video.thumbnails['small']['width'], video.thumbnails['small']['height']), (160, 90))
+        with video.thumbnail.storage.open(video.thumbnails['small']['webp']) as stored:
+            self.assertEqual(Image.open(stored).format, 'WEBP')
+
+        Video.objects.filter(pk=video.pk).update(approval_status=Video.ApprovalStatus.APPROVED)
+        response = self.client.get(reverse('videos:video-detail', args=[video.pk]))
+        self.assertTrue(response.data['thumbnails']['medium']['jpeg'].endswith('medium.jpg'))
+
+    def test_retries_then_gives_up(self):
+        with mock.patch.object(
+            thumbnails, 'extract_poster_frame', side_effect=thumbnails.ThumbnailError('corrupt')
+        ) as extract:
+            with self.captureOnCommitCallbacks(execute=True):
+                video = self.create_video()
+        self.assertEqual(extract.call_count, 3)
+        video.refresh_from_db()
+        self.assertEqual(video.thumbnail_status, Video.ThumbnailStatus.FAILED)
+        self.assertEqual(video.thumbnail_attempts, 3)
+        self.assertFalse(video.thumbnail)
+
+    def test_missing_ffmpeg_is_not_retried(self):
+        with mock.patch.object(thumbnails, 'ffmpeg_binary', return_value=None):
+            with self.captureOnCommitCallbacks(execute=True):
+                video = self.create_video()
+        video.refresh_from_db()
+        self.assertEqual(video.thumbnail_status, Video.ThumbnailStatus.UNAVAILABLE)
+        self.assertEqual(video.thumbnail_attempts, 1)
+
+    def test_backfill_command(self):
+        with mock.patch.object(thumbnails, 'ffmpeg_binary', return_value=None):
+            with self.captureOnCommitCallbacks(execute=True):
+                video = self.create_video()
+        brand = create_brand()
+        contest = create_contest(brand)
+        submission = Submission.objects.create(
+            contest=contest, creator=self.creator, title='Entry', description='Entry',
+            video_file=ContentFile(b'entry', name='entry.mp4')
+        )
+        Video.objects.filter(pk=video.pk).update(submission=submission)
+
+        with mock.patch.object(thumbnails, 'extract_poster_frame', return_value=self.frame):
+            call_command('generate_thumbnails', stdout=io.StringIO())
+
+        video.refresh_from_db()
+        submission.refresh_from_db()
+        self.assertEqual(video.thumbnail_status, Video.ThumbnailStatus.READY)
+        self.assertEqual(submission.thumbnail.name, video.thumbnail.name)
+
+
+def fake_rendition(binary, source, output_dir, rung):
+    with open(os.path.join(output_dir, 'index.m3u8'), 'w') as playlist:
+        playlist.write('#EXTM3U\n#EXTINF:6.0,\nsegment_0000.ts\n#EXT-X-ENDLIST\n')
+    with open(os.path.join(output_dir, 'segment_0000.ts'), 'wb') as segment:
+        segment.write(b'\x47' * 188)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, HLS_RETRY_BACKOFF=0)
+class TranscodingTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        for target, value in [('ffmpeg_binary', 'ffmpeg'), ('probe_dimensions', (1280, 720))]:
+            patcher = mock.patch.object(transcoding, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.video = Video.objects.create(
+            title='Reel', description='Description', creator=self.creator,
+            url=ContentFile(b'not really a video', name='reel.mp4')
+        )
+
+    def approve(self):
+        with mock.patch.object(transcoding, 'transcode_rendition', side_effect=fake_rendition) as rendition:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.video.approval_status = Video.ApprovalStatus.APPROVED
+                self.video.save()
+        self.video.refresh_from_db()
+        return rendition
+
+    def test_approval_builds_hls_ladder(self):
+        self.assertEqual(self.approve().call_count, 2)
+        self.assertEqual(self.video.hls_status, Video.StreamStatus.READY)
+        self.assertEqual([r['name'] for r in self.video.hls_renditions], ['360p', '720p'])
+
+        storage = FileSystemStorage()
+        with storage.open(self.video.hls_manifest) as manifest:
+            master = manifest.read().decode()
+        self.assertIn('BANDWIDTH=896000,RESOLUTION=640x360,NAME="360p"\n360p/index.m3u8', master)
+        self.assertNotIn('1080p', master)
+        self.assertTrue(storage.exists(f'video_streams/{self.video.pk}/720p/segment_0000.ts'))
+
+        response = self.client.get(reverse('videos:video-detail', args=[self.video.pk]))
+        self.assertTrue(response.data['stream_url'].endswith(f'video_streams/{self.video.pk}/master.m3u8'))
+
+        # Later saves do not transcode again
+        with mock.patch.object(transcoding, 'transcode_video') as transcode:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.video.save()
+        transcode.assert_not_called()
+
+    def test_pending_video_has_no_stream(self):
+        self.assertEqual(self.video.hls_status, Video.StreamStatus.PENDING)
+        self.client.force_authenticate(user=self.creator)
+        response = self.client.get(reverse('videos:video-detail', args=[self.video.pk]))
+        self.assertIsNone(response.data.get('stream_url'))
+
+    def test_failed_transcode_is_retried(self):
+        with override_settings(HLS_MAX_ATTEMPTS=2), mock.patch.object(
+            transcoding, 'transcode_rendition', side_effect=transcoding.FFmpegError('bad input')
+        ) as rendition, self.captureOnCommitCallbacks(execute=True):
+            Video.objects.filter(pk=self.video.pk).update(approval_status=Video.ApprovalStatus.APPROVED)
+            transcoding.queue_transcodes([self.video.pk])
+        self.assertEqual(rendition.call_count, 2)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.hls_status, Video.StreamStatus.FAILED)
+        self.assertEqual(self.video.hls_manifest, '')
+
+
+class MediaServingTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        self.data = os.urandom(4096)
+        self.video = Video.objects.create(
+            title='Reel', description='Description', creator=self.creator,
+            url=ContentFile(self.data, name='reel.mp4'), approval_status=Video.ApprovalStatus.APPROVED
+        )
+        self.url = reverse('media', args=[self.video.url.name])
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_and_conditional_responses(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(self.body(response), self.data)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        etag = self.client.head(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/4096')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.body(response), self.data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-96', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[-96:])
+
+        # A stale If-Range gets the whole, current file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */4096')
+
+    def test_unapproved_videos_are_private(self):
+        Video.objects.filter(pk=self.video.pk).update(approval_status=Video.ApprovalStatus.PENDING)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        other = create_creator('other@example.com')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.logout()
+        token = str(RefreshToken.for_user(self.creator).access_token)
+        response = self.client.get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_offloaded_modes_and_traversal(self):
+        with override_settings(MEDIA_SERVE_MODE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.video.url.name}')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.video.url.path)
+
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+class ContainerProbeTests(APITestCase):
+    def sample(self, writer, size=64 * 1024, **kwargs):
+        sample = io.BytesIO()
+        writer(sample, size, **kwargs)
+        sample.seek(0)
+        return sample
+
+    def test_reads_mp4_and_webm_headers(self):
+        info = probe.probe(self.sample(write_mp4, seconds=75.25, width=1280, height=720))
+        self.assertEqual(info['duration'], timedelta(seconds=75.25))
+        self.assertEqual((info['width'], info['height'], info['video_codec']), (1280, 720, 'h264'))
+        self.assertEqual(info['bitrate'], int(64 * 1024 * 8 / 75.25))
+
+        info = probe.probe(self.sample(write_webm, seconds=12))
+        self.assertEqual(info['duration'], timedelta(seconds=12))
+        self.assertEqual((info['width'], info['height'], info['video_codec']), (1280, 720, 'vp9'))
+
+        with self.assertRaises(probe.ProbeError):
+            probe.probe(io.BytesIO(os.urandom(4096)))
+
+    def test_webm_duration_sizes(self):
+        # 12 s (12000 ms) as a 10 byte x87 extended float: 1.46484375 * 2 ** 13
+        extended = struct.pack('>HQ', 16383 + 13, 12000 << (63 - 13))
+        info = probe.probe(self.sample(write_webm, duration=extended))
+        self.assertEqual(info['duration'], timedelta(seconds=12))
+        self.assertNotIn('duration', probe.probe(self.sample(write_webm, duration=b'')))
+
+        malformed = self.sample(write_webm, duration=b'\x40\x00')
+        with self.assertRaises(probe.ProbeError):
+            probe.probe(malformed)
+        upload = SimpleUploadedFile('reel.webm', malformed.getvalue(), content_type='video/webm')
+        self.assertEqual(probe.probe_video_file(Video(url=upload).url), {})
+
+    def test_upload_fills_metadata(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        creator = create_creator()
+        self.client.force_authenticate(user=creator)
+        upload = SimpleUploadedFile(
+            'reel.mp4', self.sample(write_mp4, seconds=95).getvalue(), content_type='video/mp4'
+        )
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                reverse('videos:video-upload-list'),
+                {'title': 'Reel', 'description': 'Description', 'category': 'other', 'video': upload},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        video = Video.objects.get()
+        self.assertEqual(video.duration, timedelta(seconds=95))
+        self.assertEqual((video.width, video.height, video.video_codec), (1920, 1080, 'h264'))
+        self.assertEqual(VideoSerializer(video).data['duration_str'], '1:35')
+
+
+class MediaBlobTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        self.client.force_authenticate(user=self.creator)
+        self.data = MP4_HEADER + os.urandom(4096 - len(MP4_HEADER))
+
+    def upload(self, filename):
+        response = self.client.post(
+            reverse('videos:video-upload-list'),
+            {
+                'title': 'Reel', 'description': 'Description', 'category': 'other',
+                'video': SimpleUploadedFile(filename, self.data, content_type='video/mp4'),
+            },
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return Video.objects.get(pk=response.data['id'])
+
+    def stored_files(self):
+        return sorted(os.listdir(os.path.join(self.media_root, 'videos')))
+
+    def test_identical_uploads_share_one_file(self):
+        # Uploads are hashed while they stream in; nothing is read back to hash it
+        with mock.patch.object(blobs, 'file_digest', side_effect=AssertionError('hashed twice')):
+            first = self.upload('reel.mp4')
+            second = self.upload('copy-of-reel.mp4')
+
+        self.assertEqual(second.url.name, first.url.name)
+        self.assertEqual(self.stored_files(), ['reel.mp4'])
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertEqual((blob.name, blob.size, blob.ref_count), (first.url.name, 4096, 2))
+
+    def test_file_deleted_with_last_reference(self):
+        first = self.upload('reel.mp4')
+        second = self.upload('reel.mp4')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.stored_files(), ['reel.mp4'])
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_storing_takes_the_reference(self):
+        video = self.upload('reel.mp4')
+        video.url = SimpleUploadedFile('again.mp4', self.data, content_type='video/mp4')
+        video.save()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+        # A file stored again while its last reference is being dropped is kept
+        with self.captureOnCommitCallbacks(execute=True):
+            blobs.release(video.url.name)
+            MediaBlob.objects.create(sha256='0' * 64, name=video.url.name, size=4096, ref_count=1)
+        self.assertEqual(self.stored_files(), ['reel.mp4'])
+
+    def test_dedupe_media_deletes_blobs_of_failed_saves(self):
+        # What a Video.save() that fails after storing its file leaves behind
+        blobs.blob_storage().save('videos/reel.mp4', ContentFile(self.data))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertEqual(self.stored_files(), ['reel.mp4'])
+
+        call_command('dedupe_media', stdout=io.StringIO())
+        self.assertTrue(MediaBlob.objects.exists(), 'a save may still be in progress')
+
+        MediaBlob.objects.update(created_at=timezone.now() - timedelta(days=1))
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_media', stdout=out)
+        self.assertIn('1 blobs nothing refers to', out.getvalue())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_dedupe_media_command(self):
+        plain = FileSystemStorage()
+        videos = [
+            Video.objects.create(
+                title=f'Reel {i}', description='Description', creator=self.creator,
+                url=plain.save(f'videos/reel-{i}.mp4', ContentFile(self.data))
+            )
+            for i in range(3)
+        ]
+        plain.save('videos/other.mp4', ContentFile(b'something else'))
+        self.assertFalse(MediaBlob.objects.exists())
+
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_media', stdout=out)
+
+        self.assertIn('Reclaimed 0.0 MB', out.getvalue())
+        self.assertIn('2 duplicate copies', out.getvalue())
+        names = {video.url.name for video in Video.objects.all()}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.stored_files(), sorted([names.pop().split('/')[1], 'other.mp4']))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 3)
+        del videos
+
+
+class UploadSniffingTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.creator = create_creator()
+        self.client.force_authenticate(user=self.creator)
+
+    def upload(self, content, filename='reel.mp4'):
+        return self.client.post(
+            reverse('videos:video-upload-list'),
+            {
+                'title': 'Reel', 'description': 'Description', 'category': 'other',
+                'video': SimpleUploadedFile(filename, content, content_type='video/mp4'),
+            },
+            format='multipart'
+        )
+
+    def test_signatures(self):
+        sample = io.BytesIO()
+        write_webm(sample, 4096)
+        self.assertEqual(sniffing.sniff_video(MP4_HEADER), 'mp4')
+        self.assertEqual(sniffing.sniff_video(sample.getvalue()[:16]), 'matroska')
+        self.assertEqual(sniffing.sniff_video(b'RIFF\x00\x10\x00\x00AVI LIST'), 'avi')
+        self.assertIsNone(sniffing.sniff_video(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n1 0'))
+        self.assertIsNone(sniffing.sniff_video(b'short'))
+
+    def test_junk_is_rejected_while_streaming(self):
+        # Named and typed like a video, but the body is a ZIP archive
+        junk = b'PK\x03\x04' + os.urandom(256 * 1024)
+        handler = sniffing.VideoSniffingUploadHandler
+        with mock.patch.object(handler, 'receive_data_chunk', autospec=True,
+                               side_effect=handler.receive_data_chunk) as receive:
+            response = self.upload(junk)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['video'], [sniffing.NOT_A_VIDEO])
+        # The parse stopped at the first chunk instead of reading the whole body
+        self.assertEqual(receive.call_count, 1)
+        self.assertFalse(Video.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'videos')))
+
+    @override_settings(VIDEO_UPLOAD_MAX_SIZE=1024)
+    def test_oversized_upload_is_rejected_before_reading(self):
+        with mock.patch.object(sniffing.VideoSniffingUploadHandler, 'receive_data_chunk') as receive:
+            response = self.upload(MP4_HEADER + bytes(128 * 1024))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('too large', response.data['video'][0])
+        receive.assert_not_called()
+        self.assertFalse(Video.objects.exists())
+
+    def test_valid_video_is_accepted(self):
+        sample = io.BytesIO()
+        write_mp4(sample, 64 * 1024)
+        response = self.upload(sample.getvalue())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Video.objects.get().video_codec, 'h264')
+
+
+class VideoFeedQueryCountTests(APITestCase):
+    """Video list endpoints must not issue a query per video."""
+
+    # Page query plus one for the live counters; nothing per row
+    QUERY_BUDGET = 2
+
+    def setUp(self):
+        self.brand = create_brand()
+        self.contest = create_contest(self.brand)
+        self.created = 0
+
+    def create_creator(self):
+        self.created += 1
+        creator = create_creator(f'creator{self.created}@example.com', first_name='Creator')
+        CreatorProfile.objects.filter(user=creator).update(profile_picture='creator_profiles/me.png')
+        return creator
+
+    def create_videos(self, count, creator=None):
+        for _ in range(count):
+            owner = creator or self.create_creator()
+            submission = Submission.objects.create(
+                contest=self.contest, creator=owner, title='Entry', description='Entry description',
+                video_file='contest_videos/entry.mp4', status='approved',
+            )
+            Video.objects.create(
+                title='Entry', description='Entry description', creator=owner, url='contest_videos/entry.mp4',
+                contest=self.contest, submission=submission, is_featured=True,
+                approval_status=Video.ApprovalStatus.APPROVED,
+            )
+
+    def assertQueryBudget(self, url, creator=None):
+        self.create_videos(2, creator)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self.create_videos(6, creator)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), self.QUERY_BUDGET, [q['sql'] for q in large.captured_queries])
+        return response
+
+    def test_video_list(self):
+        response = self.assertQueryBudget(reverse('videos:video-list'))
+        card = response.data['results'][0]
+        self.assertEqual(card['contest'], {
+            'id': self.contest.id, 'title': 'Contest', 'status': 'live', 'submission_count': 8
+        })
+        self.assertEqual(card['creator']['name'], 'Creator')
+        self.assertEqual(
+            card['creator']['avatar']['avatar']['webp'],
+            '/media/image_derivatives/creator_profiles/me.png/avatar.webp'
+        )
+        self.assertEqual(card['submission_status'], 'approved')
+        self.assertNotIn('contest_details', card)
+
+    def test_creator_videos(self):
+        creator = self.create_creator()
+        response = self.assertQueryBudget(reverse('videos:creator-videos', args=[creator.pk]), creator)
+        self.assertEqual(len(response.data['results']), 8)
+
+    def test_detail_keeps_full_payload(self):
+        self.create_videos(1)
+        response = self.client.get(reverse('videos:video-detail', args=[Video.objects.get().pk]))
+        self.assertEqual(response.data['contest_details']['id'], self.contest.id)
+
+    def test_detail_etag_covers_embedded_rows(self):
+        self.create_videos(1)
+        video = Video.objects.get()
+        url = reverse('videos:video-detail', args=[video.pk])
+        submission = video.submission
+        submission.status = 'pending_approval'
+        submission.save()
+
+        def revalidate(change):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+            change()
+            response = self.client.get(url, headers={'if-none-match': etag})
+            self.assertEqual(response.status_code, 200)
+            return response.data
+
+        submission.status = 'approved'
+        self.assertEqual(revalidate(submission.save)['submission_status'], 'approved')
+        video.creator.first_name = 'Renamed'
+        self.assertEqual(revalidate(video.creator.save)['creator_name'], 'Renamed')
+        profile = video.creator.creator_profile
+        profile.bio = 'New bio'
+        self.assertEqual(revalidate(profile.save)['creator_profile']['bio'], 'New bio')
+        data = revalidate(lambda: self.create_videos(1))
+        self.assertEqual(data['contest_details']['submission_count'], 2)
+
+
+class TrendingTests(APITestCase):
+    def setUp(self):
+        counters.buffer.clear()
+        self.creator = create_creator()
+
+    def create_video(self, title):
+        return Video.objects.create(
+            title=title, description='Description', creator=self.creator, url=f'videos/{title}.mp4',
+            approval_status=Video.ApprovalStatus.APPROVED,
+        )
+
+    def test_recent_activity_outranks_older_activity(self):
+        now = timezone.now()
+        # Three half-lives ago, 20 events count for 2.5 today
+        old = trending.event_score(20, now - timedelta(days=3))
+        self.assertAlmostEqual(old, trending.event_score(2.5, now))
+        self.assertGreater(trending.event_score(5, now), old)
+        self.assertAlmostEqual(
+            trending.combine(trending.event_score(1, now), trending.event_score(1, now)),
+            trending.event_score(2, now)
+        )
+
+    def test_flushed_counters_raise_scores(self):
+        quiet, popular = self.create_video('quiet'), self.create_video('popular')
+        before = Video.objects.get(pk=popular.pk).trending_score
+        for _ in range(3):
+            counters.increment(popular, 'views')
+        counters.increment(popular, 'likes')
+        counters.flush()
+        popular.refresh_from_db()
+        quiet.refresh_from_db()
+        self.assertAlmostEqual(
+            popular.trending_score,
+            trending.combine(before, trending.event_score(3 + 5, timezone.now())), places=2
+        )
+        self.assertGreater(popular.trending_score, quiet.trending_score)
+
+        response = self.client.get(reverse('videos:video-list'), {'sort': 'trending'})
+        self.assertEqual([video['title'] for video in response.data['results']], ['popular', 'quiet'])
+        # The default feed is still newest first
+        response = self.client.get(reverse('videos:video-list'))
+        self.assertEqual([video['title'] for video in response.data['results']], ['popular', 'quiet'])
+
+    def test_trending_pages_do_not_overlap(self):
+        for i in range(5):
+            video = self.create_video(f'video-{i}')
+            Video.objects.filter(pk=video.pk).update(trending_score=i % 2)
+        url = reverse('videos:video-list')
+        first = self.client.get(url, {'sort': 'trending', 'page_size': 3})
+        second = self.client.get(first.data['next'])
+        titles = [video['title'] for video in first.data['results'] + second.data['results']]
+        self.assertEqual(titles, ['video-3', 'video-1', 'video-4', 'video-2', 'video-0'])
+
+    def test_submissions_raise_contest_score(self):
+        brand = create_brand()
+        contest = create_contest(brand)
+        before = contest.trending_score
+        Submission.objects.create(
+            contest=contest, creator=self.creator, title='Entry', description='Entry description',
+            video_file='contest_videos/entry.mp4',
+        )
+        contest.refresh_from_db()
+        self.assertGreater(contest.trending_score, before)
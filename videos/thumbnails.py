@@ -0,0 +1,139 @@
+"""
+Poster frames and thumbnails for uploaded videos.
+
+When a video is created, ``schedule_thumbnails`` queues ``generate_thumbnails``
+on the bounded background ``'media'`` pool once the transaction commits, so
+the upload request never waits for it. The task grabs one frame
+``THUMBNAIL_POSTER_OFFSET`` seconds in with ``ffmpeg`` (``FFMPEG_BINARY`` or
+the first ``ffmpeg`` on ``PATH``) and writes a JPEG and a WebP per entry in
+``THUMBNAIL_SIZES`` under ``video_thumbnails/<id>/``.
+
+The ``THUMBNAIL_POSTER_SIZE`` JPEG becomes ``Video.thumbnail`` (and the
+linked submission's thumbnail if it has none); every variant is listed in
+``Video.thumbnails``. Failures are retried ``THUMBNAIL_MAX_ATTEMPTS`` times
+with exponential backoff. Without ffmpeg the video is marked ``unavailable``
+and ``manage.py generate_thumbnails`` picks it up later.
+"""
+import io
+import logging
+import time
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from contests.models import Submission
+from ocontest import background
+from .ffmpeg import FFmpegError, FFmpegUnavailable, ffmpeg_binary, local_path, run
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+
+class ThumbnailError(FFmpegError):
+    """A frame could not be extracted or encoded."""
+
+
+def extract_poster_frame(path, offset=None):
+    """Return the frame ``offset`` seconds into the video at ``path`` as an RGB image."""
+    binary = ffmpeg_binary()
+    if not binary:
+        raise FFmpegUnavailable('ffmpeg is not installed')
+    offset = getattr(settings, 'THUMBNAIL_POSTER_OFFSET', 1.0) if offset is None else offset
+    for seek in (offset, 0) if offset else (0,):
+        frame = run([
+            binary, '-nostdin', '-v', 'error', '-ss', str(seek), '-i', path,
+            '-frames:v', '1', '-f', 'image2pipe', '-vcodec', 'png', '-',
+        ], timeout=getattr(settings, 'THUMBNAIL_FFMPEG_TIMEOUT', 60))
+        # Seeking past the end of a short clip yields no frame; fall back to the first one
+        if frame:
+            return Image.open(io.BytesIO(frame)).convert('RGB')
+    raise ThumbnailError(f'No video frame found in {path}')
+
+
+def render_thumbnails(image):
+    """Encode ``image`` at every ``THUMBNAIL_SIZES`` width: ``{size: {'width', 'height', 'jpeg', 'webp'}}``."""
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 82)
+    renditions = {}
+    for size, width in settings.THUMBNAIL_SIZES.items():
+        resized = image.copy()
+        # Fits the width, keeps the aspect ratio and never upscales
+        resized.thumbnail((width, image.height), Image.LANCZOS)
+        rendition = {'width': resized.width, 'height': resized.height}
+        for image_format in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format.upper(), quality=quality)
+            rendition[image_format] = buffer.getvalue()
+        renditions[size] = rendition
+    return renditions
+
+
+def store_thumbnails(video, renditions):
+    """Save ``renditions`` to storage and return the ``Video.thumbnails`` mapping."""
+    storage = video.thumbnail.storage
+    variants = {}
+    for size, rendition in renditions.items():
+        variant = {'width': rendition['width'], 'height': rendition['height']}
+        for image_format, extension in FORMATS.items():
+            name = f'video_thumbnails/{video.pk}/{size}.{extension}'
+            storage.delete(name)
+            variant[image_format] = storage.save(name, ContentFile(rendition[image_format]))
+        variants[size] = variant
+    return variants
+
+
+def _generate(video):
+    with local_path(video.url) as path:
+        image = extract_poster_frame(path)
+    variants = store_thumbnails(video, render_thumbnails(image))
+    poster = variants.get(settings.THUMBNAIL_POSTER_SIZE) or next(iter(variants.values()))
+    Video.objects.filter(pk=video.pk).update(
+        thumbnail=poster['jpeg'], thumbnails=variants, thumbnail_status=Video.ThumbnailStatus.READY,
+        updated_at=timezone.now(),
+    )
+    if video.submission_id:
+        Submission.objects.filter(pk=video.submission_id, thumbnail='').update(
+            thumbnail=poster['jpeg'], updated_at=timezone.now()
+        )
+
+
+def generate_thumbnails(video_id):
+    """
+    Build the thumbnails of one video, retrying failures with backoff.
+
+    Runs on a background worker. Returns the resulting ``thumbnail_status``.
+    """
+    video = Video.objects.filter(pk=video_id).first()
+    if video is None or not video.url:
+        return None
+    max_attempts = getattr(settings, 'THUMBNAIL_MAX_ATTEMPTS', 3)
+    backoff = getattr(settings, 'THUMBNAIL_RETRY_BACKOFF', 5.0)
+    attempts = 0
+    while True:
+        attempts += 1
+        Video.objects.filter(pk=video_id).update(thumbnail_attempts=video.thumbnail_attempts + attempts)
+        try:
+            _generate(video)
+            return Video.ThumbnailStatus.READY
+        except FFmpegUnavailable:
+            logger.info('ffmpeg not found, skipping thumbnails for video %s', video_id)
+            status = Video.ThumbnailStatus.UNAVAILABLE
+        except (FFmpegError, OSError) as e:
+            if attempts < max_attempts:
+                delay = backoff * (2 ** (attempts - 1))
+                logger.warning(f'Thumbnails for video {video_id} failed ({e}), retrying in {delay}s')
+                time.sleep(delay)
+                continue
+            logger.error(f'Giving up on thumbnails for video {video_id}: {e}')
+            status = Video.ThumbnailStatus.FAILED
+        Video.objects.filter(pk=video_id).update(thumbnail_status=status, updated_at=timezone.now())
+        return status
+
+
+def schedule_thumbnails(video):
+    """Generate ``video``'s thumbnails on the media pool after the current transaction commits."""
+    video_id = video.pk
+    transaction.on_commit(lambda: background.submit('media', generate_thumbnails, video_id))
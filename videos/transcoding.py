@@ -0,0 +1,168 @@
+"""
+Adaptive-bitrate HLS renditions of approved videos.
+
+Approving a video (through a save or the admin action) calls
+``queue_transcodes``, which marks it ``queued`` and, after the transaction
+commits, runs ``transcode_video`` on the background ``'transcode'`` pool.
+Each ``HLS_LADDER`` rung no taller than the source is encoded with ffmpeg to
+H.264/AAC segments of ``HLS_SEGMENT_DURATION`` seconds; the segments, the
+per-rung playlists and a master playlist are written to
+``video_streams/<id>/``. ``Video.hls_manifest`` names the master playlist
+and ``VideoSerializer`` advertises it as ``stream_url`` once ``hls_status``
+is ``ready``, so players fetch a rendition that suits their bandwidth
+instead of the original upload.
+"""
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from ocontest import background
+from .ffmpeg import FFmpegError, FFmpegUnavailable, ffmpeg_binary, local_path, probe_dimensions, run
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+MASTER_PLAYLIST = 'master.m3u8'
+RENDITION_PLAYLIST = 'index.m3u8'
+
+
+def select_ladder(dimensions=None):
+    """The ``HLS_LADDER`` rungs worth encoding for a source of ``(width, height)``."""
+    ladder = sorted(settings.HLS_LADDER, key=lambda rung: rung['height'])
+    if not dimensions:
+        return ladder
+    # No upscaling, but always at least the lowest rung
+    return [rung for rung in ladder if rung['height'] <= dimensions[1]] or ladder[:1]
+
+
+def transcode_rendition(binary, source, output_dir, rung):
+    """Encode ``source`` as one HLS rendition in ``output_dir``."""
+    segment = getattr(settings, 'HLS_SEGMENT_DURATION', 6)
+    video_bitrate = rung['video_bitrate']
+    run([
+        binary, '-nostdin', '-v', 'error', '-y', '-i', source,
+        '-vf', f"scale=-2:{rung['height']}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', str(video_bitrate), '-maxrate', str(int(video_bitrate * 1.07)), '-bufsize', str(video_bitrate * 2),
+        # Keyframes on segment boundaries so every rung switches cleanly
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment})', '-sc_threshold', '0',
+        '-c:a', 'aac', '-b:a', str(rung['audio_bitrate']), '-ac', '2',
+        '-hls_time', str(segment), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, 'segment_%04d.ts'),
+        os.path.join(output_dir, RENDITION_PLAYLIST),
+    ], timeout=getattr(settings, 'HLS_FFMPEG_TIMEOUT', 3600))
+
+
+def master_playlist(renditions, dimensions=None):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        attributes = f"BANDWIDTH={rendition['bandwidth']}"
+        if dimensions:
+            width = round(dimensions[0] * rendition['height'] / dimensions[1] / 2) * 2
+            attributes += f",RESOLUTION={width}x{rendition['height']}"
+        lines.append(f'#EXT-X-STREAM-INF:{attributes},NAME="{rendition["name"]}"')
+        lines.append(f"{rendition['name']}/{RENDITION_PLAYLIST}")
+    return '\n'.join(lines) + '\n'
+
+
+def store_stream(storage, prefix, directory):
+    """Copy every file under ``directory`` to ``prefix`` in ``storage``, keeping relative paths."""
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = f"{prefix}/{os.path.relpath(path, directory).replace(os.sep, '/')}"
+            # Playlists reference segments by relative path, so names must not be altered
+            storage.delete(name)
+            with open(path, 'rb') as content:
+                storage.save(name, File(content))
+
+
+def _transcode(video):
+    binary = ffmpeg_binary()
+    if not binary:
+        raise FFmpegUnavailable('ffmpeg is not installed')
+    prefix = f'video_streams/{video.pk}'
+    with tempfile.TemporaryDirectory(prefix='hls-') as output_dir:
+        with local_path(video.url) as source:
+            dimensions = (video.width, video.height) if video.height else probe_dimensions(source)
+            renditions = []
+            for rung in select_ladder(dimensions):
+                rendition_dir = os.path.join(output_dir, rung['name'])
+                os.makedirs(rendition_dir)
+                transcode_rendition(binary, source, rendition_dir, rung)
+                renditions.append({
+                    'name': rung['name'],
+                    'height': rung['height'],
+                    'bandwidth': rung['video_bitrate'] + rung['audio_bitrate'],
+                    'playlist': f"{prefix}/{rung['name']}/{RENDITION_PLAYLIST}",
+                })
+        with open(os.path.join(output_dir, MASTER_PLAYLIST), 'w') as master:
+            master.write(master_playlist(renditions, dimensions))
+        store_stream(default_storage, prefix, output_dir)
+    Video.objects.filter(pk=video.pk).update(
+        hls_status=Video.StreamStatus.READY,
+        hls_manifest=f'{prefix}/{MASTER_PLAYLIST}',
+        hls_renditions=renditions,
+        updated_at=timezone.now(),
+    )
+
+
+def transcode_video(video_id):
+    """
+    Build the HLS renditions of one video, retrying failures with backoff.
+
+    Runs on a background worker. Returns the resulting ``hls_status``.
+    """
+    video = Video.objects.filter(pk=video_id).first()
+    if video is None or not video.url:
+        return None
+    max_attempts = getattr(settings, 'HLS_MAX_ATTEMPTS', 2)
+    backoff = getattr(settings, 'HLS_RETRY_BACKOFF', 30.0)
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            _transcode(video)
+            return Video.StreamStatus.READY
+        except FFmpegUnavailable:
+            logger.info('ffmpeg not found, skipping HLS renditions for video %s', video_id)
+            status = Video.StreamStatus.UNAVAILABLE
+        except (FFmpegError, OSError) as e:
+            if attempts < max_attempts:
+                delay = backoff * (2 ** (attempts - 1))
+                logger.warning(f'Transcoding video {video_id} failed ({e}), retrying in {delay}s')
+                time.sleep(delay)
+                continue
+            logger.error(f'Giving up on transcoding video {video_id}: {e}')
+            status = Video.StreamStatus.FAILED
+        Video.objects.filter(pk=video_id).update(hls_status=status, updated_at=timezone.now())
+        return status
+
+
+def queue_transcodes(video_ids):
+    """
+    Transcode the approved, not yet transcoded videos among ``video_ids`` once
+    the current transaction commits. Returns the ids that were queued.
+    """
+    pending = Video.objects.filter(
+        pk__in=video_ids,
+        approval_status=Video.ApprovalStatus.APPROVED,
+        hls_status=Video.StreamStatus.PENDING,
+    ).exclude(url='')
+    queued = list(pending.values_list('pk', flat=True))
+    if not queued:
+        return []
+    Video.objects.filter(pk__in=queued).update(hls_status=Video.StreamStatus.QUEUED, updated_at=timezone.now())
+
+    def submit():
+        for video_id in queued:
+            background.submit('transcode', transcode_video, video_id)
+
+    transaction.on_commit(submit)
+    return queued
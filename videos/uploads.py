@@ -0,0 +1,237 @@
+"""
+Resumable chunked uploads for videos and contest submissions.
+
+The protocol (``/api/videos/uploads/``):
+
+1. ``POST`` with ``filename``, ``size``, ``purpose`` (``video`` or
+   ``submission``), ``contest`` for submissions, and the metadata of the
+   video/submission to create. Returns the session ``id``.
+2. ``PUT <id>/`` once per chunk with the raw bytes as the body and an
+   ``Upload-Offset`` header. An optional ``Upload-Checksum: crc32 <hex>``
+   header is verified against the chunk. A ``409`` carries the offset the
+   server actually has, so a client that lost a response resumes from there;
+   ``HEAD``/``GET <id>/`` returns it too.
+3. ``POST <id>/finalize/``, optionally with the ``checksum`` (CRC-32 hex) of
+   the whole file, creates the ``Video`` or ``Submission`` and moves the
+   assembled file into place.
+
+Each chunk is streamed to ``CHUNKED_UPLOAD_DIR`` in small pieces while a
+running CRC-32 is kept, so memory per upload stays constant. Requests are at
+most ``CHUNKED_UPLOAD_CHUNK_SIZE`` long, and with the front-end proxy
+buffering request bodies a worker is only busy while a chunk is written, not
+while a slow client sends it.
+"""
+import mimetypes
+import os
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import sniffing
+from .models import UploadSession
+
+READ_SIZE = 64 * 1024
+VALID_EXTENSIONS = ['.mp4', '.webm', '.mov', '.avi', '.wmv', '.flv', '.3gp', '.3g2']
+
+
+class UploadError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Invalid upload.'
+    default_code = 'invalid_upload'
+
+
+class UploadClosed(UploadError):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This upload is no longer accepting data.'
+    default_code = 'upload_closed'
+
+
+class OffsetMismatch(UploadError):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Upload-Offset does not match the received data.'
+    default_code = 'offset_mismatch'
+
+    def __init__(self, offset, detail=None):
+        super().__init__(detail)
+        # Sent back as a number so the client can resume from it
+        self.detail = {'detail': self.detail, 'offset': offset}
+
+
+class IncompleteUpload(OffsetMismatch):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Upload is incomplete.'
+    default_code = 'incomplete_upload'
+
+
+class AssembledUpload(UploadedFile):
+    """The finished ``.part`` file; storage moves it instead of copying it."""
+
+    def __init__(self, path, name, size):
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        super().__init__(open(path, 'rb'), name, content_type, size)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def format_checksum(value):
+    return f'{value:08x}'
+
+
+def parse_checksum(value):
+    """Parse a CRC-32 given as ``crc32 <hex>`` or bare hex; ``None`` when absent."""
+    if not value:
+        return None
+    algorithm, _, digest = value.strip().rpartition(' ')
+    if algorithm and algorithm.lower() != 'crc32':
+        raise UploadError('Only crc32 checksums are supported.')
+    try:
+        return int(digest, 16)
+    except ValueError:
+        raise UploadError('Malformed checksum.')
+
+
+def validate_file(filename, size):
+    if size <= 0:
+        raise UploadError('size must be a positive number of bytes.')
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            f'Video file too large. Maximum size is {settings.CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)}MB.'
+        )
+    if os.path.splitext(filename)[1].lower() not in VALID_EXTENSIONS:
+        raise UploadError('Unsupported file extension. Please upload a video file with a valid extension.')
+
+
+def start_upload(owner, filename, size, purpose=UploadSession.Purpose.VIDEO, contest=None, metadata=None):
+    validate_file(filename, size)
+    return UploadSession.objects.create(
+        owner=owner,
+        purpose=purpose,
+        contest=contest,
+        filename=os.path.basename(filename),
+        total_size=size,
+        metadata=metadata or {},
+        expires_at=timezone.now() + timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY),
+    )
+
+
+def _truncate(path, size):
+    if os.path.exists(path):
+        with open(path, 'r+b') as part:
+            part.truncate(size)
+
+
+def append_chunk(session, stream, offset, length, chunk_checksum=None):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``.
+
+    The session row is locked for the duration so concurrent PUTs for the
+    same upload are serialised. Returns the updated session.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != UploadSession.Status.ACTIVE or session.expires_at <= timezone.now():
+            raise UploadClosed()
+        if offset != session.offset:
+            raise OffsetMismatch(session.offset)
+        if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+            raise UploadError(f'Chunks may be at most {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes.')
+        if session.offset + length > session.total_size:
+            raise UploadError('Chunk extends past the declared upload size.')
+
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        path = session.part_path
+        checksum = session.checksum
+        piece_checksum = 0
+        written = 0
+        with open(path, 'ab') as part:
+            # Drop whatever a previously interrupted chunk left behind
+            part.truncate(session.offset)
+            while written < length:
+                piece = stream.read(min(READ_SIZE, length - written))
+                if not piece:
+                    break
+                part.write(piece)
+                checksum = zlib.crc32(piece, checksum)
+                piece_checksum = zlib.crc32(piece, piece_checksum)
+                written += len(piece)
+
+        if written != length:
+            _truncate(path, session.offset)
+            raise UploadError('The chunk ended before Content-Length bytes were received.')
+        if session.offset < sniffing.SNIFF_BYTES <= session.offset + written:
+            # The first bytes are in: refuse anything that is not a video before the rest is sent
+            with open(path, 'rb') as part:
+                head = part.read(sniffing.SNIFF_BYTES)
+            if sniffing.sniff_video(head) is None:
+                _truncate(path, session.offset)
+                raise UploadError(sniffing.NOT_A_VIDEO)
+        if chunk_checksum is not None and piece_checksum != chunk_checksum:
+            _truncate(path, session.offset)
+            raise UploadError('Chunk checksum mismatch.')
+
+        session.offset += written
+        session.checksum = checksum
+        session.save(update_fields=['offset', 'checksum', 'updated_at'])
+    return session
+
+
+def assembled_file(session, expected_checksum=None):
+    """
+    The completed upload as a file object, after checking it is whole and intact.
+
+    Call it inside ``transaction.atomic()`` and build the video or submission
+    in the same transaction: the session row stays locked until then, so a
+    second finalize of the same upload (a client retrying) waits and then
+    finds it completed instead of building another object.
+    """
+    session = UploadSession.objects.select_for_update().get(pk=session.pk)
+    if session.status != UploadSession.Status.ACTIVE:
+        raise UploadClosed()
+    if not session.is_complete:
+        raise IncompleteUpload(session.offset)
+    if expected_checksum is not None and expected_checksum != session.checksum:
+        raise UploadError('File checksum mismatch.')
+    return AssembledUpload(session.part_path, session.filename, session.total_size)
+
+
+def complete(session, video=None, submission=None):
+    # Storage normally moves the part file into place, but not when it was a duplicate
+    _remove_part(session)
+    session.status = UploadSession.Status.COMPLETED
+    session.video = video
+    session.submission = submission
+    session.save(update_fields=['status', 'video', 'submission', 'updated_at'])
+
+
+def abort(session):
+    _remove_part(session)
+    session.status = UploadSession.Status.ABORTED
+    session.save(update_fields=['status', 'updated_at'])
+
+
+def _remove_part(session):
+    try:
+        os.remove(session.part_path)
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads():
+    """Delete unfinished uploads past their expiry. Returns the number removed."""
+    expired = UploadSession.objects.filter(
+        status=UploadSession.Status.ACTIVE, expires_at__lte=timezone.now()
+    )
+    count = 0
+    for session in expired.iterator():
+        _remove_part(session)
+        session.delete()
+        count += 1
+    return count
@@ -8,6 +8,7 @@ app_name = 'videos'
 router = DefaultRouter()
 router.register(r'videos', views.VideoViewSet, basename='video')
 router.register(r'upload', views.VideoUploadViewSet, basename='video-upload')
+router.register(r'uploads', views.ChunkedUploadViewSet, basename='chunked-upload')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
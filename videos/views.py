@@ -1,17 +1,32 @@
-from rest_framework import generics, permissions, viewsets, status
+from rest_framework import generics, mixins, permissions, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import Video
-from .serializers import VideoSerializer, VideoUploadSerializer
+from ocontest import counters
+from ocontest.conditional import ConditionalGetMixin
+from ocontest.pagination import FeedCursorPagination
+from ocontest.response_cache import CachedResponseMixin
+from ocontest.trending import TrendingSortMixin
+from contests.models import Contest, Submission
+from contests.serializers import SubmissionSerializer
+from contests.views import create_submission_video, submission_error
+from . import sniffing, uploads
+from .models import UploadSession, Video
+from .serializers import UploadSessionSerializer, VideoCardSerializer, VideoSerializer, VideoUploadSerializer
 
-class VideoListView(generics.ListAPIView):
-    serializer_class = VideoSerializer
+class VideoListView(CachedResponseMixin, TrendingSortMixin, generics.ListAPIView):
+    serializer_class = VideoCardSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = FeedCursorPagination
+    cache_tags = ('videos',)
     
     def get_queryset(self):
-        queryset = Video.objects.all()
+        queryset = Video.objects.for_feed()
         
         # Filter based on approval status only
         if not self.request.user.is_staff:
@@ -20,7 +35,7 @@ class VideoListView(generics.ListAPIView):
         # Order by most recent first
         return queryset.order_by('-created_at')
 
-class VideoViewSet(viewsets.ModelViewSet):
+class VideoViewSet(ConditionalGetMixin, TrendingSortMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and managing videos.
     """
@@ -28,10 +43,34 @@ class VideoViewSet(viewsets.ModelViewSet):
     serializer_class = VideoSerializer
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FeedCursorPagination
+    # Everything the payloads embed: the submission, the contest and its
+    # counts, the creator and their profile
+    validator_aggregates = {
+        'modified': Max('updated_at'),
+        'submission_modified': Max('submission__updated_at'),
+        'contest_modified': Max('contest__updated_at'),
+        'creator_modified': Max('creator__updated_at'),
+        'profile_modified': Max('creator__creator_profile__updated_at'),
+        'count': Count('pk', distinct=True),
+        'contest_submissions': Count('contest__submissions', distinct=True),
+        'contest_views': Sum('contest__view_count'),
+        'views': Sum('views'),
+        'likes': Sum('likes'),
+    }
     
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return VideoCardSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
+        return self.filter_videos(super().get_queryset().for_feed()).order_by('-created_at')
+
+    def get_validator_queryset(self):
+        return self.filter_videos(Video.objects.all())
+
+    def filter_videos(self, queryset):
         # Non-staff users can only see approved videos
         if not self.request.user.is_staff:
             queryset = queryset.filter(approval_status=Video.ApprovalStatus.APPROVED)
@@ -51,7 +90,7 @@ class VideoViewSet(viewsets.ModelViewSet):
         if is_standalone is not None:
             queryset = queryset.filter(is_standalone=is_standalone.lower() in ('true', '1'))
             
-        return queryset.order_by('-created_at')
+        return queryset
     
     def perform_create(self, serializer):
         # Set the creator to the current user
@@ -61,7 +100,7 @@ class VideoViewSet(viewsets.ModelViewSet):
     def like(self, request, pk=None):
         video = self.get_object()
         video.increment_likes()
-        return Response({'likes': video.likes})
+        return Response({'likes': counters.live_value(video, 'likes')})
     
     @action(detail=True, methods=['get'])
     def view(self, request, pk=None):
@@ -71,7 +110,7 @@ class VideoViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class VideoUploadViewSet(viewsets.GenericViewSet):
+class VideoUploadViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
     ViewSet specifically for handling video uploads.
     """
@@ -80,6 +119,12 @@ class VideoUploadViewSet(viewsets.GenericViewSet):
     serializer_class = VideoUploadSerializer
     
     def create(self, request, *args, **kwargs):
+        # Stop reading the body as soon as the file is clearly not an acceptable video
+        sniffing.install_upload_handler(request, ['video'])
+        rejected = sniffing.rejected_upload(request)
+        if rejected:
+            return Response({'video': [rejected]}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
@@ -97,23 +142,145 @@ class VideoUploadViewSet(viewsets.GenericViewSet):
             headers=headers
         )
 
-class CreatorVideosView(generics.ListAPIView):
-    serializer_class = VideoSerializer
+class ChunkedUploadViewSet(viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads; see ``videos.uploads`` for the protocol.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(owner=self.request.user)
+
+    def offset_response(self, session, status_code=status.HTTP_200_OK):
+        response = Response(self.get_serializer(session).data, status=status_code)
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.total_size)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def create(self, request, *args, **kwargs):
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            raise uploads.UploadError('size is required.')
+        filename = request.data.get('filename') or ''
+        purpose = request.data.get('purpose') or UploadSession.Purpose.VIDEO
+        if purpose not in UploadSession.Purpose.values:
+            raise uploads.UploadError('purpose must be "video" or "submission".')
+
+        contest = None
+        if purpose == UploadSession.Purpose.SUBMISSION:
+            if request.user.role != 'creator':
+                raise PermissionDenied('Only creators can submit videos to contests')
+            contest = get_object_or_404(Contest, pk=request.data.get('contest'))
+            # Refuse up front rather than after the whole file has been sent
+            error = submission_error(request.user, contest)
+            if error:
+                raise PermissionDenied(error['detail'])
+
+        metadata = {
+            field: request.data[field]
+            for field in ('title', 'description', 'category', 'tags', 'terms_accepted')
+            if field in request.data
+        }
+        session = uploads.start_upload(request.user, filename, size, purpose, contest, metadata)
+        response = self.offset_response(session, status.HTTP_201_CREATED)
+        response['Location'] = request.build_absolute_uri(f'{session.pk}/')
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.offset_response(self.get_object())
+
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            raise uploads.UploadError('Upload-Offset and Content-Length headers are required.')
+        chunk_checksum = uploads.parse_checksum(request.headers.get('Upload-Checksum'))
+        # Read the raw body in pieces; request.data is never touched, so it is not buffered
+        session = uploads.append_chunk(session, request.stream, offset, length, chunk_checksum)
+        return self.offset_response(session)
+
+    def destroy(self, request, *args, **kwargs):
+        uploads.abort(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        checksum = uploads.parse_checksum(request.data.get('checksum'))
+        # Metadata may be completed or corrected when finalizing
+        data = {**session.metadata, **{
+            field: request.data[field]
+            for field in ('title', 'description', 'category', 'tags', 'terms_accepted')
+            if field in request.data
+        }}
+        with transaction.atomic():
+            video_file = uploads.assembled_file(session, checksum)
+            try:
+                if session.purpose == UploadSession.Purpose.SUBMISSION:
+                    return self.finalize_submission(session, video_file, data)
+                return self.finalize_video(session, video_file, data)
+            finally:
+                video_file.close()
+
+    def finalize_video(self, session, video_file, data):
+        serializer = VideoUploadSerializer(data={**data, 'video': video_file}, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        video = serializer.save(
+            creator=self.request.user,
+            approval_status=Video.ApprovalStatus.PENDING
+        )
+        uploads.complete(session, video=video)
+        return Response(
+            VideoSerializer(video, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def finalize_submission(self, session, video_file, data):
+        error = submission_error(self.request.user, session.contest)
+        if error:
+            raise PermissionDenied(error['detail'])
+        serializer = SubmissionSerializer(
+            data={**data, 'contest': session.contest_id, 'video_file': video_file},
+            context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data.get('terms_accepted'):
+            raise uploads.UploadError('You must accept the terms and conditions')
+        submission = serializer.save(
+            creator=self.request.user,
+            contest=session.contest,
+            status=Submission.Status.PENDING_APPROVAL
+        )
+        create_submission_video(submission)
+        uploads.complete(session, submission=submission)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class CreatorVideosView(TrendingSortMixin, generics.ListAPIView):
+    serializer_class = VideoCardSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = FeedCursorPagination
     
     def get_queryset(self):
         creator_id = self.kwargs['creator_id']
-        queryset = Video.objects.filter(creator_id=creator_id)
+        queryset = Video.objects.for_feed().filter(creator_id=creator_id)
         if not self.request.user.is_staff:
             queryset = queryset.filter(approval_status=Video.ApprovalStatus.APPROVED)
         return queryset.order_by('-created_at')
 
-class FeaturedVideosView(generics.ListAPIView):
-    serializer_class = VideoSerializer
+class FeaturedVideosView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = VideoCardSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    cache_tags = ('videos',)
     
     def get_queryset(self):
-        queryset = Video.objects.filter(is_featured=True)
+        queryset = Video.objects.featured()
         if not self.request.user.is_staff:
             queryset = queryset.filter(approval_status=Video.ApprovalStatus.APPROVED)
         return queryset[:6]